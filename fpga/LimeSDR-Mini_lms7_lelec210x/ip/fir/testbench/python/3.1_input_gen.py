@@ -1,6 +1,8 @@
 import numpy as np
 from matplotlib import pyplot as plt
 
+from telecom.iq_words import fuse, save_words_text
+
 # Input values
 ninput = 64
 input_array = np.zeros((2*ninput,))
@@ -12,11 +14,9 @@ qbit = 11
 input_array_q_interleaved = np.floor(input_array * (2 ** qbit)).astype(np.int32)
 input_array_q_interleaved = np.bitwise_and(input_array_q_interleaved, 0x0fff) # Overflow
 
-# Deinterleave
-input_array_q = np.zeros((ninput,)).astype(np.int32)
-for i in range(ninput):
-  input_array_q[i] = (input_array_q_interleaved[2*i] << nbit) | (input_array_q_interleaved[2*i+1])
+# Fuse I/Q into words
+input_array_q = fuse(input_array_q_interleaved, nbit)
 
 # Save
 np.savetxt("fpga/LimeSDR-Mini_lms7_lelec210x/ip/fir/testbench/mentor/input_float.txt",input_array)
-np.savetxt("fpga/LimeSDR-Mini_lms7_lelec210x/ip/fir/testbench/mentor/input_fpga.txt",input_array_q,fmt="%.6x")
+save_words_text("fpga/LimeSDR-Mini_lms7_lelec210x/ip/fir/testbench/mentor/input_fpga.txt",input_array_q,nbit)
@@ -1,6 +1,8 @@
 import numpy as np
 from scipy.signal import convolve
 from plot_utils import *
+from telecom.fixed_point import FixedPointFIR, QFormat
+from telecom.iq_words import fuse, load_words, save_words_text, unfuse
 
 # Parameters
 B = 50e3
@@ -28,3 +30,10 @@ output_array[:,0] = convolve(input_array[:,0], taps, mode="full")[:input_array.s
 output_array[:,1] = convolve(input_array[:,1], taps, mode="full")[:input_array.shape[0]]
 output_array = output_array.flatten()
 np.savetxt('fpga/LimeSDR-Mini_lms7_lelec210x/ip/fir/testbench/mentor/output_float.txt',output_array,newline=",")
+
+# Bit-exact output of the FPGA, from the quantized input (see 3.1_input_gen.py)
+input_q = unfuse(load_words("fpga/LimeSDR-Mini_lms7_lelec210x/ip/fir/testbench/mentor/input_fpga.txt"))
+
+fir = FixedPointFIR(taps, taps_format=QFormat(1,7), input_format=QFormat(1,11), output_format=QFormat(3,9), scaling="auto")
+output_q = fir.filter_interleaved(input_q)
+save_words_text("fpga/LimeSDR-Mini_lms7_lelec210x/ip/fir/testbench/mentor/output_model.txt",fuse(output_q))
@@ -1,6 +1,8 @@
 import numpy as np
 from plot_utils import *
 
+from telecom.iq_words import load_words, unfuse
+
 # Parameters
 B = 50e3
 OSR = 8
@@ -35,16 +37,7 @@ nbit = 12
 qbit = 9
 output_array = np.fromfile("fpga/LimeSDR-Mini_lms7_lelec210x/ip/fir/testbench/mentor/output_float.txt",sep=",")
 
-def twos_complement(value,bits):
-    if value & (1 << (bits-1)):
-        value -= 1 << bits
-    return value
-
-output_array_fused_q = np.loadtxt("fpga/LimeSDR-Mini_lms7_lelec210x/ip/fir/testbench/mentor/output_fpga.txt",delimiter=" ",converters={0:lambda s: int(s,16)}).astype(np.int32)
-output_array_q = np.zeros((2*len(output_array_fused_q),))
-for i in range(len(output_array_fused_q)):
-  output_array_q[2*i]   = twos_complement((output_array_fused_q[i] >> nbit) & ((1 << nbit)-1),nbit)
-  output_array_q[2*i+1] = twos_complement(output_array_fused_q[i] & ((1 << nbit)-1),nbit)
+output_array_q = unfuse(load_words("fpga/LimeSDR-Mini_lms7_lelec210x/ip/fir/testbench/mentor/output_fpga.txt"), nbit)
 
 # Dequantize
 output_array_fq = (output_array_q.astype(float)) * (2**(-qbit)) / s
@@ -1,6 +1,15 @@
 import numpy as np
 from matplotlib import pyplot as plt
 
+from telecom.iq_words import (
+    fuse,
+    load_words,
+    save_words,
+    save_words_text,
+    to_complex,
+    unfuse,
+)
+
 # Input values
 startSample = 400
 endSample   = 400
@@ -28,32 +37,18 @@ for i in range(npacket):
 # Quantize
 nbit = 12
 qbit = 11
-input_array_q_interleaved = np.floor(input_array * (2 ** qbit)).astype(np.int32)
-input_array_q_interleaved = np.bitwise_and(input_array_q_interleaved, 0x0fff) # Overflow
-
-# Deinterleave
-input_array_q = np.zeros((ninput,)).astype(np.int32)
-for i in range(ninput):
-  input_array_q[i] = (input_array_q_interleaved[2*i] << nbit) | (input_array_q_interleaved[2*i+1])
-
-# Save
-np.savetxt("fpga/LimeSDR-Mini_lms7_lelec210x/ip/packet_presence_detection/testbench/mentor/input_fpga.txt",input_array_q,fmt="%.6x")
-
-def twos_complement(value,bits):
-    if value & (1 << (bits-1)):
-        value -= 1 << bits
-    return value
-
-
-output_array_fused_q = np.loadtxt("fpga/LimeSDR-Mini_lms7_lelec210x/ip/packet_presence_detection/testbench/mentor/input_fpga.txt",delimiter=" ",converters={0:lambda s: int(s,16)}).astype(np.int32)
-output_array_q = np.zeros((len(output_array_fused_q),),dtype=np.complex64)
-for i in range(len(output_array_fused_q)):
-  output_array_q[i ]  = twos_complement((output_array_fused_q[i] >> nbit) & ((1 << nbit)-1),nbit) +1j* twos_complement(output_array_fused_q[i] & ((1 << nbit)-1),nbit)
+input_array_q_interleaved = np.floor(input_array * (2 ** qbit)).astype(np.int64) # Overflow: wraps in fuse
 
+# Fuse I/Q into words
+input_array_q = fuse(input_array_q_interleaved, nbit)
 
+# Save (text for ModelSim, binary for large stimuli)
+save_words_text("fpga/LimeSDR-Mini_lms7_lelec210x/ip/packet_presence_detection/testbench/mentor/input_fpga.txt",input_array_q,nbit)
+save_words("fpga/LimeSDR-Mini_lms7_lelec210x/ip/packet_presence_detection/testbench/mentor/input_fpga.bin",input_array_q)
 
-output_array_q = (output_array_q) * (2**(-qbit))
+output_array_fused_q = load_words("fpga/LimeSDR-Mini_lms7_lelec210x/ip/packet_presence_detection/testbench/mentor/input_fpga.txt")
+output_array_q = to_complex(unfuse(output_array_fused_q, nbit), qbit)
 
 plt.figure()
 plt.plot(np.arange(len(output_array_q)),np.abs(output_array_q))
-plt.show()
\ No newline at end of file
+plt.show()
@@ -1,27 +1,29 @@
+import sys
+
 import numpy as np
 from matplotlib import pyplot as plt
-from numpy.core.numeric import zeros_like
+
+from telecom.iq_words import load_words, to_complex, unfuse
+from telecom.ppd import PacketPresenceDetector, insert_markers
 
 # Dequantize
 nbit = 12
 qbit = 11
 
-def twos_complement(value,bits):
-    if value & (1 << (bits-1)):
-        value -= 1 << bits
-    return value
-
 def load_array(fileName, nbit, qbit):
-    array_fused_q= np.loadtxt(fileName,delimiter=" ",converters={0:lambda s: int(s,16)}).astype(np.int32)
-    array_q = np.zeros((len(array_fused_q),),dtype = np.complex64)
-    for i in range(len(array_fused_q)):
-      array_q[i ]  = twos_complement((array_fused_q[i] >> nbit) & ((1 << nbit)-1),nbit) + 1j *twos_complement(array_fused_q[i] & ((1 << nbit)-1),nbit)
-    return (array_q) * (2**(-qbit))
+    # Text (.txt) or binary file
+    return to_complex(unfuse(load_words(fileName), nbit), qbit)
 
 
 output_array = load_array("fpga/LimeSDR-Mini_lms7_lelec210x/ip/packet_presence_detection/testbench/mentor/output_fpga.txt", nbit, qbit)
 input_array  = load_array("fpga/LimeSDR-Mini_lms7_lelec210x/ip/packet_presence_detection/testbench/mentor/input_fpga.txt", nbit, qbit)
 
+# Golden model, with the configuration of test_program.sv (cfg_THRESHOLD = 20, cfg_PASSTHROUGH_LEN = 100)
+input_words  = load_words("fpga/LimeSDR-Mini_lms7_lelec210x/ip/packet_presence_detection/testbench/mentor/input_fpga.txt")
+output_words = load_words("fpga/LimeSDR-Mini_lms7_lelec210x/ip/packet_presence_detection/testbench/mentor/output_fpga.txt")[:len(input_words)]
+detections   = PacketPresenceDetector(threshold=20/8, passthrough_len=100).process(unfuse(input_words, nbit))
+mismatches   = np.flatnonzero(insert_markers(input_words, detections, nbit) != output_words)
+
 
 fig, ax = plt.subplots(2,1,figsize=(12,8))
 ax[0].plot(np.arange(len(output_array)), np.real(output_array) , label = "Output of Packet Presence Detection")
@@ -35,4 +37,7 @@ ax[1].set_ylabel("Imaginary part")
 ax[1].set_xlabel("Sample number")
 ax[0].legend()
 plt.show()
-pass
\ No newline at end of file
+
+# Comparison gate: fails (exit status 1) if the IP differs from the model
+if len(mismatches):
+    sys.exit(f"Samples that differ from the model: {mismatches} (detections of the model: {detections})")
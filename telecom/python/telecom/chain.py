@@ -1,6 +1,13 @@
 # ruff: noqa: N806
 import numpy as np
 
+from .dsp import (
+    energy_detect,
+    noncoherent_demodulate,
+    power_ratio_detect,
+    sto_estimate,
+)
+
 BIT_RATE = 50e3
 PREAMBLE = np.array([int(bit) for bit in f"{0xAAAAAAAA:0>32b}"])
 SYNC_WORD = np.array([int(bit) for bit in f"{0x3E2A54B7:0>32b}"])
@@ -42,6 +49,25 @@ FPGA_FIR_TAPS = np.array(
 )  # Example coefficients
 
 
+def batched(method):
+    """
+    Mark a Rx method as able to process several received signals at once.
+
+    The simulator then calls the method with a batch of signals,
+    (..., N * R), instead of calling it once per signal. Non-marked methods
+    keep receiving one signal, (N * R,), at a time.
+    """
+    method.batched = True
+    return method
+
+
+def _index_or_none(idx: np.ndarray) -> np.ndarray | int | None:
+    """Return a single index as an integer, or None if not found (-1)."""
+    if np.ndim(idx) > 0:
+        return idx
+    return int(idx) if idx >= 0 else None
+
+
 class Chain:
     name: str = ""
 
@@ -86,31 +112,32 @@ class Chain:
 
         Uses Continuous-Phase FSK modulation.
 
-        :param bits: The bit stream, (N,).
-        :return: The modulates bit sequence, (N * R,).
+        Several streams can be modulated at once by stacking them
+        along the leading axes, e.g., (n_packets, N).
+
+        :param bits: The bit stream, (..., N).
+        :return: The modulates bit sequence, (..., N * R).
         """
         fd = self.freq_dev  # Frequency deviation, Delta_f
         B = self.bit_rate  # B=1/T
         h = 2 * fd / B  # Modulation index
         R = self.osr_tx  # Oversampling factor
 
-        x = np.zeros(len(bits) * R, dtype=np.complex64)
+        bits = np.asarray(bits)
         ph = 2 * np.pi * fd * (np.arange(R) / R) / B  # Phase of reference waveform
 
-        phase_shifts = np.zeros(
-            len(bits) + 1
-        )  # To store all phase shifts between symbols
-        phase_shifts[0] = 0  # Initial phase
+        signs = np.where(bits, 1.0, -1.0)  # +1 for bit 1, -1 for bit 0
+
+        # Starting phase of each symbol, i.e., the accumulated phase shifts
+        # of all previous symbols (initial phase is 0)
+        phase_shifts = np.zeros(bits.shape)
+        phase_shifts[..., 1:] = np.cumsum(h * np.pi * signs[..., :-1], axis=-1)
 
-        for i, b in enumerate(bits):
-            x[i * R : (i + 1) * R] = np.exp(1j * phase_shifts[i]) * np.exp(
-                1j * (1 if b else -1) * ph
-            )  # Sent waveforms, with starting phase coming from previous symbol
-            phase_shifts[i + 1] = phase_shifts[i] + h * np.pi * (
-                1 if b else -1
-            )  # Update phase to start with for next symbol
+        # Sent waveforms, with starting phase coming from previous symbol
+        phase = phase_shifts[..., None] + signs[..., None] * ph
+        x = np.exp(1j * phase).astype(np.complex64)
 
-        return x
+        return x.reshape(*bits.shape[:-1], bits.shape[-1] * R)
 
     # Rx methods
     ideal_preamble_detect: bool = False
@@ -124,6 +151,8 @@ class Chain:
         :param y: The received signal, (N * R,).
         :return: The index where the preamble starts,
             or None if not found.
+            If marked with :func:`batched`, indices are returned as
+            an integer array, (...,), with -1 when not found.
         """
         raise NotImplementedError
 
@@ -134,6 +163,8 @@ class Chain:
         :param y: The received signal, (N * R,).
         :return: The index where the preamble starts,
             or None if not found.
+            If marked with :func:`batched`, indices are returned as
+            an integer array, (...,), with -1 when not found.
         """
         raise NotImplementedError
 
@@ -156,6 +187,8 @@ class Chain:
 
         :param y: The received signal, (N * R,).
         :return: The estimated STO.
+            If marked with :func:`batched`, a batch of signals, (..., N * R),
+            gives an array of STOs, (...,).
         """
         raise NotImplementedError
 
@@ -165,6 +198,8 @@ class Chain:
 
         :param y: The received signal, (N * R,).
         :return: The signal, after demodulation.
+            If marked with :func:`batched`, a batch of signals, (..., N * R),
+            gives a batch of demodulated signals, (..., N).
         """
         raise NotImplementedError
 
@@ -178,6 +213,7 @@ class BasicChain(Chain):
 
     use_dynamic_ppd = True
 
+    @batched
     def preamble_detect_ppd(self, y):
         """Detect a preamble computing the received energy (average on a window)."""
         long_term_sum_W = 256
@@ -185,37 +221,18 @@ class BasicChain(Chain):
 
         K = 5 * (short_term_sum_W / long_term_sum_W)
 
-        long_window = np.ones(long_term_sum_W)
-        short_window = np.ones(short_term_sum_W)
-
-        yabs = np.abs(y)
-        ylen = len(y)
-        long_sum = np.convolve(yabs, long_window, mode="full")
-        short_sum = np.convolve(yabs, short_window, mode="full")
-
-        long_sum = long_sum[long_term_sum_W:ylen]
-        short_sum = short_sum[long_term_sum_W + short_term_sum_W - 1 :]
-
-        detection = short_sum > (long_sum * K)
-        detected_indices = np.where(detection)[0]
-        first_idx = (
-            (detected_indices[0] + long_term_sum_W + short_term_sum_W)
-            if detected_indices.size > 0
-            else None
+        # Running sums, stopping at the first detection
+        return _index_or_none(
+            power_ratio_detect(y, long_term_sum_W, short_term_sum_W, K)
         )
-        return first_idx
 
+    @batched
     def preamble_detect(self, y):
         """Detect a preamble computing the received energy (average on a window)."""
         L = 4 * self.osr_rx
-        y_abs = np.abs(y)
-
-        for i in range(0, int(len(y) / L)):
-            sum_abs = np.sum(y_abs[i * L : (i + 1) * L])
-            if sum_abs > (L - 1):  # fix threshold
-                return i * L
+        threshold = (L - 1) / L  # fix threshold
 
-        return None
+        return _index_or_none(energy_detect(y, L, threshold))
 
     ideal_cfo_estimation = True
 
@@ -230,41 +247,18 @@ class BasicChain(Chain):
 
     ideal_sto_estimation = True
 
+    @batched
     def sto_estimation(self, y):
         """Estimates symbol timing (fractional) based on phase shifts."""
-        R = self.osr_rx
-
-        # Computation of derivatives of phase function
-        phase_function = np.unwrap(np.angle(y))
-        phase_derivative_1 = phase_function[1:] - phase_function[:-1]
-        phase_derivative_2 = np.abs(phase_derivative_1[1:] - phase_derivative_1[:-1])
-
-        sum_der_saved = -np.inf
-        save_i = 0
-        for i in range(0, R):
-            sum_der = np.sum(phase_derivative_2[i::R])  # Sum every R samples
-
-            if sum_der > sum_der_saved:
-                sum_der_saved = sum_der
-                save_i = i
-
-        return np.mod(save_i + 1, R)
+        return sto_estimate(y, self.osr_rx)
 
+    @batched
     def demodulate(self, y):
         """Non-coherent demodulator."""
         R = self.osr_rx  # Receiver oversampling factor
-        nb_syms = len(y) // R  # Number of CPFSK symbols in y
-
-        # Group symbols together, in a matrix. Each row contains the R samples over one symbol period
-        y = np.resize(y, (nb_syms, R))
-
-        # TO DO: generate the reference waveforms used for the correlation
-        # hint: look at what is done in modulate() in chain.py
-
-        # TO DO: compute the correlations with the two reference waveforms (r0 and r1)
-
-        # TO DO: performs the decision based on r0 and r1
 
-        bits_hat = np.zeros(nb_syms, dtype=int)
+        # Correlations of each symbol with the two (cached) reference waveforms,
+        # computed with one matrix product
+        bits_hat = noncoherent_demodulate(y, self.bit_rate, R, self.freq_dev)
 
-        return bits_hat
+        return bits_hat.astype(int)
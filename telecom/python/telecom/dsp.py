@@ -0,0 +1,423 @@
+# ruff: noqa: N803, N806
+"""
+Signal processing kernels of the receiver, vectorized over batches of signals.
+
+The same kernels are used by the GNU Radio blocks (see
+telecom/sdr/gr-fsk/python/dsp.py, that must be kept in sync with this file,
+as checked by test_dsp.py), so the simulated and the real receivers behave
+the same.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def energy_detect(y, L, threshold):
+    """
+    Detect a packet by the energy of its samples, computed by windows of L samples.
+
+    :param y: The received signals, (..., N).
+    :param L: The length of the windows.
+    :param threshold: The threshold on the average amplitude of a window.
+    :return: The index where the first window above the threshold starts,
+        or -1 if not found, (...,).
+    """
+    n_windows = y.shape[-1] // L
+    if n_windows == 0:
+        return np.full(y.shape[:-1], -1)
+
+    y_abs = np.abs(y[..., : n_windows * L])
+    energy = y_abs.reshape(*y.shape[:-1], n_windows, L).sum(axis=-1)
+
+    detected = energy > threshold * L
+    first = np.argmax(detected, axis=-1)  # 0 if not detected
+    return np.where(np.any(detected, axis=-1), first * L, -1)
+
+
+class EnergyDetector:
+    """
+    Streaming version of :func:`energy_detect`.
+
+    Windows are aligned on the start of the stream, and the samples of the
+    last, incomplete, window of a buffer are kept for the next buffer.
+    Hence, a packet that straddles two buffers is found as if the whole
+    stream was processed at once.
+    """
+
+    def __init__(self, L, threshold):
+        self.L = L
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        """Start a new stream, e.g., after a detection or a discontinuity."""
+        self.tail = np.zeros(0, dtype=np.float32)
+
+    def process(self, y):
+        """
+        Process the next buffer of the stream.
+
+        :param y: The buffer, (N,).
+        :return: The index, relative to the start of y, where the first window
+            above the threshold starts (negative if the window started in the
+            previous buffer), or None if not found.
+        """
+        y_abs = np.concatenate((self.tail, np.abs(y)))
+        n_windows = len(y_abs) // self.L
+        offset = len(self.tail)
+        self.tail = y_abs[n_windows * self.L :]
+
+        energy = y_abs[: n_windows * self.L].reshape(n_windows, self.L).sum(axis=1)
+        detected = np.flatnonzero(energy > self.threshold * self.L)
+        if detected.size == 0:
+            return None
+
+        return int(detected[0]) * self.L - offset
+
+
+class PowerRatioDetector:
+    """
+    Streaming packet detector, comparing the energy on a short window
+    to the energy on the long window just before it.
+
+    A packet is detected when the sum of |y| on the short window is more
+    than K times the sum on the long window. Both sums are running sums,
+    computed from one cumulative sum per buffer. The last samples of a buffer
+    are kept for the next one, so results do not depend on how the stream
+    is split in buffers. Several streams can be processed at once by
+    stacking them along the leading axes.
+    """
+
+    def __init__(self, long_len=256, short_len=32, K=5 * (32 / 256)):
+        self.long_len = long_len
+        self.short_len = short_len
+        self.K = K
+        self.reset()
+
+    def reset(self):
+        """Start a new stream, e.g., after a detection or a discontinuity."""
+        self.history = None  # Last amplitudes of the stream
+        self.n_seen = 0  # Number of samples of the stream processed so far
+
+    def process(self, y):
+        """
+        Process the next buffer of the stream.
+
+        :param y: The buffer, (..., N).
+        :return: The index, relative to the start of y, just after the first
+            short window above the threshold, or -1 if not found, (...,).
+        """
+        S = self.short_len
+        H = self.long_len + self.short_len - 1  # Samples needed by one decision
+
+        y_abs = np.abs(y).astype(np.float64)
+        if self.history is None:
+            self.history = np.zeros((*y.shape[:-1], 0))
+
+        buf = np.concatenate((self.history, y_abs), axis=-1)
+        n_hist = self.history.shape[-1]
+        start = self.n_seen - n_hist  # Index of buf[0] in the stream
+
+        self.history = buf[..., max(buf.shape[-1] - H, 0) :]
+        self.n_seen += y.shape[-1]
+
+        # Ends of the short windows not processed yet (the first window
+        # sample is never used, as with full convolutions)
+        first = max(n_hist + 1, self.long_len + self.short_len - start)
+        ends = np.arange(first, buf.shape[-1] + 1)
+        if ends.size == 0:
+            return np.full(y.shape[:-1], -1)
+
+        c = np.zeros((*buf.shape[:-1], buf.shape[-1] + 1))
+        np.cumsum(buf, axis=-1, out=c[..., 1:])
+
+        short_sum = c[..., ends] - c[..., ends - S]
+        long_sum = c[..., ends - S + 1] - c[..., ends - H]
+
+        detected = short_sum > long_sum * self.K
+        first_detected = np.argmax(detected, axis=-1)  # 0 if not detected
+        return np.where(np.any(detected, axis=-1), ends[first_detected] - n_hist, -1)
+
+
+def power_ratio_detect(y, long_len=256, short_len=32, K=5 * (32 / 256), chunk_len=4096):
+    """
+    Detect a packet in whole received signals, see :class:`PowerRatioDetector`.
+
+    The signals are processed by chunks, and processing stops as soon as
+    a packet is detected in all of them. The end of the signals is padded
+    with zeros, so the last short windows are partial.
+
+    :param y: The received signals, (..., N).
+    :param long_len: The length of the long window.
+    :param short_len: The length of the short window.
+    :param K: The threshold on the ratio of the short and long sums.
+    :param chunk_len: The number of samples processed at once.
+    :return: The index just after the first short window above the threshold,
+        or -1 if not found, (...,).
+    """
+    y = np.concatenate((y, np.zeros((*y.shape[:-1], short_len - 1))), axis=-1)
+
+    detector = PowerRatioDetector(long_len, short_len, K)
+    idx = np.full(y.shape[:-1], -1)
+
+    for start in range(0, y.shape[-1], chunk_len):
+        pos = detector.process(y[..., start : start + chunk_len])
+        idx = np.where((idx < 0) & (pos >= 0), start + pos, idx)
+        if np.all(idx >= 0):
+            break
+
+    return idx
+
+
+def sto_estimate(y, R):
+    """
+    Estimate the symbol timing (fractional) based on phase shifts.
+
+    The second derivative of the phase peaks at symbol transitions, so the
+    timing is the offset, in a symbol, where it sums the most.
+
+    :param y: The received signals, (..., N).
+    :param R: The oversampling factor.
+    :return: The estimated timing, in [0, R), (...,).
+    """
+    phase_function = np.unwrap(np.angle(y), axis=-1)
+    phase_derivative_2 = np.abs(np.diff(phase_function, n=2, axis=-1))
+
+    # Group samples by offset in a symbol: (..., n_syms, R)
+    n = phase_derivative_2.shape[-1]
+    n_syms = -(-n // R)
+    phase_derivative_2 = np.concatenate(
+        (phase_derivative_2, np.zeros((*y.shape[:-1], n_syms * R - n))), axis=-1
+    ).reshape(*y.shape[:-1], n_syms, R)
+
+    sum_der = phase_derivative_2.sum(axis=-2)  # Sum every R samples
+    return np.mod(np.argmax(sum_der, axis=-1) + 1, R)
+
+
+def chunk_moments(y):
+    """
+    Compute the mean and the sum of squared deviations of chunks of samples.
+
+    :param y: The chunks, (..., N).
+    :return: The means, (...,), and the sums of squared deviations
+        from the means, (...,).
+    """
+    mean = y.mean(axis=-1, dtype=np.result_type(y, np.complex128))
+    d = y - mean[..., None]
+    m2 = (np.square(d.real) + np.square(d.imag)).sum(axis=-1, dtype=np.float64)
+    return mean, m2
+
+
+class RunningVariance:
+    """
+    Streaming mean and variance of (complex) samples.
+
+    Chunks of any length are merged with the parallel algorithm of
+    Chan et al., a generalization of Welford's algorithm, so samples
+    never need to be stored, and the variance is as accurate as if all
+    samples were processed at once.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.mean = 0j
+        self.m2 = 0.0  # Sum of squared deviations from the mean
+
+    @property
+    def variance(self):
+        return self.m2 / self.n if self.n > 0 else np.nan
+
+    def merge(self, n, mean, m2):
+        """
+        Merge chunks of samples, given their statistics.
+
+        :param n: The number of samples of each chunk, (C,) or scalar.
+        :param mean: The means of the chunks, (C,).
+        :param m2: The sums of squared deviations of the chunks, (C,).
+        """
+        n = np.broadcast_to(n, np.shape(mean))
+        n_b = int(np.sum(n))
+        if n_b == 0:
+            return
+
+        # Statistics of all chunks together
+        mean_b = np.sum(n * mean) / n_b
+        m2_b = np.sum(m2) + np.sum(n * np.abs(mean - mean_b) ** 2)
+
+        # Merged with the previous samples
+        n_ab = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n_ab
+        self.m2 += m2_b + abs(delta) ** 2 * self.n * n_b / n_ab
+        self.n = n_ab
+
+    def update(self, y):
+        """Merge the samples of a buffer, (N,)."""
+        self.merge(len(y), *chunk_moments(y))
+
+
+def unit_phasors(freq, fs, n, dtype=np.complex64):
+    """
+    Return the samples of a complex exponential, starting with phase 0.
+
+    :param freq: The frequency of the exponential.
+    :param fs: The sampling frequency.
+    :param n: The number of samples.
+    :param dtype: The complex data type of the samples.
+    :return: exp(1j * 2 * pi * freq * k / fs), for k in [0, n), read-only.
+    """
+    phasors = np.exp(2j * np.pi * (freq / fs) * np.arange(n)).astype(dtype)
+    phasors.setflags(write=False)
+    return phasors
+
+
+class Rotator:
+    """
+    Streaming frequency shift, e.g., to correct a CFO.
+
+    The stream is multiplied by exp(1j * 2 * pi * freq * t) by blocks of
+    ``block_len`` samples: each block is the table of :func:`unit_phasors`,
+    times the phasor of its first sample. Only the latter is computed with
+    a transcendental function, from the phase of the stream, in cycles.
+    The phase is kept in [0, 1) between buffers, so it does not lose
+    precision on long streams. The table is kept until the frequency
+    changes, so one rotator should be kept per stream (e.g., per block),
+    and updated with :meth:`set_freq`.
+    """
+
+    def __init__(self, freq, fs, block_len=1024, dtype=np.complex64):
+        self.freq = freq
+        self.fs = fs
+        self.block_len = block_len
+        self.table = unit_phasors(freq, fs, block_len, dtype)
+        self.reset()
+
+    def set_freq(self, freq):
+        """Change the frequency, from the current phase."""
+        if freq != self.freq:
+            self.freq = freq
+            self.table = unit_phasors(freq, self.fs, self.block_len, self.table.dtype)
+
+    def reset(self, phase=0.0):
+        """Start a new stream, with the given phase (in cycles)."""
+        self.phase = phase % 1.0
+
+    def skip(self, n):
+        """Advance the phase by n samples, without processing them."""
+        self.phase = (self.phase + self.freq / self.fs * n) % 1.0
+
+    def process(self, y, out=None):
+        """
+        Shift the next buffer of the stream.
+
+        :param y: The buffer, (N,).
+        :param out: Where to write the shifted buffer, if given, (N,).
+        :return: The shifted buffer, (N,).
+        """
+        n = len(y)
+        n_blocks = -(-n // self.block_len)
+
+        block_step = self.freq / self.fs * self.block_len  # In cycles
+        block_phases = self.phase + block_step * np.arange(n_blocks)
+        block_phasors = np.exp(2j * np.pi * block_phases).astype(self.table.dtype)
+        phasors = (block_phasors[:, None] * self.table).ravel()[:n]
+        self.skip(n)
+
+        return np.multiply(y, phasors, out=out)
+
+
+@lru_cache
+def reference_waveforms(B, R, Fdev, dtype=np.complex128):
+    """
+    Return the (conjugated) reference waveforms of the two CPFSK symbols.
+
+    Results are cached, as they only depend on the chain parameters.
+
+    :param B: The bit rate.
+    :param R: The oversampling factor.
+    :param Fdev: The frequency deviation.
+    :param dtype: The complex data type of the waveforms.
+    :return: The waveforms of bits 0 and 1, as columns, (R, 2), read-only.
+    """
+    ph = 2 * np.pi * Fdev * np.arange(R) / (R * B)  # Phase of reference waveform
+    refs = np.exp(-1j * np.stack((-ph, ph), axis=-1)).astype(dtype)
+    refs.setflags(write=False)
+    return refs
+
+
+def demodulate_symbols(symbols, B, R, Fdev):
+    """
+    Non-coherent demodulator, on received signals grouped by symbols.
+
+    Each symbol is correlated with the reference waveforms of bits 0 and 1,
+    all at once with one matrix product, and the bit with the largest
+    correlation (in absolute value) is chosen.
+
+    :param symbols: The received symbols, (..., n_syms, R).
+    :param B: The bit rate.
+    :param R: The oversampling factor.
+    :param Fdev: The frequency deviation.
+    :return: The demodulated bits, (..., n_syms), as uint8.
+    """
+    refs = reference_waveforms(B, R, Fdev, np.result_type(symbols, np.complex64))
+    r = np.abs(symbols.reshape(-1, R) @ refs)  # Correlations with r0 and r1
+    bits_hat = r[:, 1] > r[:, 0]
+
+    return bits_hat.view(np.uint8).reshape(symbols.shape[:-1])
+
+
+def noncoherent_demodulate(y, B, R, Fdev):
+    """
+    Non-coherent demodulator, see :func:`demodulate_symbols`.
+
+    :param y: The received signals, (..., N). The last N % R samples are ignored.
+    :param B: The bit rate.
+    :param R: The oversampling factor.
+    :param Fdev: The frequency deviation.
+    :return: The demodulated bits, (..., N // R), as uint8.
+    """
+    n_syms = y.shape[-1] // R
+    symbols = y[..., : n_syms * R].reshape(*y.shape[:-1], n_syms, R)
+
+    return demodulate_symbols(symbols, B, R, Fdev)
+
+
+def extract_frames(frames, hdr_len, payload_len, crc_len, address):
+    """
+    Find the address in the header of received frames, and extract
+    the payload and CRC bytes that follow it.
+
+    The header bits are correlated with the address (as +1/-1 symbols) at
+    all positions at once, and the payload starts after the best match.
+
+    :param frames: The received bytes, (..., n_bytes).
+    :param hdr_len: The number of bytes of the header.
+    :param payload_len: The number of bytes of the payload.
+    :param crc_len: The number of bytes of the CRC.
+    :param address: The bits of the address, (A,).
+    :return: The payload bytes, (..., payload_len), the CRC bytes,
+        (..., crc_len), and whether the frames were long enough to contain
+        them after the address, (...,).
+    """
+    b = np.unpackbits(frames, axis=-1)  # bytes to bits
+    address = np.asarray(address, dtype=np.int8) * 2 - 1
+    A = len(address)
+
+    # Full correlation of header and address
+    b_hdr = b[..., : hdr_len * 8].astype(np.int8) * 2 - 1
+    pad = [(0, 0)] * (b.ndim - 1) + [(A - 1, A - 1)]
+    windows = sliding_window_view(np.pad(b_hdr, pad), A, axis=-1)
+    v = np.abs(windows @ address)
+    i = np.argmax(v, axis=-1) + 1
+
+    n_bits = (payload_len + crc_len) * 8
+    valid = i + n_bits <= b.shape[-1]
+    idx = np.minimum(i[..., None] + np.arange(n_bits), b.shape[-1] - 1)
+    pkt_bytes = np.packbits(np.take_along_axis(b, idx, axis=-1), axis=-1)
+
+    return pkt_bytes[..., :payload_len], pkt_bytes[..., payload_len:], valid
@@ -0,0 +1,127 @@
+# ruff: noqa: N803, N806
+"""
+FIR filtering of batches of signals, with precomputed designs.
+
+Filter designs, i.e., the taps and their FFTs, only depend on a few
+parameters, so they are cached: a simulation designs its low-pass filter
+once, and computes the FFT of its taps once per FFT length. Signals are
+filtered by direct convolution for short filters, and by overlap-save FFT
+convolution otherwise, whichever is estimated to be the cheapest.
+"""
+
+import math
+from functools import lru_cache
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import fft
+from scipy.signal import firwin
+
+# Cost of one multiply-add of the direct convolution, relative to the
+# N*log2(N) operations of an FFT (measured with NumPy and SciPy: direct
+# convolution is faster for filters up to about 10 taps).
+DIRECT_COST = 1.5
+
+
+class FIRFilter:
+    """
+    FIR filter, applied along the last axis of a batch of signals.
+
+    :param taps: The taps of the filter, (M,).
+    """
+
+    linear = True
+
+    def __init__(self, taps: np.ndarray):
+        self.taps = np.array(taps)
+        self.taps.setflags(write=False)
+        self.spectra = {}  # FFT of the taps, by FFT length
+
+    def __len__(self) -> int:
+        return len(self.taps)
+
+    def spectrum(self, nfft: int) -> np.ndarray:
+        """Return the FFT of the taps, on nfft points (cached)."""
+        if nfft not in self.spectra:
+            H = fft.fft(self.taps, nfft)
+            H.setflags(write=False)
+            self.spectra[nfft] = H
+        return self.spectra[nfft]
+
+    def fft_len(self, N: int) -> int:
+        """Return the FFT length of overlap-save, for signals of N samples."""
+        M = len(self.taps)
+        # Blocks about 8 times longer than the filter, but not much longer
+        # than the whole (full) output
+        return fft.next_fast_len(min(8 * M, N + M - 1))
+
+    def use_fft(self, N: int) -> bool:
+        """Return whether overlap-save is cheaper than direct convolution."""
+        M = len(self.taps)
+        nfft = self.fft_len(N)
+        n_blocks = -(-(N + M - 1) // (nfft - M + 1))
+        fft_cost = n_blocks * (2 * nfft * math.log2(nfft) + nfft)
+        return fft_cost < DIRECT_COST * N * M
+
+    def direct(self, y: np.ndarray) -> np.ndarray:
+        """Return the full convolution of the signals with the taps, (..., N+M-1)."""
+        M = len(self.taps)
+        N = y.shape[-1]
+        dtype = np.result_type(y, self.taps)
+        out = np.zeros((*y.shape[:-1], N + M - 1), dtype=dtype)
+        for k, tap in enumerate(self.taps):
+            out[..., k : k + N] += tap * y
+        return out
+
+    def overlap_save(self, y: np.ndarray) -> np.ndarray:
+        """Return the full convolution of the signals with the taps, (..., N+M-1)."""
+        M = len(self.taps)
+        N = y.shape[-1]
+        nfft = self.fft_len(N)
+        L = nfft - M + 1  # Valid output samples per block
+        n_blocks = -(-(N + M - 1) // L)
+
+        # Blocks of nfft samples, overlapping by M-1 samples
+        pad = [(0, 0)] * (y.ndim - 1) + [(M - 1, n_blocks * L - N)]
+        blocks = sliding_window_view(np.pad(y, pad), nfft, axis=-1)[..., ::L, :]
+
+        Y = fft.fft(blocks, axis=-1)
+        Y *= self.spectrum(nfft)
+        out = fft.ifft(Y, axis=-1, overwrite_x=True)[..., M - 1 :]
+        out = out.reshape(*y.shape[:-1], n_blocks * L)[..., : N + M - 1]
+        if not np.iscomplexobj(y) and not np.iscomplexobj(self.taps):
+            out = out.real
+        return out
+
+    def __call__(self, y: np.ndarray, mode: str = "same") -> np.ndarray:
+        """
+        Filter a batch of signals, e.g., of shape (SNR, packet, sample).
+
+        :param y: The signals, (..., N).
+        :param mode: "full" or "same", as for :func:`numpy.convolve`.
+        :return: The filtered signals, (..., N+M-1) or (..., N).
+        """
+        y = np.asarray(y)
+        N = y.shape[-1]
+        out = self.overlap_save(y) if self.use_fft(N) else self.direct(y)
+
+        if mode == "full":
+            return out
+        if mode == "same":
+            start = (len(self.taps) - 1) // 2
+            return out[..., start : start + N]
+        raise ValueError(f"Unsupported mode: {mode}")
+
+
+@lru_cache(maxsize=16)
+def lowpass_filter(numtaps: int, cutoff: float, fs: float) -> FIRFilter:
+    """
+    Return a low-pass filter, designed with :func:`scipy.signal.firwin`.
+
+    Filters are cached, with the FFTs of their taps.
+
+    :param numtaps: The number of taps.
+    :param cutoff: The cutoff frequency.
+    :param fs: The sampling frequency.
+    """
+    return FIRFilter(firwin(numtaps, cutoff, fs=fs))
@@ -0,0 +1,347 @@
+# ruff: noqa: N806
+"""
+Bit-exact model of the fixed-point FIR filter of the FPGA.
+
+Numbers are two's complement, in the Qm.n format of the FIR testbench
+(see fpga/LimeSDR-Mini_lms7_lelec210x/ip/fir/testbench/python): m integer
+bits, *including* the sign bit, and n fractional bits. E.g., the 12-bit
+samples of the LMS7002M are Q1.11, and the 8-bit taps are Q1.7.
+
+Quantized values are int64 arrays, of the integer value times 2**n.
+All operations are vectorized, over batches of signals.
+"""
+
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class QFormat:
+    """Two's complement fixed-point format, with m integer and n fractional bits."""
+
+    m: int
+    n: int
+
+    @property
+    def bits(self) -> int:
+        return self.m + self.n
+
+    @property
+    def min_int(self) -> int:
+        return -(1 << (self.bits - 1))
+
+    @property
+    def max_int(self) -> int:
+        return (1 << (self.bits - 1)) - 1
+
+    def __str__(self) -> str:
+        return f"Q{self.m}.{self.n}"
+
+
+# Formats of the FIR of the FPGA (see 2_compute_bounds.py of the testbench)
+TAPS_FORMAT = QFormat(1, 7)
+INPUT_FORMAT = QFormat(1, 11)  # 12-bit samples of the LMS7002M
+OUTPUT_FORMAT = QFormat(3, 9)
+
+
+def round_shift(q: np.ndarray, shift: int, rounding: str = "floor") -> np.ndarray:
+    """
+    Divide integers by 2**shift, rounding the result.
+
+    :param q: The integers, int64.
+    :param shift: The number of fractional bits to drop (negative to add bits).
+    :param rounding: "floor" (truncation of the LSBs), "fix" (towards zero),
+        "round" (to nearest, halves up) or "convergent" (to nearest, halves
+        to even).
+    :return: The rounded integers, int64.
+    """
+    q = np.asarray(q, dtype=np.int64)
+    if shift <= 0:
+        return q << -shift
+    if rounding == "floor":
+        return q >> shift
+    if rounding == "fix":
+        return np.where(q < 0, -((-q) >> shift), q >> shift)
+    if rounding == "round":
+        return (q + (1 << (shift - 1))) >> shift
+    if rounding == "convergent":
+        floor = q >> shift
+        rem = q & ((1 << shift) - 1)
+        half = 1 << (shift - 1)
+        return floor + ((rem > half) | ((rem == half) & (floor & 1 == 1)))
+    raise ValueError(f"Unknown rounding mode: {rounding}")
+
+
+def overflow(q: np.ndarray, fmt: QFormat, mode: str = "saturate") -> np.ndarray:
+    """
+    Bring integers in the range of a format.
+
+    :param q: The integers, int64.
+    :param fmt: The format.
+    :param mode: "saturate" (clip to the range) or "wrap" (drop the MSBs).
+    :return: The integers, int64.
+    """
+    if mode == "saturate":
+        return np.clip(q, fmt.min_int, fmt.max_int)
+    if mode == "wrap":
+        return ((q - fmt.min_int) & ((1 << fmt.bits) - 1)) + fmt.min_int
+    raise ValueError(f"Unknown overflow mode: {mode}")
+
+
+def quantize(
+    x: np.ndarray,
+    fmt: QFormat,
+    rounding: str = "floor",
+    overflow_mode: str = "saturate",
+) -> np.ndarray:
+    """
+    Quantize real values.
+
+    :param x: The values.
+    :param fmt: The format.
+    :param rounding: See :func:`round_shift`.
+    :param overflow_mode: See :func:`overflow`.
+    :return: The quantized values, int64.
+    """
+    x = np.asarray(x, dtype=float) * 2.0**fmt.n
+    if rounding == "floor":
+        q = np.floor(x)
+    elif rounding == "fix":
+        q = np.fix(x)
+    elif rounding == "round":
+        q = np.floor(x + 0.5)
+    elif rounding == "convergent":
+        q = np.rint(x)  # Halves to even
+    else:
+        raise ValueError(f"Unknown rounding mode: {rounding}")
+    return overflow(q.astype(np.int64), fmt, overflow_mode)
+
+
+def dequantize(q: np.ndarray, fmt: QFormat) -> np.ndarray:
+    """Return the real values of quantized values."""
+    return np.asarray(q, dtype=float) * 2.0**-fmt.n
+
+
+def auto_scale(taps: np.ndarray, fmt: QFormat) -> float:
+    """
+    Return the scaling factor of the taps, as the 'Auto' scaling of the FIR IP:
+    the largest one such that the taps fit in the format.
+    """
+    taps_max, taps_min = np.max(taps), np.min(taps)
+    if taps_max > -taps_min:
+        return (2.0 ** (fmt.m - 1) - 2.0**-fmt.n) / taps_max
+    return -(2.0 ** (fmt.m - 1)) / taps_min
+
+
+def interleave(x: np.ndarray) -> np.ndarray:
+    """Return the I/Q samples, as [I0, Q0, I1, Q1, ...], (..., 2N)."""
+    x = np.asarray(x)
+    return np.stack((x.real, x.imag), axis=-1).reshape(*x.shape[:-1], -1)
+
+
+def deinterleave(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return the I and the Q samples of interleaved samples, (..., N) each."""
+    x = np.asarray(x)
+    return x[..., 0::2], x[..., 1::2]
+
+
+def convolve_batch(x: np.ndarray, h: np.ndarray) -> np.ndarray:
+    """
+    Full convolution of a batch of integer signals, along the last axis.
+
+    Signals are concatenated, separated by zeros, so the whole batch
+    is convolved with a single call to :func:`numpy.convolve`.
+
+    :param x: The signals, int64, (..., N).
+    :param h: The taps, int64, (M,).
+    :return: The convolutions, int64, (..., N+M-1).
+    """
+    M = len(h)
+    N = x.shape[-1]
+    rows = x.reshape(-1, N)
+    padded = np.zeros((len(rows), N + M - 1), dtype=np.int64)
+    padded[:, :N] = rows
+    out = np.convolve(padded.ravel(), h)[: padded.size]
+    return out.reshape(*x.shape[:-1], N + M - 1)
+
+
+class FixedPointFIR:
+    """
+    Bit-exact model of the FPGA FIR filter, on I/Q samples.
+
+    Both I and Q are filtered by the same real taps: samples are multiplied
+    by the quantized taps and summed in the accumulator, which is then
+    rounded to the output format. With the default formats, the accumulator
+    has full precision (as in the FIR IP), and the result does not depend
+    on the order of the sums. With a narrower saturating accumulator, it is
+    saturated after each tap, in the order of the taps, as a single MAC.
+
+    :param taps: The real taps, (M,).
+    :param taps_format: The format of the quantized taps.
+    :param input_format: The format of the input samples.
+    :param output_format: The format of the output samples.
+    :param acc_format: The format of the accumulator (with
+        ``input.n + taps.n`` fractional bits), full precision by default.
+    :param scaling: "none", or "auto" to scale the taps to the full range of
+        their format (see :func:`auto_scale`). Outputs are then scaled back
+        by :meth:`__call__`.
+    :param taps_rounding: The rounding mode of the taps.
+    :param input_rounding: The rounding mode of the input samples.
+    :param output_rounding: The rounding mode of the output samples.
+    :param acc_overflow: The overflow mode of the accumulator.
+    :param output_overflow: The overflow mode of the output samples.
+    :param input_gain: The gain applied on the samples before quantization
+        by :meth:`__call__` (e.g., of the AGC), compensated at the output.
+    """
+
+    linear = False  # Quantization does not commute with the scaling of signals
+
+    def __init__(
+        self,
+        taps: np.ndarray,
+        taps_format: QFormat = TAPS_FORMAT,
+        input_format: QFormat = INPUT_FORMAT,
+        output_format: QFormat = OUTPUT_FORMAT,
+        acc_format: QFormat | None = None,
+        scaling: str = "auto",
+        taps_rounding: str = "fix",
+        input_rounding: str = "floor",
+        output_rounding: str = "floor",
+        acc_overflow: str = "wrap",
+        output_overflow: str = "saturate",
+        input_gain: float = 1.0,
+    ):
+        taps = np.asarray(taps, dtype=float)
+        self.scale = auto_scale(taps, taps_format) if scaling == "auto" else 1.0
+        self.taps_q = quantize(taps * self.scale, taps_format, taps_rounding)
+
+        # Bits needed by the sum of the products, without overflow:
+        # |sum| <= 2**(input bits - 1) * sum(|taps|), plus the sign bit
+        growth = math.ceil(math.log2(max(np.sum(np.abs(self.taps_q)), 1)))
+        acc_n = input_format.n + taps_format.n
+        acc_bits = input_format.bits + growth + 1
+        self.full_acc_format = QFormat(acc_bits - acc_n, acc_n)
+        if acc_format is None:
+            acc_format = self.full_acc_format
+        if acc_format.n != acc_n:
+            raise ValueError(f"The accumulator must have {acc_n} fractional bits")
+
+        self.taps_format = taps_format
+        self.input_format = input_format
+        self.output_format = output_format
+        self.acc_format = acc_format
+        self.input_rounding = input_rounding
+        self.output_rounding = output_rounding
+        self.acc_overflow = acc_overflow
+        self.output_overflow = output_overflow
+        self.input_gain = input_gain
+
+    def __len__(self) -> int:
+        return len(self.taps_q)
+
+    @property
+    def taps(self) -> np.ndarray:
+        """The quantized taps, as real values (without scaling)."""
+        return dequantize(self.taps_q, self.taps_format) / self.scale
+
+    def accumulate(self, x_q: np.ndarray) -> np.ndarray:
+        """
+        Return the accumulator, for each output sample (full convolution).
+
+        :param x_q: The quantized (real) samples, int64, (..., N).
+        :return: The accumulator, int64, (..., N+M-1).
+        """
+        x_q = np.asarray(x_q, dtype=np.int64)
+        full = self.acc_format.bits >= self.full_acc_format.bits
+
+        if not full and self.acc_overflow == "saturate":
+            M = len(self.taps_q)
+            N = x_q.shape[-1]
+            acc = np.zeros((*x_q.shape[:-1], N + M - 1), dtype=np.int64)
+            for k, tap in enumerate(self.taps_q):
+                acc[..., k : k + N] += tap * x_q
+                acc = overflow(acc, self.acc_format, "saturate")
+            return acc
+
+        # Without overflow, or wrapping (modular sums): any order is exact
+        acc = convolve_batch(x_q, self.taps_q)
+        return acc if full else overflow(acc, self.acc_format, "wrap")
+
+    def filter_int(self, x_q: np.ndarray) -> np.ndarray:
+        """
+        Filter quantized samples, as the FPGA (causal, N output samples).
+
+        :param x_q: The quantized (real) samples, int64, (..., N).
+        :return: The quantized output samples, int64, (..., N).
+        """
+        acc = self.accumulate(x_q)[..., : x_q.shape[-1]]
+        shift = self.acc_format.n - self.output_format.n
+        out = round_shift(acc, shift, self.output_rounding)
+        return overflow(out, self.output_format, self.output_overflow)
+
+    def filter_interleaved(self, x_q: np.ndarray) -> np.ndarray:
+        """
+        Filter quantized interleaved I/Q samples, as the FPGA.
+
+        When the accumulator has full precision, of at most 26 bits, I and Q
+        are packed in a single float64 (I * 2**bits + Q) and filtered with a
+        single convolution: all the partial sums are integers below 2**53,
+        so they are exact.
+
+        :param x_q: The quantized samples, [I0, Q0, I1, Q1, ...], int64, (..., 2N).
+        :return: The quantized output samples, interleaved, int64, (..., 2N).
+        """
+        x_q = np.asarray(x_q, dtype=np.int64)
+        i, q = deinterleave(x_q)
+        bits = self.full_acc_format.bits
+        if bits > 26 or self.acc_format.bits < bits:
+            out = np.stack((self.filter_int(i), self.filter_int(q)), axis=-1)
+            return out.reshape(x_q.shape)
+
+        M = len(self.taps_q)
+        N = i.shape[-1]
+        packed = np.zeros((*i.shape[:-1], N + M - 1))
+        np.multiply(i, 2.0**bits, out=packed[..., :N])
+        packed[..., :N] += q
+        acc = np.convolve(packed.ravel(), self.taps_q.astype(float))[: packed.size]
+        acc = acc.reshape(packed.shape)[..., :N].astype(np.int64)
+
+        out = np.empty(x_q.shape, dtype=np.int64)
+        half = 1 << (bits - 1)
+        out[..., 1::2] = ((acc + half) & ((1 << bits) - 1)) - half  # Q, signed
+        out[..., 0::2] = (acc - out[..., 1::2]) >> bits
+
+        shift = self.acc_format.n - self.output_format.n
+        out = round_shift(out, shift, self.output_rounding)
+        return overflow(out, self.output_format, self.output_overflow)
+
+    def __call__(self, y: np.ndarray, mode: str = "same") -> np.ndarray:
+        """
+        Filter a batch of complex signals, as :class:`telecom.filters.FIRFilter`.
+
+        Samples are quantized, filtered as by the FPGA, and dequantized.
+
+        :param y: The signals, (..., N).
+        :param mode: "full" or "same", as for :func:`numpy.convolve`.
+        :return: The filtered signals, (..., N+M-1) or (..., N).
+        """
+        M = len(self.taps_q)
+        y = np.asarray(y) * self.input_gain
+        N = y.shape[-1]
+        pad = [(0, 0)] * (y.ndim - 1) + [(0, M - 1)]
+        x_q = quantize(
+            interleave(np.pad(y, pad)), self.input_format, self.input_rounding
+        )
+
+        out_q = self.filter_interleaved(x_q)
+        out_i, out_q = deinterleave(dequantize(out_q, self.output_format))
+        out = (out_i + 1j * out_q) / (self.scale * self.input_gain)
+
+        if mode == "full":
+            return out
+        if mode == "same":
+            start = (M - 1) // 2
+            return out[..., start : start + N]
+        raise ValueError(f"Unsupported mode: {mode}")
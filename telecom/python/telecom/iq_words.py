@@ -0,0 +1,121 @@
+"""
+Fused I/Q words of the FPGA, and their files.
+
+The LMS7002M streams 12-bit I/Q samples, that the FPGA IPs handle as one
+word per sample: I in the high bits, and Q in the low bits. The testbenches
+read and write these words as text, one hexadecimal word per line, e.g.,
+``7ff800`` for I = 2047 and Q = -2048. Large stimuli are better stored
+in binary files, of little-endian uint32 words, that can be memory-mapped.
+
+All functions are vectorized; integers are two's complement.
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+HEX_VALUES = np.full(256, 255, dtype=np.uint8)  # 255 for invalid characters
+HEX_VALUES[HEX_DIGITS] = np.arange(16)
+HEX_VALUES[np.frombuffer(b"ABCDEF", dtype=np.uint8)] = np.arange(10, 16)
+
+
+def fuse(x_q: np.ndarray, nbit: int = 12) -> np.ndarray:
+    """
+    Fuse interleaved I/Q samples into words.
+
+    :param x_q: The samples, [I0, Q0, I1, Q1, ...], (..., 2N). Bits above
+        the nbit LSBs are dropped (i.e., samples wrap).
+    :param nbit: The number of bits of I and of Q.
+    :return: The words, uint32, (..., N).
+    """
+    x_q = np.asarray(x_q)
+    mask = (1 << nbit) - 1
+    i = x_q[..., 0::2].astype(np.uint32) & mask
+    q = x_q[..., 1::2].astype(np.uint32) & mask
+    return (i << nbit) | q
+
+
+def unfuse(words: np.ndarray, nbit: int = 12) -> np.ndarray:
+    """
+    Split words into interleaved I/Q samples, inverse of :func:`fuse`.
+
+    :param words: The words, (..., N).
+    :param nbit: The number of bits of I and of Q.
+    :return: The signed samples, [I0, Q0, I1, Q1, ...], int64, (..., 2N).
+    """
+    words = np.asarray(words, dtype=np.int64)
+    x_q = np.stack((words >> nbit, words), axis=-1).reshape(*words.shape[:-1], -1)
+    x_q &= (1 << nbit) - 1
+    x_q ^= 1 << (nbit - 1)  # Sign extension
+    x_q -= 1 << (nbit - 1)
+    return x_q
+
+
+def to_complex(x_q: np.ndarray, qbit: int = 11) -> np.ndarray:
+    """
+    Return the complex values of interleaved I/Q samples.
+
+    :param x_q: The samples, [I0, Q0, I1, Q1, ...], (..., 2N).
+    :param qbit: The number of fractional bits of the samples.
+    :return: The values, complex64, (..., N).
+    """
+    x = np.asarray(x_q, dtype=np.float32) * np.float32(2.0**-qbit)
+    return x.view(np.complex64)
+
+
+def save_words(path: Path, words: np.ndarray) -> None:
+    """Write words to a binary file (little-endian uint32)."""
+    np.asarray(words, dtype="<u4").tofile(path)
+
+
+def load_words(path: Path, mmap: bool = False) -> np.ndarray:
+    """
+    Read words from a file, binary or text (if its suffix is ``.txt``).
+
+    :param path: The file.
+    :param mmap: Whether to memory-map a binary file, rather than read it.
+    :return: The words, uint32, (N,).
+    """
+    if Path(path).suffix == ".txt":
+        return load_words_text(path)
+    if mmap:
+        return np.memmap(path, dtype="<u4", mode="r")
+    return np.fromfile(path, dtype="<u4")
+
+
+def save_words_text(path: Path, words: np.ndarray, nbit: int = 12) -> None:
+    """
+    Write words to a text file, one hexadecimal word per line
+    (as ``np.savetxt(path, words, fmt="%.6x")`` for 12-bit samples).
+    """
+    words = np.asarray(words, dtype=np.uint32).ravel()
+    n_digits = -(-2 * nbit // 4)
+    shifts = 4 * np.arange(n_digits - 1, -1, -1, dtype=np.uint32)
+
+    lines = np.empty((len(words), n_digits + 1), dtype=np.uint8)
+    lines[:, :-1] = HEX_DIGITS[(words[:, None] >> shifts) & 0xF]
+    lines[:, -1] = ord("\n")
+    Path(path).write_bytes(lines.tobytes())
+
+
+def load_words_text(path: Path) -> np.ndarray:
+    """
+    Read words from a text file, one hexadecimal word per line.
+
+    Lines of the same length are decoded at once; other files
+    are decoded word by word.
+    """
+    tokens = Path(path).read_bytes().split()
+    if not tokens:
+        return np.zeros(0, dtype=np.uint32)
+
+    n_digits = len(tokens[0])
+    if n_digits <= 8 and all(len(token) == n_digits for token in tokens):
+        digits = HEX_VALUES[np.frombuffer(b"".join(tokens), dtype=np.uint8)]
+        if np.all(digits < 16):
+            digits = digits.reshape(-1, n_digits).astype(np.uint32)
+            shifts = 4 * np.arange(n_digits - 1, -1, -1, dtype=np.uint32)
+            return np.bitwise_or.reduce(digits << shifts, axis=-1)
+
+    return np.array([int(token, 16) for token in tokens], dtype=np.uint32)
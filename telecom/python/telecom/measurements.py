@@ -0,0 +1,180 @@
+"""
+Readers of the measurements files written by the gr-fsk blocks.
+
+Binary files are written by ``MeasurementsSink``, in
+telecom/sdr/gr-fsk/python/measurements.py: they are a sequence of NumPy
+``.npy`` arrays, each one holding consecutive records of the same kind
+as a structured array. Text files, written by older versions of the blocks,
+have one record per line.
+"""
+
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+
+NPY_MAGIC = b"\x93NUMPY"
+
+# Records of text files, by kind (patterns start with a literal,
+# that is searched much faster than a line start)
+TEXT_RECORDS = {
+    ("cfo", "sto"): re.compile(rb"CFO=([^,\n]*),STO=([^,\n]*)\n"),
+    ("esn0", "grx", "n0"): re.compile(
+        rb"EsN0dB=([^,\n]*),GRXdB=([^,\n]*),N0=([^,\n]*)\n"
+    ),
+    ("packet_number", "correct", "payload"): re.compile(
+        rb"packet_number=([^,\n]*),correct=([^,\n]*),payload=\[(.*)\]\n"
+    ),
+}
+TEXT_DTYPES = {
+    "cfo": np.float64,
+    "sto": np.int64,
+    "esn0": np.float64,
+    "grx": np.float64,
+    "n0": np.float64,
+    "packet_number": np.int64,
+}
+
+
+def is_measurements_file(path: Path) -> bool:
+    """Return whether a file was written by ``MeasurementsSink`` (not as text)."""
+    with open(path, "rb") as f:
+        return f.read(len(NPY_MAGIC)) == NPY_MAGIC
+
+
+def read_measurements_file(path: Path) -> dict[str, np.ndarray]:
+    """
+    Read a measurements file, column by column.
+
+    :param path: The measurements file.
+    :return: The columns of all records, by field name, i.e.,
+        ``cfo`` and ``sto``; ``esn0``, ``grx`` and ``n0``;
+        and ``packet_number``, ``correct`` and ``payload``.
+        Columns of the same kind of record have the same length.
+    """
+    chunks = {}
+    with open(path, "rb") as f:
+        while f.peek(1):  # Until the end of the file
+            records = np.load(f)
+            for name in records.dtype.names:
+                chunks.setdefault(name, []).append(records[name])
+
+    return {name: np.concatenate(columns) for name, columns in chunks.items()}
+
+
+def check_payload_lengths(lengths: np.ndarray) -> None:
+    """
+    Check that all payloads have the same length, so they fit in one array.
+
+    :param lengths: The number of bytes of each payload.
+    :raises ValueError: If they do not.
+    """
+    if np.any(lengths != lengths[0]):
+        raise ValueError(
+            "Payloads of different lengths, e.g., "
+            f"{lengths[0]} and {lengths[lengths != lengths[0]][0]} bytes"
+        )
+
+
+def parse_text_chunk(text: bytes) -> dict[str, np.ndarray]:
+    """
+    Parse complete lines of a text measurements file.
+
+    The text must end with a newline.
+
+    Each kind of record is matched by one regular expression on the whole
+    text, and the captured values are converted by columns.
+
+    :raises ValueError: If the payloads do not all have the same length.
+    """
+    columns = {}
+    for names, pattern in TEXT_RECORDS.items():
+        values = pattern.findall(text)
+        if not values:
+            continue
+
+        for name, column in zip(names, zip(*values, strict=True), strict=True):
+            if name == "correct":
+                columns[name] = np.array(column) == b"True"
+            elif name == "payload":
+                check_payload_lengths(np.char.count(column, b",") + 1)
+                payloads = np.fromstring(
+                    b",".join(column).decode(), dtype=np.uint8, sep=","
+                )
+                columns[name] = payloads.reshape(len(column), -1)
+            else:
+                columns[name] = np.array(column).astype(TEXT_DTYPES[name])
+
+    return columns
+
+
+def read_text_measurements_file(
+    path: Path, chunk_size: int = 64 * 2**20
+) -> dict[str, np.ndarray]:
+    """
+    Read a text measurements file, column by column.
+
+    The file is parsed by chunks of (about) ``chunk_size`` bytes, cut
+    at line boundaries, so very large files never need to fit in memory
+    as text.
+
+    :param path: The measurements file.
+    :param chunk_size: The number of bytes read at once.
+    :return: The columns of all records, see :func:`read_measurements_file`.
+    """
+    chunks = {}
+    rest = b""  # Incomplete last line of the previous chunk
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            text = rest + data
+            if not data and rest:
+                text += b"\n"  # Last line, without newline
+            end = text.rfind(b"\n") + 1
+            rest = text[end:]
+
+            for name, column in parse_text_chunk(text[:end]).items():
+                chunks.setdefault(name, []).append(column)
+
+            if not data:
+                break
+
+    if "payload" in chunks:  # Also the same length in all chunks
+        check_payload_lengths(np.array([c.shape[1] for c in chunks["payload"]]))
+    return {name: np.concatenate(columns) for name, columns in chunks.items()}
+
+
+def load_measurements(path: Path, cache: bool = True) -> dict[str, np.ndarray]:
+    """
+    Read a binary or text measurements file, column by column.
+
+    Text files are slow to parse, so their columns are cached in a ``.npz``
+    file next to them (e.g., ``measurements.txt.npz``), used as long as
+    it is more recent than the text file.
+
+    :param path: The measurements file.
+    :param cache: Whether to use (and create) the cache of text files.
+    :return: The columns of all records, see :func:`read_measurements_file`.
+    """
+    path = Path(path)
+    if is_measurements_file(path):
+        return read_measurements_file(path)
+
+    cache_path = path.with_name(path.name + ".npz")
+    if (
+        cache
+        and cache_path.exists()
+        and cache_path.stat().st_mtime >= path.stat().st_mtime
+    ):
+        with np.load(cache_path) as columns:
+            return dict(columns)
+
+    columns = read_text_measurements_file(path)
+
+    if cache:
+        tmp_path = cache_path.with_suffix(".tmp.npz")
+        np.savez(tmp_path, **columns)
+        os.replace(tmp_path, cache_path)
+
+    return columns
@@ -0,0 +1,367 @@
+# ruff: noqa: N806
+"""
+Bit-exact model of the packet presence detector (PPD) of the FPGA.
+
+The detector (fpga/LimeSDR-Mini_lms7_lelec210x/ip/packet_presence_detection)
+estimates the magnitude of each 12-bit I/Q sample as max + min / 4 (of |I|
+and |Q|), and compares its running sum on a short window (32 samples) to its
+running sum on a long window (256 samples) of the samples before it. A packet
+is detected when the short sum is more than the threshold times the long sum,
+as integers (no rounding, no overflow). The detected sample is then replaced
+by a marker in the output stream, and the short sum is cleared for
+`passthrough_len` samples, while the packet goes through. The long sum is
+frozen meanwhile, so it only ever sums samples that went through the short
+window.
+
+The model processes the stream by blocks, with one cumulative sum per block:
+between two detections, both windows slide on the same contiguous sequence.
+It gives the same detections as the ModelSim testbench of the IP, for a
+continuous stream (one valid sample per clock cycle).
+"""
+
+from pathlib import Path
+
+import click
+import numpy as np
+
+from .fixed_point import INPUT_FORMAT, QFormat, interleave, quantize
+from .iq_words import fuse, load_words, unfuse
+
+SHORT_SUM_LEN = 32
+LONG_SUM_LEN = 256
+SHORT_SUM_SHIFT = 6  # The short sum is compared as short_sum << 6
+THRESHOLD_SCALE = 8  # The host writes int(threshold * 8) in cfg_THRESHOLD
+
+# The long window ends LONG_SUM_LAG samples before the start of the short
+# one (the long sum is registered once more), and the marker replaces the sample
+# MARKER_LAG samples before the end of the short window (pipeline)
+LONG_SUM_LAG = 2
+MARKER_LAG = 2
+
+# Samples of the stream needed by one decision
+HISTORY_LEN = LONG_SUM_LEN + SHORT_SUM_LEN + LONG_SUM_LAG
+
+
+def magnitude(x_q: np.ndarray) -> np.ndarray:
+    """
+    Return the magnitude estimates of quantized I/Q samples, as the FPGA.
+
+    :param x_q: The samples, [I0, Q0, I1, Q1, ...], int64, (..., 2N).
+    :return: The magnitudes, max(|I|, |Q|) + min(|I|, |Q|) // 4, int64, (..., N).
+    """
+    x_abs = np.abs(np.asarray(x_q, dtype=np.int64))
+    i, q = x_abs[..., 0::2], x_abs[..., 1::2]
+    return np.maximum(i, q) + (np.minimum(i, q) >> 2)
+
+
+def marker(nbit: int = 12) -> int:
+    """Return the word that replaces the detected samples in the output stream."""
+    full_scale = (1 << (nbit - 1)) - 1
+    return int(fuse([full_scale, full_scale], nbit)[0])
+
+
+def insert_markers(
+    words: np.ndarray, detections: np.ndarray, nbit: int = 12
+) -> np.ndarray:
+    """
+    Return the output stream of the FPGA: the input words, with markers.
+
+    :param words: The input words, (N,).
+    :param detections: The detections (see :meth:`PacketPresenceDetector.process`).
+    :param nbit: The number of bits of I and of Q.
+    :return: The output words, uint32, (N,).
+    """
+    out = np.array(words, dtype=np.uint32)
+    out[np.asarray(detections, dtype=int)] = marker(nbit)
+    return out
+
+
+class PacketPresenceDetector:
+    """
+    Bit-exact, streaming model of the packet presence detector of the FPGA.
+
+    :param threshold: The detection threshold, as set from GNU Radio: the
+        ratio of the average magnitudes on the short and long windows,
+        in steps of 1/8 (the FPGA register holds int(threshold * 8)).
+    :param passthrough_len: The number of samples after a detection during
+        which the detector is disabled (cfg_PASSTHROUGH_LEN).
+    :param input_format: The format of the samples, for :meth:`__call__`.
+    :param input_gain: The gain applied on the samples before quantization,
+        by :meth:`__call__`.
+    """
+
+    batched = True  # See telecom.chain.batched
+
+    def __init__(
+        self,
+        threshold: float = 15.0,
+        passthrough_len: int = 100,
+        input_format: QFormat = INPUT_FORMAT,
+        input_gain: float = 1.0,
+    ):
+        self.K = int(threshold * THRESHOLD_SCALE)
+        if not 0 <= self.K < 256:
+            raise ValueError(f"The threshold must be in [0, 32), got {threshold}")
+        self.threshold = threshold
+        self.passthrough_len = passthrough_len
+        self.input_format = input_format
+        self.input_gain = input_gain
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear the sums, as cfg_clear_rs."""
+        # Last magnitudes of the sequence of the long window: the samples
+        # that went through the short window (zeros after a clear)
+        self.history = np.zeros(HISTORY_LEN, dtype=np.int64)
+        self.n_short = 0  # Samples since the short sum was last cleared
+        self.n_long = 0  # Samples in the long sum, when it was last frozen
+        self.n_skip = 0  # Samples left before the short sum is enabled again
+        self.n_seen = 0  # Samples of the stream processed so far
+
+    def decisions(
+        self, mag: np.ndarray, n_short: int | np.ndarray, n_long: int | np.ndarray
+    ) -> np.ndarray:
+        """
+        Return whether each sample ends a short window above the threshold.
+
+        :param mag: The magnitudes, the last HISTORY_LEN ones of the sequence
+            of the long window first, (..., HISTORY_LEN + N).
+        :param n_short: The number of samples since the short sum was cleared,
+            at the first of the N samples.
+        :param n_long: The number of samples in the long sum, when it was
+            last frozen.
+        :return: The decisions, at the N samples (before they enter the
+            short window), (..., N).
+        """
+        S, L = SHORT_SUM_LEN, LONG_SUM_LEN
+        N = mag.shape[-1] - HISTORY_LEN
+        c = np.zeros((*mag.shape[:-1], mag.shape[-1] + 1), dtype=np.int64)
+        np.cumsum(mag, axis=-1, out=c[..., 1:])
+
+        ends = HISTORY_LEN + np.arange(N)  # Ends of the short windows
+        short_sum = c[..., ends] - c[..., ends - S]
+        long_end = ends - S - LONG_SUM_LAG + 1
+        long_sum = c[..., long_end] - c[..., long_end - L]
+
+        # The short window is filled once, and then forwarded to the long
+        # one, which needs L - 1 samples before the first decision
+        n = np.asarray(n_short)[..., None] + np.arange(N)
+        enabled = (n >= 2 * S) & (np.asarray(n_long)[..., None] + n - S >= L - 1)
+        return enabled & ((short_sum << SHORT_SUM_SHIFT) > self.K * long_sum)
+
+    def process(self, x_q: np.ndarray, chunk_len: int = 4096) -> np.ndarray:
+        """
+        Process the next samples of the stream.
+
+        :param x_q: The quantized samples, [I0, Q0, I1, Q1, ...], (2N,).
+        :param chunk_len: The maximum number of samples processed at once.
+            After a detection, the next samples are processed by shorter
+            blocks, doubled up to chunk_len, as the next detection may
+            come soon.
+        :return: The detections, as the indices, in the whole stream, of the
+            samples replaced by a marker in the output of the FPGA, (D,).
+            A detection may be reported on the samples just before x_q.
+        """
+        S = SHORT_SUM_LEN
+        mag = magnitude(x_q)
+        N = len(mag)
+        detections = []
+
+        pos = 0
+        block_len = chunk_len
+        while pos < N:
+            if self.n_skip > 0:  # Short sum cleared, long sum frozen
+                n = min(self.n_skip, N - pos)
+                self.n_skip -= n
+                pos += n
+                continue
+
+            buf = np.concatenate((self.history, mag[pos : pos + block_len]))
+            detected = self.decisions(buf, self.n_short, self.n_long)
+
+            if not detected.any():
+                self.history = buf[-HISTORY_LEN:]
+                self.n_short += len(detected)
+                pos += len(detected)
+                block_len = min(2 * block_len, chunk_len)
+                continue
+
+            k = int(np.argmax(detected))
+            detections.append(self.n_seen + pos + k - MARKER_LAG)
+
+            # The long sum got the samples of the short window until then
+            n_short = self.n_short + k
+            history = buf[: HISTORY_LEN + k - S + 1][-HISTORY_LEN:]
+            # Only its last L samples are used, until the next detection
+            self.history = np.pad(history, (HISTORY_LEN - len(history), 0))
+            self.n_long += n_short - S + 1
+            self.n_short = 0
+            self.n_skip = self.passthrough_len
+            pos += k + 1  # The detected sample does not enter the short sum
+            block_len = min(LONG_SUM_LEN, chunk_len)
+
+        self.n_seen += N
+        return np.array(detections, dtype=np.int64)
+
+    def first_detection(self, x_q: np.ndarray) -> np.ndarray:
+        """
+        Return the first detection in each stream of a batch, from a clear.
+
+        :param x_q: The quantized samples, [I0, Q0, I1, Q1, ...], (..., 2N).
+        :return: The first detection (see :meth:`process`),
+            or -1 if none, (...,).
+        """
+        mag = magnitude(x_q)
+        pad = [(0, 0)] * (mag.ndim - 1) + [(HISTORY_LEN, 0)]
+        detected = self.decisions(np.pad(mag, pad), 0, 0)
+        first = np.argmax(detected, axis=-1)
+        return np.where(np.any(detected, axis=-1), first - MARKER_LAG, -1)
+
+    def __call__(self, y: np.ndarray) -> np.ndarray:
+        """
+        Detect a packet in a batch of received signals, as the FPGA, e.g.,
+        instead of :meth:`telecom.chain.Chain.preamble_detect_ppd`.
+
+        :param y: The received signals, (..., N).
+        :return: The first detection in each signal, or -1 if none, (...,).
+        """
+        y = np.asarray(y) * self.input_gain
+        return self.first_detection(quantize(interleave(y), self.input_format))
+
+
+def open_capture(path: Path, complex64: bool = False) -> np.ndarray:
+    """
+    Memory-map a recorded capture (text files of words are read).
+
+    :param path: The capture, of fused I/Q words (see :mod:`telecom.iq_words`),
+        or of complex64 samples (e.g., from a GNU Radio file sink).
+    :param complex64: Whether the capture holds complex64 samples.
+    :return: The words, uint32, or the samples, complex64, (N,).
+    """
+    if complex64:
+        return np.memmap(path, dtype=np.complex64, mode="r")
+    return load_words(path, mmap=True)
+
+
+def scan_capture(
+    samples: np.ndarray,
+    thresholds: list[float],
+    passthrough_len: int = 100,
+    input_gain: float = 1.0,
+    nbit: int = 12,
+    chunk_len: int = 1 << 20,
+) -> list[np.ndarray]:
+    """
+    Run detectors on a recorded capture, e.g., to tune their threshold.
+
+    The capture is read by chunks, so a memory-mapped capture
+    (see :func:`open_capture`) can be much larger than the memory.
+
+    :param samples: The fused I/Q words, or the complex samples, quantized
+        as by :meth:`PacketPresenceDetector.__call__`, (N,).
+    :param thresholds: The threshold of each detector.
+    :param passthrough_len: See :class:`PacketPresenceDetector`.
+    :param input_gain: The gain applied on complex samples.
+    :param nbit: The number of bits of I and of Q of the words.
+    :param chunk_len: The number of samples read at once.
+    :return: The detections of each detector.
+    """
+    detectors = [
+        PacketPresenceDetector(threshold, passthrough_len, input_gain=input_gain)
+        for threshold in thresholds
+    ]
+    detections = [[] for _ in detectors]
+
+    for start in range(0, len(samples), chunk_len):
+        chunk = samples[start : start + chunk_len]
+        if np.iscomplexobj(chunk):
+            x_q = quantize(interleave(chunk * input_gain), INPUT_FORMAT)
+        else:
+            x_q = unfuse(chunk, nbit)
+
+        for detector, found in zip(detectors, detections, strict=True):
+            found.append(detector.process(x_q))
+
+    return [np.concatenate(found) for found in detections]
+
+
+@click.command()
+@click.argument(
+    "capture",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "-t",
+    "--threshold",
+    "thresholds",
+    multiple=True,
+    default=[15.0],
+    type=click.FloatRange(min=0, max=32, max_open=True),
+    show_default=True,
+    help="Detection threshold, as in GNU Radio. Repeat to scan several ones.",
+)
+@click.option(
+    "--passthrough-len",
+    default=100,
+    type=click.IntRange(min=1, max=65535),
+    show_default=True,
+    help="Number of samples let through after a detection.",
+)
+@click.option(
+    "--complex64",
+    is_flag=True,
+    help="The capture holds complex64 samples (e.g., from a GNU Radio file "
+    "sink), rather than fused I/Q words (binary, or text if '.txt').",
+)
+@click.option(
+    "--gain",
+    default=1.0,
+    type=click.FloatRange(min=0, min_open=True),
+    show_default=True,
+    help="Gain applied on complex64 samples, before their quantization.",
+)
+@click.option(
+    "--fs",
+    default=400e3,
+    type=click.FloatRange(min=0, min_open=True),
+    show_default=True,
+    help="Sampling frequency of the capture, in Hz.",
+)
+@click.option(
+    "--dest",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Write the detections of each threshold to this '.npz' file.",
+)
+def main(
+    capture: Path,
+    thresholds: tuple[float, ...],
+    passthrough_len: int,
+    complex64: bool,
+    gain: float,
+    fs: float,
+    dest: Path | None,
+):
+    """
+    Run the model of the packet presence detector of the FPGA on a CAPTURE,
+    and count its detections for each threshold.
+    """
+    samples = open_capture(capture, complex64)
+    detections = scan_capture(samples, thresholds, passthrough_len, gain)
+
+    duration = len(samples) / fs
+    click.echo(f"{len(samples)} samples ({duration:.1f} s)")
+
+    arrays = {}
+    for threshold, found in zip(thresholds, detections, strict=True):
+        click.echo(
+            f"threshold={threshold:g}: {len(found)} detections "
+            f"({len(found) / duration:.3g}/s)"
+        )
+        arrays[f"threshold_{threshold:g}"] = found
+
+    if dest is not None:
+        np.savez(dest, **arrays)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from collections import defaultdict
+# ruff: noqa: N806
 from pathlib import Path
 
 import click
@@ -6,6 +6,9 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
+from .measurements import load_measurements
+from .store import load_results
+
 
 def simulation_output_callback(
     _ctx: click.Context, param: click.Parameter, value: Path
@@ -17,6 +20,55 @@ def simulation_output_callback(
     return value
 
 
+def measurement_columns(
+    columns: dict[str, np.ndarray], expected_payload: np.ndarray
+) -> dict[str, np.ndarray]:
+    """Compute the columns of the measurements dataframe, for all packets at once."""
+    errors = np.unpackbits(expected_payload ^ columns["payload"], axis=-1)
+    biterror = errors.sum(axis=-1)
+
+    return {
+        "cfo": columns["cfo"],
+        "sto": columns["sto"],
+        "esn0": np.round(columns["esn0"], 2),
+        "Grx": columns["grx"].astype(int),
+        "N0": (10 * np.log10(columns["n0"])).astype(int),
+        "biterror": biterror,
+        "invalid": (biterror > 0).astype(int),
+    }
+
+
+def simulation_curves(simulation_output: Path, num_bits: int) -> dict[str, np.ndarray]:
+    """
+    Load the BER and PER of a simulation, with the theoretical curves.
+
+    :param simulation_output: The simulation output file, or the simulation
+        directory written by 'simulate --store'.
+    :param num_bits: The number of bits per packet.
+    :return: The curves, by name, at the simulated SNRs.
+    """
+    if simulation_output.is_dir():
+        meta, results = load_results(simulation_output)
+        n_packets = results["n_packets"]
+        EsN0_dB = results["EsN0_dB"]
+        sim_BER = results["bit_errors"] / (meta["params"]["payload_len"] * n_packets)
+        sim_PER = results["packet_errors"] / n_packets
+    else:
+        data = np.loadtxt(simulation_output)
+        EsN0_dB = data[:, 0]
+        sim_BER = data[:, 1]
+        sim_PER = data[:, 2]
+
+    BER_th_noncoh = 0.5 * np.exp(-(10 ** (EsN0_dB / 10.0)) / 2)
+    return {
+        "EsN0_dB": EsN0_dB,
+        "BER": sim_BER,
+        "PER": sim_PER,
+        "BER_th": BER_th_noncoh,
+        "PER_th": 1 - (1 - BER_th_noncoh) ** num_bits,
+    }
+
+
 @click.command()
 @click.argument(
     "file",
@@ -34,6 +86,12 @@ def simulation_output_callback(
     default=1,
     help="Suppress outlier where ",
 )
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    show_default=True,
+    help="Cache the parsed text measurements in a '.npz' file, next to FILE.",
+)
 @click.option(
     "--quiet",
     is_flag=True,
@@ -54,15 +112,17 @@ def simulation_output_callback(
 )
 @click.option(
     "--simulation-output",
-    type=click.Path(dir_okay=False, path_type=Path),
+    type=click.Path(path_type=Path),
     default=Path(__file__).parents[2] / "sim_outputs.csv",
     callback=simulation_output_callback,
     show_default=True,
+    help="Simulation output file, or simulation directory from 'simulate --store'.",
 )
 def main(
     file: Path,
     payload_len: int,
     esn0_tol: float,
+    cache: bool,
     quiet: bool,
     plot: bool,
     group_by_grx: bool,
@@ -75,27 +135,7 @@ def main(
     expected_payload = np.arange(payload_len, dtype=np.uint8)
     num_bits = payload_len * 8
 
-    data = defaultdict(list)
-    with open(file) as f:
-        for line in f.read().splitlines():
-            if line.startswith("CFO"):
-                cfo, sto = line.split(",")
-                data["cfo"].append(float(cfo.split("=")[1]))
-                data["sto"].append(int(sto.split("=")[1]))
-            elif line.startswith("EsN0dB"):
-                esn0, Grx, N0 = line.split(",")
-                data["esn0"].append(float(esn0.split("=")[1]))
-                data["Grx"].append(int(Grx.split("=")[1]))
-                data["N0"].append(int(10 * np.log10(float(N0.split("=")[1]))))
-            elif line.startswith("packet"):
-                *_, payload = line.split(",", maxsplit=2)
-                payload = list(map(int, payload.split("=")[1][1:-1].split(",")))
-                biterror = np.unpackbits(
-                    expected_payload ^ np.array(payload, dtype=np.uint8)
-                ).sum()
-                invalid = 1 if biterror > 0 else 0
-                data["biterror"].append(biterror)
-                data["invalid"].append(invalid)
+    data = measurement_columns(load_measurements(file, cache), expected_payload)
 
     if not quiet or plot:
         df = pd.DataFrame.from_dict(data)
@@ -164,19 +204,13 @@ def main(
             ber = agg["biterror"] / (agg["count"] * num_bits)
 
             if simulation_output is not None:
-                data = np.loadtxt(simulation_output)
-                EsN0_db = data[:, 0]
-                sim_BER = data[:, 1]
-                sim_PER = data[:, 2]
-
-                EsN0_th = 10 ** (EsN0_db / 10)
-                BER_th_noncoh = 0.5 * np.exp(-(10 ** (EsN0_db / 10.0)) / 2)
-
-                ax[0].plot(EsN0_db, BER_th_noncoh, label="AWGN Th. FSK non-coh.")
-                ax[0].plot(EsN0_db, sim_BER, label="Simulation")
+                sim = simulation_curves(simulation_output, num_bits)
 
             _fig, ax = plt.subplots(1, 2, constrained_layout=True, figsize=(10, 4))
             ax[0].plot(agg["esn0_mean"], ber, "-s", label="Measurement")
+            if simulation_output is not None:
+                ax[0].plot(sim["EsN0_dB"], sim["BER_th"], label="AWGN Th. FSK non-coh.")
+                ax[0].plot(sim["EsN0_dB"], sim["BER"], label="Simulation")
             ax[0].set_ylabel("BER")
             ax[0].set_xlabel("$E_{s}/N_{0}$ [dB]")
             ax[0].set_yscale("log")
@@ -188,12 +222,8 @@ def main(
             ax[1].plot(agg["esn0_mean"], agg["per_mean"], "-s", label="Measurement")
 
             if simulation_output is not None:
-                ax[1].plot(
-                    EsN0_db,
-                    1 - (1 - BER_th_noncoh) ** num_bits,
-                    label="AWGN Th. FSK non-coh.",
-                )
-                ax[1].plot(EsN0_db, sim_PER, label="Simulation")
+                ax[1].plot(sim["EsN0_dB"], sim["PER_th"], label="AWGN Th. FSK non-coh.")
+                ax[1].plot(sim["EsN0_dB"], sim["PER"], label="Simulation")
 
             ax[1].set_ylabel("PER")
             ax[1].set_xlabel("$E_{s}/N_{0}$ [dB]")
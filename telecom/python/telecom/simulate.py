@@ -1,13 +1,47 @@
-# ruff: noqa: N806
+# ruff: noqa: N803, N806
+import hashlib
+import inspect
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import click
 import matplotlib.pyplot as plt
 import numpy as np
-from scipy.signal import firwin, freqz
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import freqz
 from scipy.special import erfc
+from scipy.stats import beta
 
 from .chain import Chain
+from .filters import FIRFilter, lowpass_filter
+from .fixed_point import FixedPointFIR
+from .ppd import PacketPresenceDetector
+from .store import ResultStore
+
+COUNTERS = (
+    "bit_errors",
+    "packet_errors",
+    "cfo_err",
+    "sto_err",
+    "preamble_misdetect",  # Preamble miss detection (not found)
+    "preamble_false_detect",  # Preamble false detection (found in noise)
+)
+
+COLUMNS = (  # Columns of the simulation output file
+    "EsN0_dB",
+    "BER",
+    "PER",
+    "RMSE_cfo",
+    "RMSE_sto",
+    "preamble_mis",
+    "preamble_false",
+    "BER_low",
+    "BER_high",
+    "PER_low",
+    "PER_high",
+    "n_packets",
+)
 
 
 def add_delay(chain: Chain, x: np.ndarray, tau: float) -> tuple[np.ndarray, int]:
@@ -42,6 +76,625 @@ def add_cfo(chain: Chain, x: np.ndarray, cfo: float) -> np.ndarray:
     return y
 
 
+def shift(y: np.ndarray, offset: np.ndarray) -> np.ndarray:
+    """
+    Shift each signal of a batch to the left, i.e., return y[..., offset:]
+    for every signal, padded with zeros at the end to keep the same length.
+
+    :param y: The signals, (..., N).
+    :param offset: The (non-negative) shift of each signal, (...,).
+    :return: The shifted signals, (..., N).
+    """
+    N = y.shape[-1]
+    idx = np.asarray(offset)[..., None] + np.arange(N)
+    y_shifted = np.take_along_axis(y, np.minimum(idx, N - 1), axis=-1)
+    return np.where(idx < N, y_shifted, 0)
+
+
+def call_rx(method, y: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Call a Rx method of a chain on a batch of received signals.
+
+    Methods marked with :func:`telecom.chain.batched` receive the whole batch
+    at once. Other methods are called once per signal, truncated to its
+    valid length, and their outputs are stacked (with zero-padding for
+    array outputs, and -1 for preambles that were not found).
+
+    :param method: The chain method to call.
+    :param y: The received signals, (..., N).
+    :param lengths: The number of valid samples in each signal, (...,).
+    :return: The stacked outputs, (...,) or (..., M).
+    """
+    if getattr(method, "batched", False):
+        return np.asarray(method(y))
+
+    outputs = [
+        method(y_row[:n])
+        for y_row, n in zip(
+            y.reshape(-1, y.shape[-1]),
+            np.broadcast_to(lengths, y.shape[:-1]).flat,
+            strict=True,
+        )
+    ]
+    outputs = [-1 if out is None else out for out in outputs]
+
+    if np.ndim(outputs[0]) == 0:
+        return np.reshape(outputs, y.shape[:-1])
+
+    out_len = max((len(out) for out in outputs), default=0)
+    stacked = np.zeros((len(outputs), out_len), dtype=np.asarray(outputs[0]).dtype)
+    for row, out in zip(stacked, outputs, strict=True):
+        row[: len(out)] = out
+    return stacked.reshape(*y.shape[:-1], out_len)
+
+
+def receive(
+    chain: Chain,
+    y_filt: np.ndarray,
+    lengths: np.ndarray,
+    bits: np.ndarray,
+    cfo: np.ndarray,
+    start_idx: np.ndarray,
+    sto_idx: np.ndarray,
+    ppd: PacketPresenceDetector | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Run the receiver on a batch of filtered signals,
+    and compute the error counters for each SNR.
+
+    :param chain: The chain to simulate.
+    :param y_filt: The received signals, after low-pass filtering, (S, P, N).
+    :param lengths: The number of valid samples in each signal, (P,).
+    :param bits: The sent payload bits, (P, payload_len).
+    :param cfo: The CFO applied on each packet, (P,).
+    :param start_idx: The start index of each packet, (P,).
+    :param sto_idx: The integer STO of each packet, (P,).
+    :param ppd: The packet presence detector of the FPGA, detecting the
+        preambles instead of the chain, or None.
+    :return: The error counters, summed over the packets, (S,) each.
+    """
+    R = chain.osr_rx
+    B = chain.bit_rate
+    hdr_len = len(chain.preamble) + len(chain.sync_word)  # in bits
+    batch_shape = y_filt.shape[:-1]
+    lengths = np.broadcast_to(lengths, batch_shape)
+    ideal_preamble_detect = chain.ideal_preamble_detect and ppd is None
+
+    ## Preamble detection stage
+    if ppd is not None:
+        detect_idx = call_rx(ppd, y_filt, lengths)
+    elif chain.ideal_preamble_detect:
+        detect_idx = np.broadcast_to(start_idx, batch_shape)
+    elif chain.use_dynamic_ppd:
+        detect_idx = call_rx(chain.preamble_detect_ppd, y_filt, lengths)
+    else:
+        detect_idx = call_rx(chain.preamble_detect, y_filt, lengths)
+
+    detect_idx = np.asarray(detect_idx, dtype=int)
+    found = detect_idx >= 0
+
+    # Preamble metrics
+    false_detect = found & (detect_idx < start_idx - 4 * R)  # Found in noise
+    late_detect = found & (
+        detect_idx > start_idx + len(chain.preamble) * R
+    )  # Found in packet
+    preamble_error = false_detect | late_detect
+
+    detect_idx = np.where(found, detect_idx, 0)
+    y_detect = shift(y_filt, detect_idx)
+    lengths = np.maximum(lengths - detect_idx, 0)
+
+    ## Synchronization stage
+    # CFO estimation and correction
+    if chain.ideal_cfo_estimation:
+        cfo_hat = np.broadcast_to(cfo, batch_shape)
+    else:
+        cfo_hat = call_rx(
+            chain.cfo_estimation,
+            y_detect[..., : hdr_len * R],
+            np.minimum(lengths, hdr_len * R),
+        )
+
+    t = np.arange(y_detect.shape[-1]) / (B * R)
+    y_sync = np.exp(-1j * 2 * np.pi * np.asarray(cfo_hat)[..., None] * t) * y_detect
+
+    # STO estimation and correction
+    if chain.ideal_sto_estimation:
+        if ideal_preamble_detect:
+            # In this case, starting index of preamble already contains sto
+            tau_hat = np.zeros(batch_shape, dtype=int)
+        else:
+            tau_hat = np.broadcast_to(sto_idx, batch_shape)
+    else:
+        tau_hat = call_rx(
+            chain.sto_estimation,
+            y_sync[..., : hdr_len * R],
+            np.minimum(lengths, hdr_len * R),
+        )
+
+    tau_hat = np.asarray(tau_hat, dtype=int)
+    y_sync = shift(y_sync, tau_hat)
+    lengths = np.maximum(lengths - tau_hat, 0)
+
+    ## Demodulation and deframing stage
+    bits_hat = call_rx(chain.demodulate, y_sync, lengths)
+    n_syms = np.minimum(lengths // R, bits_hat.shape[-1])  # Valid symbols
+    valid_syms = np.arange(bits_hat.shape[-1]) < n_syms[..., None]
+
+    if chain.ideal_sto_estimation and ideal_preamble_detect:
+        # In this case, also assume perfect frame synchronization
+        start_frame = np.full(batch_shape, hdr_len)
+    else:  # Frame synchronization
+        preamble_error |= n_syms == 0
+        sync_len = len(chain.sync_word)
+        symbols = np.where(valid_syms, bits_hat * 2 - 1, 0)
+        symbols = np.pad(
+            symbols, [(0, 0)] * len(batch_shape) + [(sync_len - 1, sync_len - 1)]
+        )
+        v = np.abs(
+            sliding_window_view(symbols, sync_len, axis=-1)
+            @ (np.asarray(chain.sync_word) * 2 - 1)
+        )
+        start_frame = np.argmax(v, axis=-1) + 1
+
+    bits_hat_pay = shift(bits_hat, start_frame)[
+        ..., : chain.payload_len
+    ]  # Demodulated payload bits
+
+    ## Computing performance metrics
+    correct_len = start_frame + chain.payload_len <= n_syms
+    errors = np.where(
+        (found & correct_len & ~preamble_error)[..., None],
+        bits ^ bits_hat_pay,
+        0.5,  # if the number of demodulated symbols is incorrect
+    )
+
+    cfo_hat = np.where(found, cfo_hat, np.nan)
+    timing_hat = np.where(found, detect_idx + tau_hat + start_frame * R, np.nan)
+    timing = start_idx + len(chain.preamble) * R + len(chain.sync_word) * R
+
+    axes = tuple(range(1, len(batch_shape)))  # All axes but the SNR one
+    return {
+        "bit_errors": np.sum(errors, axis=(*axes, -1)),
+        "packet_errors": np.sum(np.any(errors, axis=-1), axis=axes),
+        "cfo_err": np.sum((cfo - cfo_hat) ** 2, axis=axes),
+        "sto_err": np.sum((timing / (R * B) - timing_hat / (R * B)) ** 2, axis=axes),
+        "preamble_misdetect": np.sum(~found | late_detect, axis=axes),
+        "preamble_false_detect": np.sum(false_detect, axis=axes),
+    }
+
+
+def as_filter(
+    taps: np.ndarray | FIRFilter | FixedPointFIR | None, superpose: bool = False
+) -> FIRFilter | FixedPointFIR | None:
+    """
+    Return the low-pass filter of its taps (see :func:`simulate`).
+
+    :raises ValueError: If the filter is not linear, but the signal and
+        the noise are to be filtered separately.
+    """
+    if isinstance(taps, np.ndarray):
+        taps = FIRFilter(taps)  # The FFTs of the taps are computed only once
+    if superpose and taps is not None and not taps.linear:
+        raise ValueError("Superposition needs a linear filter")
+    return taps
+
+
+def simulate(
+    chain: Chain,
+    rng: np.random.Generator,
+    n_packets: int,
+    taps: np.ndarray | FIRFilter | FixedPointFIR | None,
+    batch_size: int = 1,
+    max_batch_memory: float = 256e6,
+    EsN0s_dB: np.ndarray | None = None,
+    superpose: bool = False,
+    ppd: PacketPresenceDetector | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Simulate the transmission of packets through the chain, for all SNRs.
+
+    Packets are processed in batches: each batch is a (SNR, packet, sample)
+    tensor that is filtered, and then received, with array operations.
+    If the tensor would exceed `max_batch_memory` bytes, the SNRs are
+    split into several tensors, so memory stays bounded.
+
+    The same noise vector is used for all the SNRs of a packet, only scaled.
+    As the low-pass filter is linear, with `superpose`, the signal and the
+    noise are filtered once per packet, and the filtered noise is scaled for
+    each SNR, so the cost of filtering does not depend on the number of SNRs.
+    Results only differ from the default by rounding errors.
+
+    :param chain: The chain to simulate.
+    :param rng: The random generator.
+    :param n_packets: The number of packets to send.
+    :param taps: The low-pass filter (or its taps), or None if no filtering.
+    :param batch_size: The number of packets per batch.
+    :param max_batch_memory: The maximum size, in bytes, of one tensor.
+    :param EsN0s_dB: The SNRs to simulate, (S,), defaults to the chain's range.
+    :param superpose: Whether to filter the signal and the noise separately,
+        once for all SNRs.
+    :param ppd: The model of the packet presence detector of the FPGA, to
+        detect the preambles instead of the chain (see :func:`receive`).
+    :return: The error counters, summed over the packets, (S,) each.
+    """
+    if EsN0s_dB is None:
+        EsN0s_dB = chain.EsN0_range  # Es is the energy of a symbol
+    EsN0s_dB = np.asarray(EsN0s_dB)
+    R = chain.osr_rx
+    B = chain.bit_rate
+    fs = B * R
+    D = int(chain.osr_tx / chain.osr_rx)
+
+    taps = as_filter(taps, superpose)
+
+    counters = {name: np.zeros(len(EsN0s_dB)) for name in COUNTERS}
+
+    # Transmitted signals that are independent of the payload bits
+    x_pr = chain.modulate(chain.preamble)  # Modulated signal containing preamble
+    x_sync = chain.modulate(chain.sync_word)  # Modulated signal containing sync_word
+    x_noise = np.zeros(
+        chain.payload_len * chain.osr_tx
+    )  # Padding some zeros before the packets
+
+    for first in range(0, n_packets, batch_size):
+        P = min(batch_size, n_packets - first)
+
+        # Random generation of payload bits
+        bits = rng.integers(2, size=(P, chain.payload_len))
+
+        # Transmitted signal
+        x_pay = chain.modulate(bits)  # Modulated signal with payload
+        x_hdr = np.concatenate((x_noise, x_pr, x_sync))
+        x = np.concatenate(
+            (
+                np.broadcast_to(x_hdr, (P, len(x_hdr))),
+                x_pay,
+                np.zeros((P, chain.osr_tx)),
+            ),
+            axis=-1,
+        )
+
+        # Channel application (without noise addition): delay and frequency offset
+        if np.isnan(chain.sto_val):  # STO should be random
+            tau = rng.random(P) * chain.sto_range
+        else:
+            tau = np.full(P, chain.sto_val)
+
+        # Delay addition, see add_delay
+        sto_int = np.floor(tau * fs).astype(int)  # Integer delay
+        idx = np.floor((tau * fs - sto_int) * D).astype(int)  # Fractional delay
+        x_rx = x.reshape(P, -1, D)[np.arange(P), :, idx]
+        lengths = sto_int + x_rx.shape[-1]  # Number of valid samples
+        N = lengths.max()
+
+        y = np.zeros((P, N), dtype=complex)
+        y[np.arange(P)[:, None], sto_int[:, None] + np.arange(x_rx.shape[-1])] = x_rx
+        sto_idx = np.mod(sto_int, R)
+        start_idx = (
+            sto_int + chain.payload_len * R
+        )  # Delay + noise in beginning, for STO metric
+
+        if np.isnan(chain.cfo_val):  # CFO should be random
+            cfo = rng.uniform(low=chain.cfo_range[0], high=chain.cfo_range[1], size=P)
+        else:
+            cfo = np.full(P, chain.cfo_val)
+        t = np.arange(N) / fs
+        y_cfo = np.exp(1j * 2 * np.pi * cfo[:, None] * t) * y
+
+        # Normalized noise generation
+        # Normalized complex normal vector CN(0, 1)
+        w = (rng.normal(size=(P, N)) + 1j * rng.normal(size=(P, N))) / np.sqrt(2)
+        w[np.arange(N) >= lengths[:, None]] = 0  # No noise outside the signals
+
+        if superpose and taps is not None:
+            # Filtering commutes with the scaling and the addition of the noise
+            y_cfo, w = taps(np.stack((y_cfo, w)))
+
+        # Split the SNRs to keep the tensors below the memory limit
+        n_snrs = max(1, int(max_batch_memory // (P * N * y_cfo.itemsize)))
+
+        for k in range(0, len(EsN0s_dB), n_snrs):
+            snrs = slice(k, k + n_snrs)
+
+            # Add noise
+            EsN0 = 10 ** (EsN0s_dB[snrs] / 10.0)
+            SNR_input = EsN0 / R
+            y_noisy = y_cfo + w * np.sqrt(1 / SNR_input)[:, None, None]
+
+            # Low-pass filtering, of all the SNRs and packets at once
+            if taps is not None and not superpose:
+                y_filt = taps(y_noisy)
+            else:
+                y_filt = y_noisy
+
+            batch_counters = receive(
+                chain, y_filt, lengths, bits, cfo, start_idx, sto_idx, ppd
+            )
+
+            for name, value in batch_counters.items():
+                counters[name][snrs] += value
+
+    return counters
+
+
+def _simulate_worker(
+    chain: Chain, seed: np.random.SeedSequence, n_packets: int, *args
+) -> dict[str, np.ndarray]:
+    return simulate(chain, np.random.default_rng(seed), n_packets, *args)
+
+
+def simulate_parallel(
+    chain: Chain,
+    seed: int | np.random.SeedSequence,
+    n_packets: int,
+    taps: np.ndarray | FIRFilter | FixedPointFIR | None,
+    workers: int = 1,
+    batch_size: int = 1,
+    max_batch_memory: float = 256e6,
+    EsN0s_dB: np.ndarray | None = None,
+    superpose: bool = False,
+    ppd: PacketPresenceDetector | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Simulate as :func:`simulate`, but split the packets across processes.
+
+    Each worker gets its own random stream, spawned from `seed`, and the
+    counters of the workers are summed in a fixed order. Hence, results are
+    the same for a given seed and number of workers. With one worker, the
+    results are the same as ``simulate(chain, np.random.default_rng(seed), ...)``.
+
+    :param chain: The chain to simulate.
+    :param seed: The random seed.
+    :param n_packets: The number of packets to send.
+    :param taps: The low-pass filter (or its taps), or None if no filtering.
+    :param workers: The number of processes.
+    :param batch_size: The number of packets per batch.
+    :param max_batch_memory: The maximum size, in bytes, of one tensor,
+        for each worker.
+    :param EsN0s_dB: The SNRs to simulate, (S,), defaults to the chain's range.
+    :param superpose: See :func:`simulate`.
+    :param ppd: See :func:`simulate`.
+    :return: The error counters, summed over the packets, (S,) each.
+    """
+    if workers == 1:
+        return simulate(
+            chain,
+            np.random.default_rng(seed),
+            n_packets,
+            taps,
+            batch_size,
+            max_batch_memory,
+            EsN0s_dB,
+            superpose,
+            ppd,
+        )
+
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+
+    seeds = seed.spawn(workers)
+    n_packets_per_worker = [
+        n_packets // workers + (i < n_packets % workers) for i in range(workers)
+    ]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(
+            executor.map(
+                _simulate_worker,
+                [chain] * workers,
+                seeds,
+                n_packets_per_worker,
+                [taps] * workers,
+                [batch_size] * workers,
+                [max_batch_memory] * workers,
+                [EsN0s_dB] * workers,
+                [superpose] * workers,
+                [ppd] * workers,
+            )
+        )
+
+    return {name: sum(result[name] for result in results) for name in COUNTERS}
+
+
+def confidence_interval(
+    errors: np.ndarray, trials: np.ndarray, confidence: float = 0.95
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the (Clopper-Pearson) confidence interval of an error rate.
+
+    :param errors: The number of errors.
+    :param trials: The number of trials.
+    :param confidence: The confidence level of the interval.
+    :return: The lower and upper bounds of the error rate.
+    """
+    errors = np.asarray(errors, dtype=float)
+    trials = np.asarray(trials, dtype=float)
+    alpha = 1 - confidence
+
+    low = np.where(errors > 0, beta.ppf(alpha / 2, errors, trials - errors + 1), 0.0)
+    high = np.where(
+        errors < trials, beta.ppf(1 - alpha / 2, errors + 1, trials - errors), 1.0
+    )
+    return low, high
+
+
+def simulate_adaptive(
+    chain: Chain,
+    seed: int,
+    max_packets: int,
+    taps: np.ndarray | FIRFilter | FixedPointFIR | None,
+    chunk_size: int = 100,
+    target_errors: int | None = 100,
+    ci_width: float | None = 0.2,
+    per_floor: float = 0.0,
+    confidence: float = 0.95,
+    store: ResultStore | None = None,
+    **kwargs,
+) -> tuple[dict[str, np.ndarray], np.ndarray]:
+    """
+    Simulate as :func:`simulate_parallel`, but stop each SNR as soon as
+    its PER is known accurately enough.
+
+    Packets are sent by chunks, only at the SNRs that are still running.
+    After each chunk, an SNR stops if it has reached `target_errors` packet
+    errors, if the width of its PER confidence interval is below `ci_width`
+    times the PER, or if the upper bound of this interval is below
+    `per_floor`. In any case, an SNR never uses more than `max_packets`.
+    Use None to disable a criterion.
+
+    Each chunk gets its own random stream, spawned from `seed`,
+    so results are the same for a given seed and set of parameters.
+    If a store is given, the counters of each chunk are written to it,
+    and the chunks already stored are loaded instead of simulated again.
+
+    :param chain: The chain to simulate.
+    :param seed: The random seed.
+    :param max_packets: The maximum number of packets to send, per SNR.
+    :param taps: The low-pass filter (or its taps), or None if no filtering.
+    :param chunk_size: The number of packets sent between two stopping checks.
+    :param target_errors: The number of packet errors to stop at.
+    :param ci_width: The relative width of the PER confidence interval to stop at.
+    :param per_floor: The PER to stop at, when the PER is surely below it.
+    :param confidence: The confidence level of the intervals.
+    :param store: The store to write (and resume from) the counters of each chunk.
+    :param kwargs: Keyword arguments passed to :func:`simulate_parallel`.
+    :return: The error counters, summed over the packets, (S,) each,
+        and the number of packets sent for each SNR, (S,).
+    """
+    EsN0s_dB = np.asarray(chain.EsN0_range)
+
+    counters = {name: np.zeros(len(EsN0s_dB)) for name in COUNTERS}
+    n_packets = np.zeros(len(EsN0s_dB), dtype=int)
+    active = np.ones(len(EsN0s_dB), dtype=bool)  # SNRs still running
+
+    n_chunks = -(-max_packets // chunk_size)
+    chunk_seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+
+    for k, chunk_seed in enumerate(chunk_seeds):
+        if not active.any():
+            break
+
+        shard = None if store is None else store.load(k)
+
+        if shard is None:
+            P = min(chunk_size, max_packets - k * chunk_size)
+            chunk_counters = simulate_parallel(
+                chain, chunk_seed, P, taps, EsN0s_dB=EsN0s_dB[active], **kwargs
+            )
+
+            shard = {"EsN0_dB": EsN0s_dB, "n_packets": np.where(active, P, 0)}
+            for name, value in chunk_counters.items():
+                shard[name] = np.zeros(len(EsN0s_dB))
+                shard[name][active] = value
+
+            if store is not None:
+                store.append(k, shard)
+
+        for name in COUNTERS:
+            counters[name] += shard[name]
+        n_packets += shard["n_packets"]
+
+        # Stopping criteria
+        errors = counters["packet_errors"]
+        low, high = confidence_interval(errors, n_packets, confidence)
+        stop = high < per_floor
+        if target_errors is not None:
+            stop |= errors >= target_errors
+        if ci_width is not None:
+            stop |= high - low <= ci_width * errors / n_packets
+        active &= ~stop
+
+    return counters, n_packets
+
+
+def receiver_filters(
+    chain: Chain,
+    fixed_point: bool = False,
+    fixed_point_gain: float = 1.0,
+    ppd_threshold: float | None = None,
+) -> tuple[FIRFilter | FixedPointFIR | None, PacketPresenceDetector | None]:
+    """
+    Return the low-pass filter of the chain, and the packet presence detector.
+
+    :param chain: The simulated chain.
+    :param fixed_point: Whether to use the fixed-point model of the FPGA filter.
+    :param fixed_point_gain: The gain of the signals before quantization.
+    :param ppd_threshold: The threshold of the model of the packet presence
+        detector of the FPGA, or None to use the detector of the chain.
+    :return: The filter, or None if no filtering, and the detector,
+        or None if not used.
+    """
+    if chain.numtaps == 0:
+        taps = None
+    elif chain.taps is None:
+        fs = chain.bit_rate * chain.osr_rx
+        taps = lowpass_filter(chain.numtaps, chain.cutoff, fs)
+    else:
+        taps = FIRFilter(chain.taps)
+
+    if fixed_point and taps is not None:
+        taps = FixedPointFIR(taps.taps, input_gain=fixed_point_gain)
+
+    ppd = None
+    if ppd_threshold is not None:
+        ppd = PacketPresenceDetector(ppd_threshold, input_gain=fixed_point_gain)
+
+    return taps, ppd
+
+
+def chain_fingerprint(chain: Chain) -> dict:
+    """
+    Describe everything that defines a chain, for the key of its store.
+
+    :param chain: The simulated chain.
+    :return: The public attributes of the chain that are not methods (of its
+        class and of itself), JSON serializable, and the SHA-256 of the source
+        code of its classes (e.g., of its Rx methods).
+    """
+    attributes = {}
+    for name in dir(chain):
+        value = getattr(chain, name)
+        if name.startswith("_") or callable(value):
+            continue
+        if isinstance(value, np.ndarray | np.generic):
+            value = value.tolist()
+        attributes[name] = value
+
+    source = "".join(inspect.getsource(cls) for cls in type(chain).__mro__[:-1])
+    return {
+        "attributes": attributes,
+        "source_sha256": hashlib.sha256(source.encode()).hexdigest(),
+    }
+
+
+def open_store(
+    path: Path, chain_name: str, seed: int, chain: Chain, **params
+) -> ResultStore:
+    """
+    Open the store of the results of a simulation.
+
+    :param path: The root directory of the stores.
+    :param chain_name: The name of the simulated chain.
+    :param seed: The random seed.
+    :param chain: The simulated chain, whose fingerprint is part of the key
+        (see :func:`chain_fingerprint`), so editing it starts a new simulation.
+    :param params: The options of the simulation that change its results,
+        by name, as part of the key of the store.
+    :return: The store.
+    """
+    params = {
+        "EsN0_dB": np.asarray(chain.EsN0_range).tolist(),
+        "n_packets": chain.n_packets,
+        "payload_len": chain.payload_len,
+        "chain": chain_fingerprint(chain),
+        **params,
+    }
+    store = ResultStore(path, chain_name, seed, params)
+    click.echo(f"Storing results in {store.path}")
+    return store
+
+
 @click.command()
 @click.option(
     "-c",
@@ -64,7 +717,138 @@ def add_cfo(chain: Chain, x: np.ndarray, cfo: float) -> np.ndarray:
     show_default=True,
     help="Write output to this file.",
 )
-def main(chain_name: str, seed: int, dest: Path):  # noqa: C901
+@click.option(
+    "-b",
+    "--batch-size",
+    default=1,
+    type=click.IntRange(min=1),
+    show_default=True,
+    help="Number of packets simulated at once, for all SNRs.",
+)
+@click.option(
+    "--max-batch-memory",
+    default=256,
+    type=click.FloatRange(min=0, min_open=True),
+    show_default=True,
+    help="Maximum memory (in MB) used by one batch. "
+    "Batches above this limit are split along the SNRs.",
+)
+@click.option(
+    "-j",
+    "--workers",
+    default=1,
+    type=click.IntRange(min=0),
+    show_default=True,
+    help="Number of processes the packets are split across. "
+    "Use 0 to use all CPU cores. Same seed and workers => same results.",
+)
+@click.option(
+    "--adaptive",
+    is_flag=True,
+    help="Stop each SNR as soon as its PER is accurate enough, "
+    "see --target-errors, --ci-width and --per-floor. "
+    "The number of packets of the chain is then a maximum, per SNR.",
+)
+@click.option(
+    "--chunk-size",
+    default=100,
+    type=click.IntRange(min=1),
+    show_default=True,
+    help="Number of packets sent between two stopping checks, with --adaptive.",
+)
+@click.option(
+    "--target-errors",
+    default=100,
+    type=click.IntRange(min=1),
+    show_default=True,
+    help="Stop an SNR once this number of packet errors is reached.",
+)
+@click.option(
+    "--ci-width",
+    default=0.2,
+    type=click.FloatRange(min=0),
+    show_default=True,
+    help="Stop an SNR once the width of the PER confidence interval "
+    "is below this fraction of the PER.",
+)
+@click.option(
+    "--per-floor",
+    default=0.0,
+    type=click.FloatRange(min=0, max=1),
+    show_default=True,
+    help="Stop an SNR once the PER is surely (upper bound) below this value.",
+)
+@click.option(
+    "--confidence",
+    default=0.95,
+    type=click.FloatRange(min=0, max=1, min_open=True, max_open=True),
+    show_default=True,
+    help="Confidence level of the BER and PER intervals.",
+)
+@click.option(
+    "--store",
+    type=click.Path(file_okay=False, path_type=Path),
+    help="Write the counters of each chunk (see --chunk-size) in this "
+    "directory, as soon as completed. A simulation run again with the same "
+    "chain (attributes and code), seed and parameters resumes from its last "
+    "completed chunk. Packets are then drawn by chunk, as with --adaptive, "
+    "so results differ from a run without --store with the same seed.",
+)
+@click.option(
+    "--superpose",
+    is_flag=True,
+    help="Filter the signal and the noise of each packet once, for all SNRs, "
+    "and scale the filtered noise for each SNR (the filter is linear). "
+    "Much faster for many SNRs, same results up to rounding errors.",
+)
+@click.option(
+    "--fixed-point",
+    is_flag=True,
+    help="Filter with the bit-exact model of the fixed-point FIR of the FPGA "
+    "(see telecom.fixed_point), to predict the performance of the hardware.",
+)
+@click.option(
+    "--fixed-point-gain",
+    default=1.0,
+    type=click.FloatRange(min=0, min_open=True),
+    show_default=True,
+    help="Gain applied on the received signals before their quantization, "
+    "with --fixed-point or --fixed-point-ppd (samples are in [-1, 1)).",
+)
+@click.option(
+    "--fixed-point-ppd",
+    "ppd_threshold",
+    type=click.FloatRange(min=0, max=32, max_open=True),
+    help="Detect the preambles with the bit-exact model of the packet presence "
+    "detector of the FPGA (see telecom.ppd), with this threshold (as set from "
+    "GNU Radio), instead of the preamble detection of the chain.",
+)
+@click.option(
+    "--plot/--no-plot",
+    default=True,
+    show_default=True,
+    help="Show plots.",
+)
+def main(
+    chain_name: str,
+    seed: int,
+    dest: Path,
+    batch_size: int,
+    max_batch_memory: float,
+    workers: int,
+    adaptive: bool,
+    chunk_size: int,
+    target_errors: int,
+    ci_width: float,
+    per_floor: float,
+    confidence: float,
+    store: Path | None,
+    superpose: bool,
+    fixed_point: bool,
+    fixed_point_gain: float,
+    ppd_threshold: float | None,
+    plot: bool,
+):
     """
     Simulate the communication chain provided, for several SNRs.
     Compute and display the different metrics to evaluate the performances.
@@ -78,195 +862,116 @@ def main(chain_name: str, seed: int, dest: Path):  # noqa: C901
     B = chain.bit_rate
     fs = B * R
 
-    # Error counters/metric initialisation
-    bit_errors = np.zeros(len(EsN0s_dB))
-    packet_errors = np.zeros(len(EsN0s_dB))
-    cfo_err = np.zeros(len(EsN0s_dB))
-    sto_err = np.zeros(len(EsN0s_dB))
-    preamble_misdetect = np.zeros(len(EsN0s_dB))  # Preamble miss detection (not found)
-    preamble_false_detect = np.zeros(
-        len(EsN0s_dB)
-    )  # Preamble false detection (found in noise)
+    taps, ppd = receiver_filters(chain, fixed_point, fixed_point_gain, ppd_threshold)
 
-    # Transmitted signals that are independent of the payload bits
-    x_pr = chain.modulate(chain.preamble)  # Modulated signal containing preamble
-    x_sync = chain.modulate(chain.sync_word)  # Modulated signal containing sync_word
-    hdr_len_byte = (len(chain.preamble) + len(chain.sync_word)) // 8
-    x_noise = np.zeros(
-        chain.payload_len * chain.osr_tx
-    )  # Padding some zeros before the packets
+    if workers == 0:
+        workers = os.cpu_count() or 1
 
-    # Lowpass filter taps
-    if chain.taps is None:
-        if chain.numtaps != 0:
-            taps = firwin(chain.numtaps, chain.cutoff, fs=fs)
-    else:
-        taps = chain.taps
-
-    rng = np.random.default_rng(seed)
+    options = {
+        "workers": workers,
+        "batch_size": batch_size,
+        "max_batch_memory": max_batch_memory * 1e6,
+        "superpose": superpose,
+        "ppd": ppd,
+    }
 
-    # For loop on the number of packets to send
-    for _ in range(chain.n_packets):
-        # Random generation of payload bits
-        bits = rng.integers(2, size=chain.payload_len)
+    if not adaptive:  # Disable stopping criteria
+        target_errors, ci_width, per_floor = None, None, 0.0
 
-        # Transmitted signal
-        x_pay = chain.modulate(bits)  # Modulated signal with payload
-        x = np.concatenate((x_noise, x_pr, x_sync, x_pay, np.zeros(chain.osr_tx)))
+    if store is not None:  # Keyed on all the options that change the results
+        store = open_store(
+            store,
+            chain_name,
+            seed,
+            chain,
+            chunk_size=chunk_size,
+            workers=workers,
+            batch_size=batch_size,
+            target_errors=target_errors,
+            ci_width=ci_width,
+            per_floor=per_floor,
+            confidence=confidence,
+            superpose=superpose,
+            fixed_point=fixed_point,
+            fixed_point_gain=fixed_point_gain,
+            ppd_threshold=ppd_threshold,
+        )
 
-        # Channel application (without noise addition): delay and frequency offset
-        if np.isnan(chain.sto_val):  # STO should be random
-            tau = rng.random() * chain.sto_range
-        else:
-            tau = chain.sto_val
+    if adaptive or store is not None:
+        counters, n_packets = simulate_adaptive(
+            chain,
+            seed,
+            chain.n_packets,
+            taps,
+            chunk_size=chunk_size,
+            target_errors=target_errors,
+            ci_width=ci_width,
+            per_floor=per_floor,
+            confidence=confidence,
+            store=store,
+            **options,
+        )
+    else:
+        counters = simulate_parallel(chain, seed, chain.n_packets, taps, **options)
+        n_packets = np.full(len(EsN0s_dB), chain.n_packets)
 
-        y, sto_idx = add_delay(chain, x, tau)  # Delay addition
-        start_idx = (
-            int(tau * chain.osr_rx * B) + chain.payload_len * chain.osr_rx
-        )  # Delay + noise in beginning, for STO metric
+    bit_errors = counters["bit_errors"]
+    packet_errors = counters["packet_errors"]
+    cfo_err = counters["cfo_err"]
+    sto_err = counters["sto_err"]
+    preamble_misdetect = counters["preamble_misdetect"]
+    preamble_false_detect = counters["preamble_false_detect"]
 
-        if np.isnan(chain.cfo_val):  # CFO should be random
-            cfo = rng.uniform(low=chain.cfo_range[0], high=chain.cfo_range[1])
-        else:
-            cfo = chain.cfo_val
-        y_cfo = add_cfo(chain, y, cfo)  # Frequency offset addition
+    # Metrics
+    BER = bit_errors / chain.payload_len / n_packets
+    PER = packet_errors / n_packets
+    RMSE_cfo = np.sqrt(cfo_err / n_packets) / B
+    RMSE_sto = np.sqrt(sto_err / n_packets) * B
+    preamble_mis = preamble_misdetect / n_packets
+    preamble_false = preamble_false_detect / n_packets
 
-        # Normalized noise generation
-        w = (rng.normal(size=y.size) + 1j * rng.normal(size=y.size)) / np.sqrt(
-            2
-        )  # Normalized complex normal vector CN(0, 1)
+    # Confidence intervals
+    BER_low, BER_high = confidence_interval(
+        bit_errors, n_packets * chain.payload_len, confidence
+    )
+    PER_low, PER_high = confidence_interval(packet_errors, n_packets, confidence)
 
-        # For loop on the SNRs
-        for k, EsN0_dB in enumerate(EsN0s_dB):
-            # Add noise
-            EsN0 = 10 ** (EsN0_dB / 10.0)
-            SNR_input = EsN0 / chain.osr_rx
-            noise = w * np.sqrt(1 / SNR_input)
-            y_noisy = y_cfo + noise
-
-            # Low-pass filtering
-            if chain.numtaps != 0:
-                y_filt = np.convolve(y_noisy, taps, mode="same")
-            else:
-                y_filt = y_noisy
+    # Save simulation outputs (for later post-processing, building new figures,...)
+    save_var = np.column_stack(
+        (
+            EsN0s_dB,
+            BER,
+            PER,
+            RMSE_cfo,
+            RMSE_sto,
+            preamble_mis,
+            preamble_false,
+            BER_low,
+            BER_high,
+            PER_low,
+            PER_high,
+            n_packets,
+        )
+    )
+    np.savetxt(
+        dest,
+        save_var,
+        delimiter="\t",
+        header="\t".join(COLUMNS),
+    )
 
-            ## Preamble detection stage
-            if chain.ideal_preamble_detect:
-                detect_idx = start_idx
-            else:
-                if chain.use_dynamic_ppd:
-                    detect_idx = chain.preamble_detect_ppd(y_filt)
-                else:
-                    detect_idx = chain.preamble_detect(y_filt)
-
-            preamble_error = False
-            if detect_idx is None:  # Misdetection of preamble
-                preamble_misdetect[k] += 1
-                errors = 0.5 * np.ones(len(bits))
-                cfo_hat, tau_hat, detect_idx, start_frame = (
-                    np.nan,
-                    np.nan,
-                    np.nan,
-                    np.nan,
-                )
-
-            else:  # Found a preamble, can demodulate packet
-                # Preamble metrics
-                if (
-                    detect_idx < start_idx - 4 * R
-                ):  # False detection of preamble (found in noise)
-                    preamble_false_detect[k] += 1
-                    preamble_error = True
-                elif (
-                    detect_idx > start_idx + len(chain.preamble) * chain.osr_rx
-                ):  # Misdetection of preamble (found in packet)
-                    preamble_misdetect[k] += 1
-                    preamble_error = True
-
-                y_detect = y_filt[detect_idx:]
-                ## Synchronization stage
-                # CFO estimation and correction
-                if chain.ideal_cfo_estimation:
-                    cfo_hat = cfo
-                else:
-                    cfo_hat = chain.cfo_estimation(
-                        y_detect[: hdr_len_byte * 8 * chain.osr_rx]
-                    )
-
-                t = np.arange(len(y_detect)) / (B * R)
-                y_sync = np.exp(-1j * 2 * np.pi * cfo_hat * t) * y_detect
-
-                # STO estimation and correction
-                if chain.ideal_sto_estimation:
-                    if (
-                        chain.ideal_preamble_detect
-                    ):  # In this case, starting index of preamble already contains sto
-                        tau_hat = 0
-                    else:
-                        tau_hat = sto_idx
-                else:
-                    tau_hat = chain.sto_estimation(
-                        y_sync[: hdr_len_byte * 8 * chain.osr_rx]
-                    )
-
-                y_sync = y_sync[tau_hat:]
-
-                ## Demodulation and deframing stage
-                bits_hat = chain.demodulate(y_sync)
-
-                if (
-                    chain.ideal_sto_estimation and chain.ideal_preamble_detect
-                ):  # In this case, also assume perfect frame syncrhonization
-                    start_frame = len(chain.preamble) + len(chain.sync_word)
-                elif len(bits_hat) == 0:
-                    preamble_error = True
-                else:  # Frame synchronization
-                    v = np.abs(
-                        np.correlate(
-                            bits_hat * 2 - 1,
-                            np.array(chain.sync_word) * 2 - 1,
-                            mode="full",
-                        )
-                    )
-                    start_frame = np.argmax(v) + 1
-
-                bits_hat_pay = bits_hat[
-                    start_frame : start_frame + chain.payload_len
-                ]  # Demodulated payload bits
-
-                ## Computing performance metrics
-                if len(bits) == len(bits_hat_pay) and not preamble_error:
-                    errors = bits ^ bits_hat_pay
-
-                else:  # if the number of demodulated symbols is incorrect
-                    errors = 0.5 * np.ones(len(bits))  # flag all bits as wrong
-            # end if preamble
-
-            bit_errors[k] += np.sum(errors)
-            packet_errors[k] += 1 if any(errors) else 0
-            cfo_err[k] += (cfo - cfo_hat) ** 2
-            sto_err[k] += (
-                (
-                    start_idx
-                    + len(chain.preamble) * chain.osr_rx
-                    + len(chain.sync_word) * chain.osr_rx
-                )
-                / (R * B)
-                - (detect_idx + tau_hat + start_frame * chain.osr_rx) / (R * B)
-            ) ** 2
+    # Read file:
+    # data = np.loadtxt('test.csv')
+    # SNRs_dB = data[:,0]
+    # ...
 
-    # Metrics
-    BER = bit_errors / chain.payload_len / chain.n_packets
-    PER = packet_errors / chain.n_packets
-    RMSE_cfo = np.sqrt(cfo_err / chain.n_packets) / B
-    RMSE_sto = np.sqrt(sto_err / chain.n_packets) * B
-    preamble_mis = preamble_misdetect / chain.n_packets
-    preamble_false = preamble_false_detect / chain.n_packets
+    if not plot:
+        return
 
     # FIR response plot
-    if chain.numtaps != 0:
+    if taps is not None:
         # Filter transfer function
-        w, h = freqz(taps)
+        w, h = freqz(taps.taps)
         f = w * fs * 0.5 / np.pi
         _fig, ax = plt.subplots(1, 1, constrained_layout=True, figsize=(7, 4))
         ax.set_title("FIR response")
@@ -289,6 +994,7 @@ def main(chain_name: str, seed: int, dest: Path):  # noqa: C901
 
     _fig, ax = plt.subplots(1, 2, constrained_layout=True, figsize=(10, 4))
     ax[0].plot(EsN0s_dB, BER, "-s", label="Simulation")
+    ax[0].fill_between(EsN0s_dB, BER_low, BER_high, alpha=0.3)
     ax[0].plot(EsN0_th, BER_th, label="AWGN Th. FSK")
     ax[0].plot(EsN0_th, BER_th_noncoh, label="AWGN Th. FSK non-coh.")
     ax[0].plot(EsN0_th, BER_th_BPSK, label="AWGN Th. BPSK")
@@ -302,6 +1008,7 @@ def main(chain_name: str, seed: int, dest: Path):  # noqa: C901
     ax[0].legend()
     # Packet error rate
     ax[1].plot(EsN0s_dB, PER, "-s", label="Simulation")
+    ax[1].fill_between(EsN0s_dB, PER_low, PER_high, alpha=0.3)
     ax[1].plot(EsN0_th, 1 - (1 - BER_th) ** chain.payload_len, label="AWGN Th. FSK")
     ax[1].plot(
         EsN0_th,
@@ -345,25 +1052,6 @@ def main(chain_name: str, seed: int, dest: Path):  # noqa: C901
 
     plt.show()
 
-    # Save simulation outputs (for later post-processing, building new figures,...)
-    save_var = np.column_stack(
-        (
-            EsN0s_dB,
-            BER,
-            PER,
-            RMSE_cfo,
-            RMSE_sto,
-            preamble_mis,
-            preamble_false,
-        )
-    )
-    np.savetxt(dest, save_var, delimiter="\t")
-
-    # Read file:
-    # data = np.loadtxt('test.csv')
-    # SNRs_dB = data[:,0]
-    # ...
-
 
 if __name__ == "__main__":
     main()
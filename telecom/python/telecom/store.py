@@ -0,0 +1,94 @@
+"""Append-only storage of simulation results, to resume interrupted simulations."""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+
+class ResultStore:
+    """
+    Directory of ``.npz`` shards, one per chunk of simulated packets.
+
+    Each simulation gets its own sub-directory, keyed by the chain name,
+    the seed and the simulation parameters. It contains a ``meta.json``
+    file, describing the simulation, and the shards, written once and never
+    modified. Hence, a simulation run again with the same key can skip
+    the chunks that were already completed.
+    """
+
+    def __init__(self, root: Path, chain_name: str, seed: int, params: dict):
+        """
+        :param root: The directory containing all simulations.
+        :param chain_name: The chain simulated, in the form 'module.ClassName'.
+        :param seed: The random seed.
+        :param params: The (JSON serializable) simulation parameters.
+        """
+        meta = {"chain_name": chain_name, "seed": seed, "params": params}
+        key = hashlib.sha256(json.dumps(meta, sort_keys=True).encode()).hexdigest()
+        class_name = chain_name.rsplit(".", 1)[-1]
+
+        self.path = Path(root) / f"{class_name}-{key[:16]}"
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        meta_file = self.path / "meta.json"
+        if not meta_file.exists():
+            meta_file.write_text(json.dumps(meta, indent=2))
+
+    def shard_path(self, index: int) -> Path:
+        return self.path / f"chunk_{index:06d}.npz"
+
+    def load(self, index: int) -> dict[str, np.ndarray] | None:
+        """
+        Load a shard.
+
+        :param index: The index of the chunk.
+        :return: The arrays of the shard, or None if the chunk was not completed.
+        """
+        path = self.shard_path(index)
+        if not path.exists():
+            return None
+        with np.load(path) as shard:
+            return dict(shard)
+
+    def append(self, index: int, arrays: dict[str, np.ndarray]) -> None:
+        """
+        Write a shard.
+
+        The shard is first written to a temporary file, so an interrupted
+        write never leaves a partial shard behind.
+
+        :param index: The index of the chunk.
+        :param arrays: The arrays of the shard.
+        """
+        path = self.shard_path(index)
+        tmp_path = path.with_suffix(".tmp.npz")
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+
+def load_results(path: Path) -> tuple[dict, dict[str, np.ndarray]]:
+    """
+    Load the results of a simulation, as stored by :class:`ResultStore`.
+
+    :param path: The directory of the simulation, containing ``meta.json``.
+    :return: The simulation description, and the arrays of all shards
+        summed together (except ``EsN0_dB``, that is the same for all shards).
+    """
+    path = Path(path)
+    meta = json.loads((path / "meta.json").read_text())
+
+    results = {}
+    for shard_path in sorted(path.glob("chunk_*[0-9].npz")):
+        with np.load(shard_path) as shard:
+            for name, value in shard.items():
+                if name == "EsN0_dB":
+                    results[name] = value
+                elif name in results:
+                    results[name] = results[name] + value
+                else:
+                    results[name] = value
+
+    return meta, results
@@ -15,6 +15,52 @@ def rng() -> np.random.Generator:
 class TestBasicChain:
     chain = BasicChain()
 
+    @pytest.mark.parametrize("n_packets", (1, 10))
+    def test_modulate_batch(self, rng: np.random.Generator, n_packets: int):
+        bits = rng.integers(2, size=(n_packets, 100))
+        x = self.chain.modulate(bits)  # all packets modulated at once
+
+        assert x.shape == (n_packets, 100 * self.chain.osr_tx)
+
+        for i in range(n_packets):
+            np.testing.assert_equal(x[i], self.chain.modulate(bits[i]))
+
+    @pytest.mark.parametrize("method", ("preamble_detect", "preamble_detect_ppd"))
+    def test_preamble_detect_batch(self, rng: np.random.Generator, method: str):
+        preamble_detect = getattr(self.chain, method)
+        bits = rng.integers(2, size=(10, 100))
+        x = self.chain.modulate(bits)
+        y, _delay = add_delay(self.chain, x.ravel(), 0)
+        y = np.concatenate((np.zeros(300), y))  # noise-free, but not aligned
+
+        # batch of signals, with packets starting at different indices
+        shifts = rng.integers(len(y) // 2, size=(3, 4))
+        batch = np.stack([np.roll(y, shift) for shift in shifts.flat]).reshape(3, 4, -1)
+        idx = preamble_detect(batch)
+
+        assert idx.shape == (3, 4)
+
+        for i, j in np.ndindex(3, 4):
+            expected = preamble_detect(batch[i, j])
+            assert idx[i, j] == (-1 if expected is None else expected)
+
+    def test_sto_estimation_batch(self, rng: np.random.Generator):
+        bits = rng.integers(2, size=(5, 64))
+        y, _delay = add_delay(self.chain, self.chain.modulate(bits).ravel(), 0)
+        y = y.reshape(5, -1)
+
+        # batch of headers, each with a different timing offset
+        sto = rng.integers(self.chain.osr_rx, size=5)
+        batch = np.stack(
+            [np.roll(y_i, sto_i) for y_i, sto_i in zip(y, sto, strict=True)]
+        )
+        sto_hat = self.chain.sto_estimation(batch)
+
+        assert sto_hat.shape == (5,)
+
+        for i in range(5):
+            assert sto_hat[i] == self.chain.sto_estimation(batch[i])
+
     @pytest.mark.parametrize("size", (1, 10, 100))
     def test_demodulate(self, rng: np.random.Generator, size: int):
         bits = rng.integers(2, size=size)  # choice of bits to send
@@ -29,6 +75,13 @@ class TestBasicChain:
 
         np.testing.assert_equal(bits_hat, bits)
 
+    def test_demodulate_batch(self, rng: np.random.Generator):
+        bits = rng.integers(2, size=(3, 4, 100))
+        y, _delay = add_delay(self.chain, self.chain.modulate(bits).ravel(), 0)
+        y = y.reshape(3, 4, -1)  # batch of received packets
+
+        np.testing.assert_equal(self.chain.demodulate(y), bits)
+
     @pytest.mark.parametrize("size", (1, 10, 100))
     @pytest.mark.parametrize("cfo_val", (0, 100, 1000))
     def test_cfo_estimation(self, rng: np.random.Generator, size: int, cfo_val: float):
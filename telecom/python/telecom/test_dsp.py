@@ -0,0 +1,38 @@
+"""Test that the kernels are the same as the ones of the GNU Radio blocks."""
+
+import ast
+from pathlib import Path
+
+import numpy as np
+
+from . import dsp
+
+GR_FSK = Path(__file__).parents[2] / "sdr/gr-fsk/python"
+
+
+def module_code(path: Path) -> list[str]:
+    """Return the lines of a module after its docstring (headers differ)."""
+    source = path.read_text()
+    docstring = ast.parse(source).body[0]
+    return source.splitlines()[docstring.end_lineno :]
+
+
+def test_dsp_in_sync():
+    assert module_code(Path(dsp.__file__)) == module_code(GR_FSK / "dsp.py")
+
+
+def test_rotator_set_freq():
+    fs = 400e3
+    y = np.ones(5000, dtype=np.complex64)
+    rotator = dsp.Rotator(1000.0, fs, block_len=64)
+    rotator.process(y[:100])
+    table = rotator.table
+
+    # Same frequency, same table
+    rotator.set_freq(1000.0)
+    assert rotator.table is table
+
+    # The phase is continuous
+    rotator.set_freq(-2500.0)
+    phase = 2 * np.pi * (1000.0 * 100 - 2500.0 * np.arange(len(y))) / fs
+    np.testing.assert_allclose(rotator.process(y), np.exp(1j * phase), atol=1e-5)
@@ -0,0 +1,31 @@
+"""Test the FIR filters of the simulations."""
+
+import numpy as np
+import pytest
+from scipy.signal import fftconvolve
+
+from .filters import FIRFilter, lowpass_filter
+
+
+@pytest.mark.parametrize("numtaps", (1, 4, 31, 100))
+@pytest.mark.parametrize("n", (1, 50, 3000))
+def test_fir_filter(numtaps: int, n: int):
+    rng = np.random.default_rng(1234)
+    fir = FIRFilter(rng.normal(size=numtaps))
+    y = rng.normal(size=(3, 2, n)) + 1j * rng.normal(size=(3, 2, n))
+    expected = fftconvolve(y, fir.taps[None, None, :], mode="full", axes=-1)
+
+    # Both methods, whichever is the fastest
+    np.testing.assert_allclose(fir.direct(y), expected, atol=1e-10)
+    np.testing.assert_allclose(fir.overlap_save(y), expected, atol=1e-10)
+
+    start = (numtaps - 1) // 2
+    np.testing.assert_allclose(fir(y), expected[..., start : start + n], atol=1e-10)
+    np.testing.assert_allclose(fir(y, mode="full"), expected, atol=1e-10)
+
+
+def test_lowpass_filter_cache():
+    fir = lowpass_filter(100, 150e3, 400e3)
+    assert lowpass_filter(100, 150e3, 400e3) is fir
+    assert fir.spectrum(512) is fir.spectrum(512)
+    assert fir.use_fft(10000)
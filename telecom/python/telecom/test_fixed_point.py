@@ -0,0 +1,102 @@
+"""Test the fixed-point model of the FIR filter of the FPGA."""
+
+import numpy as np
+import pytest
+
+from .chain import FPGA_FIR_TAPS
+from .filters import FIRFilter
+from .fixed_point import (
+    FixedPointFIR,
+    QFormat,
+    overflow,
+    quantize,
+    round_shift,
+)
+
+
+def reference_fir(fir: FixedPointFIR, x_q: np.ndarray) -> np.ndarray:
+    """Sample by sample, tap by tap, as a MAC of the FPGA."""
+    shift = fir.acc_format.n - fir.output_format.n
+    out = []
+    for n in range(len(x_q)):
+        acc = 0
+        for k, tap in enumerate(fir.taps_q.tolist()):
+            if n - k >= 0:
+                acc = int(
+                    overflow(
+                        acc + tap * int(x_q[n - k]), fir.acc_format, fir.acc_overflow
+                    )
+                )
+        acc = round_shift(acc, shift, fir.output_rounding)
+        out.append(int(overflow(acc, fir.output_format, fir.output_overflow)))
+    return np.array(out)
+
+
+def test_round_shift():
+    q = np.arange(-40, 40)
+    x = q / 8
+    np.testing.assert_equal(round_shift(q, 3, "floor"), np.floor(x))
+    np.testing.assert_equal(round_shift(q, 3, "fix"), np.fix(x))
+    np.testing.assert_equal(round_shift(q, 3, "round"), np.floor(x + 0.5))
+    np.testing.assert_equal(round_shift(q, 3, "convergent"), np.rint(x))
+
+    fmt = QFormat(1, 3)
+    for rounding in ("floor", "fix", "round", "convergent"):
+        np.testing.assert_equal(
+            quantize(x / 8, fmt, rounding), round_shift(q, 3, rounding)
+        )
+
+
+def test_overflow():
+    fmt = QFormat(2, 2)  # [-8, 7]
+    q = np.arange(-20, 20)
+    np.testing.assert_equal(overflow(q, fmt, "saturate"), np.clip(q, -8, 7))
+    np.testing.assert_equal(overflow(q, fmt, "wrap"), (q + 8) % 16 - 8)
+
+
+@pytest.mark.parametrize(
+    "options",
+    (
+        {},
+        {"scaling": "none", "output_rounding": "convergent"},
+        {"acc_format": QFormat(-2, 18), "acc_overflow": "wrap"},
+        {"acc_format": QFormat(-2, 18), "acc_overflow": "saturate"},
+        {"output_format": QFormat(1, 11), "output_overflow": "wrap"},
+    ),
+)
+def test_fixed_point_fir(options: dict):
+    rng = np.random.default_rng(1234)
+    fir = FixedPointFIR(FPGA_FIR_TAPS, **options)
+    x_q = rng.integers(-2048, 2048, size=(2, 2 * 200))
+
+    out = fir.filter_interleaved(x_q)
+    for row, out_row in zip(x_q, out, strict=True):
+        np.testing.assert_equal(out_row[0::2], reference_fir(fir, row[0::2]))
+        np.testing.assert_equal(out_row[1::2], reference_fir(fir, row[1::2]))
+
+
+def test_fixed_point_fir_float():
+    rng = np.random.default_rng(1234)
+    y = 0.5 * np.exp(2j * np.pi * rng.random((3, 1000)))
+    fir = FixedPointFIR(FPGA_FIR_TAPS)
+
+    # Errors of the quantization of the inputs, and of the outputs
+    atol = 2**-11 * np.sum(np.abs(fir.taps_q)) * 2**-7 + 2**-9
+    np.testing.assert_allclose(
+        fir(y), FIRFilter(fir.taps)(y), atol=np.sqrt(2) * atol / fir.scale
+    )
+
+
+def test_fixed_point_fir_testbench():
+    # Impulse response of the FPGA, from the ModelSim testbench of the FIR
+    # (fpga/LimeSDR-Mini_lms7_lelec210x/ip/fir/testbench/mentor/output_fpga.txt)
+    expected = [-4, 3, 0, -12, 23, -20, 0, 43, -100, 147, 507]
+    expected = [0] * 5 + expected + expected[-2::-1] + [0] * 6
+
+    fir = FixedPointFIR(FPGA_FIR_TAPS)
+    x_q = np.zeros(2 * 32, dtype=np.int64)
+    x_q[:2] = 2047  # 0.9999 in Q1.11, on I and Q
+    out = fir.filter_interleaved(x_q)
+
+    np.testing.assert_equal(out[0::2], expected)
+    np.testing.assert_equal(out[1::2], expected)
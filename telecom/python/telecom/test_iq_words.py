@@ -0,0 +1,40 @@
+"""Test the fused I/Q words of the FPGA."""
+
+from pathlib import Path
+
+import numpy as np
+
+from .iq_words import fuse, load_words, save_words, save_words_text, to_complex, unfuse
+
+
+def test_fuse():
+    x_q = np.array([2047, -2048, 0, -1, 1, 5])
+    words = fuse(x_q)
+    np.testing.assert_equal(words, [0x7FF800, 0x000FFF, 0x001005])
+    np.testing.assert_equal(unfuse(words), x_q)
+
+    rng = np.random.default_rng(1234)
+    x_q = rng.integers(-2048, 2048, size=(3, 2 * 100))
+    np.testing.assert_equal(unfuse(fuse(x_q)), x_q)
+    np.testing.assert_equal(fuse(x_q + 4096), fuse(x_q))  # Wrap
+    np.testing.assert_allclose(
+        to_complex(x_q), (x_q[:, 0::2] + 1j * x_q[:, 1::2]) / 2048
+    )
+
+
+def test_words_files(tmp_path: Path):
+    rng = np.random.default_rng(1234)
+    words = fuse(rng.integers(-2048, 2048, size=2 * 1000))
+
+    save_words(tmp_path / "words.bin", words)
+    np.testing.assert_equal(load_words(tmp_path / "words.bin"), words)
+    np.testing.assert_equal(load_words(tmp_path / "words.bin", mmap=True), words)
+
+    path = tmp_path / "words.txt"
+    save_words_text(path, words)
+    assert path.read_text().splitlines()[:3] == [f"{w:06x}" for w in words[:3]]
+    np.testing.assert_equal(load_words(path), words)
+
+    # As written by ModelSim, or by hand
+    path.write_text("7ff800\n0fff\n  001005\n")
+    np.testing.assert_equal(load_words(path), [0x7FF800, 0x000FFF, 0x001005])
@@ -0,0 +1,148 @@
+"""Test the readers of measurements files."""
+
+import importlib.util
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from .measurements import (
+    TEXT_RECORDS,
+    load_measurements,
+    read_text_measurements_file,
+)
+
+GR_FSK = Path(__file__).parents[2] / "sdr/gr-fsk/python"
+
+
+def import_sink_module():
+    """Import the measurements module of the gr-fsk blocks (without GNU Radio)."""
+    spec = importlib.util.spec_from_file_location(
+        "gr_fsk_measurements", GR_FSK / "measurements.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_text_measurements(path: Path, payloads: np.ndarray) -> None:
+    with open(path, "w") as f:
+        for i, payload in enumerate(payloads):
+            f.write(f"CFO={100.5 * i},STO={i % 8}\n")
+            f.write(f"EsN0dB={i / 4:.2f},GRXdB=40,N0={1e-3 * (i + 1)}\n")
+            f.write(
+                f"packet_number={i + 1},correct={i % 2 == 0},"
+                f"payload=[{','.join(map(str, payload))}]\n"
+            )
+
+
+def test_read_text_measurements(tmp_path: Path):
+    rng = np.random.default_rng(1234)
+    payloads = rng.integers(256, size=(50, 20), dtype=np.uint8)
+    path = tmp_path / "measurements.txt"
+    write_text_measurements(path, payloads)
+
+    columns = read_text_measurements_file(path)
+    np.testing.assert_equal(columns["cfo"], 100.5 * np.arange(50))
+    np.testing.assert_equal(columns["sto"], np.arange(50) % 8)
+    np.testing.assert_equal(columns["esn0"], np.round(np.arange(50) / 4, 2))
+    np.testing.assert_equal(columns["grx"], 40)
+    np.testing.assert_allclose(columns["n0"], 1e-3 * np.arange(1, 51))
+    np.testing.assert_equal(columns["packet_number"], np.arange(1, 51))
+    np.testing.assert_equal(columns["correct"], np.arange(50) % 2 == 0)
+    np.testing.assert_equal(columns["payload"], payloads)
+
+    # Chunks cut records anywhere
+    for chunk_size in (1, 100, 1000):
+        chunked = read_text_measurements_file(path, chunk_size=chunk_size)
+        for name, column in columns.items():
+            np.testing.assert_equal(chunked[name], column)
+
+
+def test_load_measurements_cache(tmp_path: Path):
+    rng = np.random.default_rng(1234)
+    path = tmp_path / "measurements.txt"
+    write_text_measurements(path, rng.integers(256, size=(10, 20), dtype=np.uint8))
+
+    columns = load_measurements(path)
+    cache_path = tmp_path / "measurements.txt.npz"
+    assert cache_path.exists()
+
+    cached = load_measurements(path)
+    for name, column in columns.items():
+        np.testing.assert_equal(cached[name], column)
+
+
+def test_read_sink_measurements(tmp_path: Path):
+    # Files written by the blocks, with the record kinds of text files
+    sink_module = import_sink_module()
+    rng = np.random.default_rng(1234)
+    payloads = rng.integers(256, size=(10, 20), dtype=np.uint8)
+    path = tmp_path / "measurements.bin"
+
+    sink = sink_module.MeasurementsSink(path, max_pending=7)
+    for i, payload in enumerate(payloads):
+        sink.record(sink_module.SYNC_DTYPE, 100.5 * i, i % 8)
+        sink.record(sink_module.SNR_DTYPE, i / 4, 40.0, 1e-3 * (i + 1))
+        sink.record(sink_module.packet_dtype(20), i + 1, i % 2 == 0, payload)
+    sink.close()
+
+    dtypes = (
+        sink_module.SYNC_DTYPE,
+        sink_module.SNR_DTYPE,
+        sink_module.packet_dtype(20),
+    )
+    assert [dtype.names for dtype in dtypes] == list(TEXT_RECORDS)
+
+    columns = load_measurements(path)
+    expected = sink_module.read_measurements(path)
+    assert columns.keys() == expected.keys()
+    for name, column in expected.items():
+        np.testing.assert_equal(columns[name], column)
+    np.testing.assert_equal(columns["sto"], np.arange(10) % 8)
+    np.testing.assert_equal(columns["payload"], payloads)
+
+
+def test_sink_bad_records(tmp_path: Path):
+    # A bad record is dropped, and the thread keeps writing the next ones
+    sink_module = import_sink_module()
+    path = tmp_path / "measurements.bin"
+    dtype = sink_module.packet_dtype(4)
+
+    sink = sink_module.MeasurementsSink(path, flush_interval=0.01)
+    sink.record(dtype, 1, True, [1, 2, 3])
+    time.sleep(0.1)
+    assert sink.thread.is_alive()
+    sink.record(dtype, 2, True, [1, 2, 3, 4])
+    sink.close()
+    np.testing.assert_equal(load_measurements(path)["packet_number"], [2])
+
+
+def test_sink_dead_thread(tmp_path: Path):
+    # Records are not queued for a thread that died, it is restarted
+    sink_module = import_sink_module()
+    path = tmp_path / "measurements.bin"
+
+    sink = sink_module.MeasurementsSink(path)
+    sink.thread = threading.Thread(target=lambda: None)
+    sink.thread.start()
+    sink.thread.join()
+    sink.record(sink_module.SYNC_DTYPE, 100.0, 3)
+    sink.close()
+    np.testing.assert_equal(load_measurements(path)["sto"], [3])
+
+
+def test_read_text_payload_lengths(tmp_path: Path):
+    # Different lengths, whose total would fit an array of 3 payloads of 4
+    path = tmp_path / "measurements.txt"
+    path.write_text(
+        "packet_number=1,correct=True,payload=[1,2,3,4]\n"
+        "packet_number=2,correct=True,payload=[5,6]\n"
+        "packet_number=3,correct=True,payload=[7,8,9,10,11,12]\n"
+    )
+
+    for chunk_size in (10, 1000):
+        with pytest.raises(ValueError, match="different lengths"):
+            read_text_measurements_file(path, chunk_size=chunk_size)
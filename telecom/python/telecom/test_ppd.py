@@ -0,0 +1,139 @@
+"""Test the model of the packet presence detector of the FPGA."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from .iq_words import fuse, load_words, save_words, unfuse
+from .ppd import (
+    PacketPresenceDetector,
+    insert_markers,
+    magnitude,
+    open_capture,
+    scan_capture,
+)
+
+TESTBENCH = (
+    Path(__file__).parents[3]
+    / "fpga/LimeSDR-Mini_lms7_lelec210x/ip/packet_presence_detection/testbench/mentor"
+)
+
+
+def reference_ppd(ppd: PacketPresenceDetector, x_q: np.ndarray) -> list[int]:
+    """Clock cycle by clock cycle, as the registers of the FPGA."""
+    short_line, long_line = [0] * 32, [0] * 256
+    short_sum = long_sum = long_rescale = 0
+    short_count = long_count = count = 0
+    short_full = short_arrived = running = False
+    detections = []
+
+    for n, mag in enumerate(magnitude(x_q).tolist()):
+        launch = short_arrived and long_count == 255 and short_sum << 6 > long_rescale
+        if launch:
+            detections.append(n - 2)
+
+        short_out = short_line[n % 32] if short_full else 0
+        long_rescale = ppd.K * long_sum
+        if short_full:
+            long_sum += short_out - long_line[0]
+            long_line = [*long_line[1:], short_out]
+            long_count = min(long_count + 1, 255)
+
+        if launch or running:
+            short_line, short_sum, short_count = [0] * 32, 0, 0
+            short_full = short_arrived = False
+        else:
+            short_sum += mag - short_out
+            short_line[n % 32] = mag
+            if short_count == 31:
+                short_arrived, short_full = short_full, True
+            if not short_arrived:
+                short_count = (short_count + 1) % 32
+
+        if 0 < count < ppd.passthrough_len or (launch and count == 0):
+            count, running = count + 1, True
+        else:
+            count, running = int(launch), launch
+
+    return detections
+
+
+def bursts(rng: np.random.Generator, n_bursts: int) -> np.ndarray:
+    """Return noise with bursts of various amplitudes, as quantized I/Q samples."""
+    x = []
+    for amplitude in rng.uniform(20, 2000, n_bursts):
+        noise_len, burst_len = rng.integers(50, 800, 2)
+        x.append(rng.normal(scale=rng.uniform(1, 30), size=2 * noise_len))
+        x.append(rng.choice([-amplitude, amplitude], size=2 * burst_len))
+    return np.clip(np.concatenate(x), -2048, 2047).astype(np.int64)
+
+
+def test_magnitude():
+    x_q = np.array([3, -8, -2048, -2048, 2047, 0, -5, 5])
+    np.testing.assert_equal(magnitude(x_q), [8, 2560, 2047, 6])
+
+
+@pytest.mark.parametrize("threshold", (1.0, 2.5, 15.0))
+def test_ppd_reference(threshold: float):
+    x_q = bursts(np.random.default_rng(1234), 20)
+    ppd = PacketPresenceDetector(threshold)
+    expected = reference_ppd(ppd, x_q)
+    assert len(expected) > 1
+
+    np.testing.assert_equal(ppd.process(x_q), expected)
+
+
+@pytest.mark.parametrize("chunk_len", (1, 37, 500))
+def test_ppd_streaming(chunk_len: int):
+    x_q = bursts(np.random.default_rng(5678), 20)
+    expected = PacketPresenceDetector(2.0).process(x_q)
+
+    ppd = PacketPresenceDetector(2.0)
+    detections = [
+        ppd.process(x_q[start : start + 2 * chunk_len], chunk_len=64)
+        for start in range(0, len(x_q), 2 * chunk_len)
+    ]
+    np.testing.assert_equal(np.concatenate(detections), expected)
+
+
+def test_ppd_first_detection():
+    rng = np.random.default_rng(42)
+    x_q = np.stack([bursts(rng, 30)[:4000] for _ in range(6)])
+    x_q = x_q.reshape(2, 3, -1)
+    x_q[1, 2] = 0  # Not detected
+
+    expected = [
+        [*PacketPresenceDetector(2.0).process(row), -1][0] for row in x_q.reshape(6, -1)
+    ]
+    first = PacketPresenceDetector(2.0).first_detection(x_q)
+    np.testing.assert_equal(first, np.reshape(expected, (2, 3)))
+
+
+def test_ppd_testbench():
+    # Input and output of the ModelSim testbench of the IP, with
+    # cfg_THRESHOLD = 20 (threshold of 2.5) and cfg_PASSTHROUGH_LEN = 100
+    if not (TESTBENCH / "output_fpga.txt").exists():
+        pytest.skip("No testbench output")
+    words = load_words(TESTBENCH / "input_fpga.txt")
+    output = load_words(TESTBENCH / "output_fpga.txt")[: len(words)]
+
+    detections = PacketPresenceDetector(2.5, 100).process(unfuse(words))
+    np.testing.assert_equal(insert_markers(words, detections), output)
+
+
+def test_scan_capture(tmp_path: Path):
+    x_q = bursts(np.random.default_rng(7), 10)
+    words = fuse(x_q)
+    save_words(tmp_path / "capture.bin", words)
+    samples = (x_q[0::2] + 1j * x_q[1::2]) / 2048
+    samples.astype(np.complex64).tofile(tmp_path / "capture.c64")
+
+    thresholds = [2.0, 5.0]
+    expected = [PacketPresenceDetector(t).process(x_q) for t in thresholds]
+
+    for path, complex64 in (("capture.bin", False), ("capture.c64", True)):
+        capture = open_capture(tmp_path / path, complex64)
+        detections = scan_capture(capture, thresholds, chunk_len=1000)
+        for found, exp in zip(detections, expected, strict=True):
+            np.testing.assert_equal(found, exp)
@@ -0,0 +1,57 @@
+"""Test the comparison of measurements with simulations."""
+
+from pathlib import Path
+
+import matplotlib
+import numpy as np
+from click.testing import CliRunner
+
+from .chain import BasicChain
+from .read_measurements import main, simulation_curves
+from .simulate import simulate_adaptive
+from .store import ResultStore
+from .test_measurements import write_text_measurements
+
+matplotlib.use("Agg")
+
+
+def write_store(root: Path, chain: BasicChain) -> Path:
+    """Simulate a few packets, with their counters in a store."""
+    params = {"EsN0_dB": chain.EsN0_range.tolist(), "payload_len": chain.payload_len}
+    store = ResultStore(root, "telecom.chain.BasicChain", 1234, params)
+    simulate_adaptive(chain, 1234, 4, None, chunk_size=2, store=store)
+    return store.path
+
+
+def test_simulation_curves_store(tmp_path: Path):
+    chain = BasicChain()
+    chain.EsN0_range = np.array([0.0, 10.0])
+    path = write_store(tmp_path, chain)
+
+    curves = simulation_curves(path, chain.payload_len)
+    np.testing.assert_equal(curves["EsN0_dB"], chain.EsN0_range)
+    assert np.all((curves["PER"] >= 0) & (curves["PER"] <= 1))
+    assert np.all(curves["PER_th"] >= curves["BER_th"])
+
+
+def test_read_measurements_store(tmp_path: Path):
+    chain = BasicChain()
+    chain.EsN0_range = np.array([0.0, 10.0])
+    path = write_store(tmp_path / "store", chain)
+
+    payloads = np.tile(np.arange(20, dtype=np.uint8), (10, 1))
+    write_text_measurements(tmp_path / "measurements.txt", payloads)
+
+    result = CliRunner().invoke(
+        main,
+        [
+            str(tmp_path / "measurements.txt"),
+            "-p",
+            "20",
+            "--quiet",
+            "--no-cache",
+            "--simulation-output",
+            str(path),
+        ],
+    )
+    assert result.exit_code == 0, result.output
@@ -0,0 +1,65 @@
+"""Test the simulation of the chain."""
+
+from pathlib import Path
+
+import numpy as np
+
+from .chain import BasicChain
+from .ppd import PacketPresenceDetector
+from .simulate import open_store, simulate
+
+
+def test_simulate_superpose():
+    chain = BasicChain()
+    chain.ideal_cfo_estimation = True
+    EsN0s_dB = np.array([0.0, 5.0, 10.0, 15.0])  # noqa: N806
+
+    counters = simulate(
+        chain, np.random.default_rng(1234), 4, chain.taps, 2, EsN0s_dB=EsN0s_dB
+    )
+    superposed = simulate(
+        chain,
+        np.random.default_rng(1234),
+        4,
+        chain.taps,
+        2,
+        EsN0s_dB=EsN0s_dB,
+        superpose=True,
+    )
+
+    for name, value in counters.items():
+        np.testing.assert_allclose(superposed[name], value)
+
+
+def test_simulate_ppd():
+    chain = BasicChain()  # With an ideal preamble detection, replaced by the PPD
+    chain.ideal_cfo_estimation = True
+    EsN0s_dB = np.array([-10.0, 20.0])  # noqa: N806
+    ppd = PacketPresenceDetector(2.0)
+
+    counters = simulate(
+        chain, np.random.default_rng(1234), 4, chain.taps, 2, EsN0s_dB=EsN0s_dB, ppd=ppd
+    )
+
+    # Not found in the noise at low SNR, found at the preamble at high SNR
+    np.testing.assert_equal(counters["preamble_misdetect"], [4, 0])
+    np.testing.assert_equal(counters["preamble_false_detect"], [0, 0])
+
+
+def test_open_store_chain_key(tmp_path: Path):
+    def store_path(chain):
+        return open_store(tmp_path, "telecom.chain.BasicChain", 1, chain).path
+
+    path = store_path(BasicChain())
+    assert store_path(BasicChain()) == path
+
+    # Edited attributes, or code, of the chain
+    chain = BasicChain()
+    chain.cfo_range = 1000
+    assert store_path(chain) != path
+
+    class EditedChain(BasicChain):
+        def demodulate(self, y):
+            return super().demodulate(y)
+
+    assert store_path(EditedChain()) != path
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+#
+# Copyright 2021 UCLouvain.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+"""
+CRC computation, independent of GNU Radio.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+
+def reflect_data(x, width):
+    # See: https://stackoverflow.com/a/20918545
+    if width == 8:
+        x = ((x & 0x55) << 1) | ((x & 0xAA) >> 1)
+        x = ((x & 0x33) << 2) | ((x & 0xCC) >> 2)
+        x = ((x & 0x0F) << 4) | ((x & 0xF0) >> 4)
+    elif width == 16:
+        x = ((x & 0x5555) << 1) | ((x & 0xAAAA) >> 1)
+        x = ((x & 0x3333) << 2) | ((x & 0xCCCC) >> 2)
+        x = ((x & 0x0F0F) << 4) | ((x & 0xF0F0) >> 4)
+        x = ((x & 0x00FF) << 8) | ((x & 0xFF00) >> 8)
+    elif width == 32:
+        x = ((x & 0x55555555) << 1) | ((x & 0xAAAAAAAA) >> 1)
+        x = ((x & 0x33333333) << 2) | ((x & 0xCCCCCCCC) >> 2)
+        x = ((x & 0x0F0F0F0F) << 4) | ((x & 0xF0F0F0F0) >> 4)
+        x = ((x & 0x00FF00FF) << 8) | ((x & 0xFF00FF00) >> 8)
+        x = ((x & 0x0000FFFF) << 16) | ((x & 0xFFFF0000) >> 16)
+    else:
+        raise ValueError("Unsupported width")
+    return x
+
+
+def crc_poly(data, n, poly, crc=0, ref_in=False, ref_out=False, xor_out=0):
+    """
+    Bit-by-bit CRC computation, kept as a reference for :class:`Crc`.
+    """
+    # See : https://gist.github.com/Lauszus/6c787a3bc26fea6e842dfb8296ebd630
+    g = 1 << n | poly  # Generator polynomial
+
+    # Loop over the data
+    for d in data:
+        # Reverse the input byte if the flag is true
+        if ref_in:
+            d = reflect_data(d, 8)
+
+        # XOR the top byte in the CRC with the input byte
+        crc ^= d << (n - 8)
+
+        # Loop over all the bits in the byte
+        for _ in range(8):
+            # Start by shifting the CRC, so we can check for the top bit
+            crc <<= 1
+
+            # XOR the CRC if the top bit is 1
+            if crc & (1 << n):
+                crc ^= g
+
+    # Reverse the output if the flag is true
+    if ref_out:
+        crc = reflect_data(crc, n)
+
+    # Return the CRC value
+    return crc ^ xor_out
+
+
+class Crc:
+    """
+    Table-driven CRC computation, giving the same results as :func:`crc_poly`.
+
+    The CRC register is updated one byte at a time, with a 256-entry table.
+    With reflected input, the register is kept reflected, so input bytes
+    never need to be reflected.
+
+    Use :func:`get_crc` to reuse the tables of a given CRC.
+    """
+
+    def __init__(self, width, poly, ref_in=False, ref_out=False):
+        if width not in (8, 16, 32):
+            raise ValueError("Unsupported width")
+
+        self.width = width
+        self.poly = poly
+        self.ref_in = ref_in
+        self.ref_out = ref_out
+        self.mask = (1 << width) - 1
+
+        table = []
+        if ref_in:
+            poly_ref = reflect_data(poly, width)
+            for i in range(256):
+                crc = i
+                for _ in range(8):
+                    crc = (crc >> 1) ^ poly_ref if crc & 1 else crc >> 1
+                table.append(crc)
+        else:
+            top = 1 << (width - 1)
+            for i in range(256):
+                crc = i << (width - 8)
+                for _ in range(8):
+                    crc = ((crc << 1) ^ poly if crc & top else crc << 1) & self.mask
+                table.append(crc)
+
+        self.table_list = table  # Faster than NumPy for one packet
+        self.table = np.array(table, dtype=np.uint32)
+        self.table.setflags(write=False)
+
+    def init_register(self, init):
+        return reflect_data(init, self.width) if self.ref_in else init
+
+    def finalize(self, crc, xor_out):
+        if self.ref_in != self.ref_out:
+            crc = reflect_data(crc, self.width)
+        return crc ^ xor_out
+
+    def __call__(self, data, init=0, xor_out=0):
+        """
+        Compute the CRC of one packet.
+
+        :param data: The bytes of the packet.
+        :param init: The initial value of the CRC register.
+        :param xor_out: The value XORed with the final CRC.
+        :return: The CRC.
+        """
+        table = self.table_list
+        crc = self.init_register(init)
+
+        if self.ref_in:
+            for d in bytes(data):
+                crc = (crc >> 8) ^ table[(crc ^ d) & 0xFF]
+        else:
+            shift = self.width - 8
+            mask = self.mask
+            for d in bytes(data):
+                crc = ((crc << 8) & mask) ^ table[(crc >> shift) ^ d]
+
+        return self.finalize(crc, xor_out)
+
+    def compute_batch(self, data, init=0, xor_out=0):
+        """
+        Compute the CRCs of several packets of the same length at once.
+
+        :param data: The bytes of the packets, (..., n_bytes).
+        :param init: The initial value of the CRC register.
+        :param xor_out: The value XORed with the final CRC.
+        :return: The CRCs, (...,).
+        """
+        data = np.asarray(data, dtype=np.uint32)
+        crc = np.full(data.shape[:-1], self.init_register(init), dtype=np.uint32)
+
+        for i in range(data.shape[-1]):  # One vectorized step per byte
+            if self.ref_in:
+                crc = (crc >> 8) ^ self.table[(crc ^ data[..., i]) & 0xFF]
+            else:
+                crc = ((crc << 8) & self.mask) ^ self.table[
+                    (crc >> (self.width - 8)) ^ data[..., i]
+                ]
+
+        return self.finalize(crc, xor_out)
+
+    def verify_batch(self, data, crc, init=0, xor_out=0):
+        """
+        Verify the CRCs of several packets of the same length at once.
+
+        :param data: The bytes of the packets, (..., n_bytes).
+        :param crc: The received CRCs, as big-endian bytes, (..., width // 8).
+        :param init: The initial value of the CRC register.
+        :param xor_out: The value XORed with the final CRC.
+        :return: Whether each CRC is correct, (...,).
+        """
+        crc = np.asarray(crc, dtype=np.uint32)
+        weights = 1 << (8 * np.arange(crc.shape[-1] - 1, -1, -1, dtype=np.uint32))
+        received = (crc * weights).sum(axis=-1, dtype=np.uint32)
+
+        return self.compute_batch(data, init, xor_out) == received
+
+
+@lru_cache
+def get_crc(width, poly, ref_in=False, ref_out=False):
+    """
+    Return the (cached) table-driven CRC for the given parameters.
+    """
+    return Crc(width, poly, ref_in, ref_out)
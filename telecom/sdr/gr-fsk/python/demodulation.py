@@ -23,16 +23,15 @@ from distutils.version import LooseVersion
 import numpy as np
 from gnuradio import gr
 
-
+from .dsp import noncoherent_demodulate
+from .instrumentation import instrument
 
 
 def demodulate(y, B, R, Fdev):
     """
     Non-coherent demodulator.
     """
-    nb_syms = int(len(y) / R)
-    bits_hat = np.zeros(nb_syms, dtype=int)
-    return bits_hat  # TODO
+    return noncoherent_demodulate(y, B, R, Fdev)
 
 
 
@@ -65,23 +64,20 @@ class demodulation(gr.basic_block):
 
         return ninput_items_required
 
-    def symbols_to_bytes(self, symbols):
+    def symbols_to_bytes(self, symbols, out=None):
         """
-        Converts symbols (bits here) to bytes
+        Converts symbols (bits here) to bytes, MSB first.
+        Bytes are written into out (e.g., the output buffer) if provided.
+        Trailing symbols that do not fill a byte are ignored.
         """
-        if len(symbols) == 0:
-            return []
-
-        n_bytes = int(len(symbols) / 8)
-        bitlists = np.array_split(symbols, n_bytes)
-        out = np.zeros(n_bytes).astype(np.uint8)
-
-        for i, l in enumerate(bitlists):
-            for bit in l:
-                out[i] = (out[i] << 1) | bit
+        n_bytes = len(symbols) // 8
+        if out is None:
+            out = np.empty(n_bytes, dtype=np.uint8)
 
-        return out
+        out[:n_bytes] = np.packbits(symbols[: n_bytes * 8])
+        return out[:n_bytes]
 
+    @instrument
     def general_work(self, input_items, output_items):
         n_syms = len(output_items[0]) * 8
         buf_len = n_syms * self.osr
@@ -90,7 +86,6 @@ class demodulation(gr.basic_block):
         self.consume_each(buf_len)
 
         s = demodulate(y, self.drate, self.osr, self.fdev)
-        b = self.symbols_to_bytes(s)
-        output_items[0][: len(b)] = b
+        b = self.symbols_to_bytes(s, out=output_items[0])
 
         return len(b)
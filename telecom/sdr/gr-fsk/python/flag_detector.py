@@ -22,8 +22,11 @@
 from distutils.version import LooseVersion
 
 import numpy as np
+import pmt
 from gnuradio import gr
 
+from .instrumentation import instrument
+from .preamble_detect import PACKET_LEN_TAG
 from .utils import logging
 
 
@@ -32,7 +35,7 @@ class flag_detector(gr.basic_block):
     docstring for block flag_detector
     """
 
-    def __init__(self, drate, fsamp, packet_len, enable):
+    def __init__(self, drate, fsamp, packet_len, enable, tag_packets=False):
         self.drate = drate
         self.fsamp = fsamp
         self.packet_len = packet_len  # in bytes
@@ -40,6 +43,8 @@ class flag_detector(gr.basic_block):
         self.rem_samples = 0
         self.flag = 0.95
         self.enable = enable
+        # Tagged stream: each packet starts with a tag giving its length
+        self.tag_packets = tag_packets
 
         self.filter_len = (
             8 * self.osr
@@ -72,6 +77,7 @@ class flag_detector(gr.basic_block):
     def set_enable(self, enable):
         self.enable = enable
 
+    @instrument
     def general_work(self, input_items, output_items):
         if self.rem_samples > 0:  # We are processing a previously detected packet
             N = len(output_items[0])  # available space at output
@@ -105,6 +111,13 @@ class flag_detector(gr.basic_block):
             # A window corresponding to the length of a full packet + 1 byte + 1 symbol
             # is transferred to the output
             self.rem_samples = 8 * self.osr * (self.packet_len + 1) + self.osr
+            if self.tag_packets:  # The window starts with the next output sample
+                self.add_item_tag(
+                    0,
+                    self.nitems_written(0),
+                    PACKET_LEN_TAG,
+                    pmt.from_long(self.rem_samples),
+                )
 
             n_out = min(N - pos, self.rem_samples)
             output_items[0][:n_out] = input_items[0][pos : (pos + n_out)]
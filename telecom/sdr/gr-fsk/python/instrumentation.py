@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+#
+# Copyright 2021 UCLouvain.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+"""
+Throughput and latency statistics of the blocks, independent of GNU Radio.
+
+Decorate the general_work method of a block with :func:`instrument` to
+record, for each call, its duration, the numbers of items consumed and
+produced, and the numbers of input items available and output items
+requested (i.e., the occupancy of the buffers). Values are recorded in
+fixed-size histograms, so memory does not grow with the number of calls.
+
+When the FSK_STATS_PORT environment variable is set, the statistics of all
+blocks are served live, as JSON, on http://127.0.0.1:$FSK_STATS_PORT/.
+"""
+
+import http.server
+import json
+import math
+import os
+import threading
+from functools import wraps
+from time import perf_counter
+
+import numpy as np
+
+
+class Histogram:
+    """
+    Histogram with logarithmic buckets, as HDR histograms.
+
+    Each octave above ``lowest`` is split in ``sub_buckets`` linear buckets,
+    so values are recorded with a relative precision of 1 / sub_buckets,
+    up to ``highest``. Values below ``lowest`` (e.g., 0 items) are counted
+    in the first bucket, and values above ``highest`` in the last one.
+    The mean and the standard deviation are computed exactly (Welford).
+    """
+
+    def __init__(self, lowest, highest, sub_buckets=32):
+        self.lowest = lowest
+        self.sub_buckets = sub_buckets
+        n_octaves = math.ceil(math.log2(highest / lowest))
+        self.counts = np.zeros(n_octaves * sub_buckets + 2, dtype=np.int64)
+
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the mean
+        self.max = 0.0
+
+    def index(self, value):
+        if value < self.lowest:
+            return 0
+        mantissa, exponent = math.frexp(value / self.lowest)  # mantissa in [0.5, 1)
+        sub = int((2 * mantissa - 1) * self.sub_buckets)
+        return min(1 + (exponent - 1) * self.sub_buckets + sub, len(self.counts) - 1)
+
+    def upper_edge(self, index):
+        """Return the largest value counted in a bucket (lowest for the first one)."""
+        if index == 0:
+            return self.lowest
+        octave, sub = divmod(index - 1, self.sub_buckets)
+        return self.lowest * 2**octave * (1 + (sub + 1) / self.sub_buckets)
+
+    def record(self, value):
+        self.counts[self.index(value)] += 1
+
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.max = max(self.max, value)
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def percentile(self, q):
+        """Return (an upper bound of) the q-th percentile of the values."""
+        if self.count == 0:
+            return math.nan
+        cumulative = np.cumsum(self.counts)
+        index = int(np.searchsorted(cumulative, q / 100 * self.count))
+        return min(self.upper_edge(index), self.max)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": self.std,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class BlockStats:
+    """Statistics of the calls of general_work of one block."""
+
+    def __init__(self):
+        self.duration = Histogram(1e-6, 10)  # In seconds
+        self.consumed = Histogram(1, 2**24)
+        self.produced = Histogram(1, 2**24)
+        self.available = Histogram(1, 2**24)  # Input items, when called
+        self.requested = Histogram(1, 2**24)  # Output items, when called
+
+        self.items_consumed = 0
+        self.items_produced = 0
+        self.busy_time = 0.0
+        self.start = perf_counter()
+
+    def record(self, duration, consumed, produced, available, requested):
+        self.duration.record(duration)
+        self.consumed.record(consumed)
+        self.produced.record(produced)
+        self.available.record(available)
+        self.requested.record(requested)
+
+        self.items_consumed += consumed
+        self.items_produced += produced
+        self.busy_time += duration
+
+    def summary(self):
+        elapsed = perf_counter() - self.start
+        return {
+            "calls": self.duration.count,
+            "items_consumed": self.items_consumed,
+            "items_produced": self.items_produced,
+            "busy_time": self.busy_time,
+            # Fraction of the time spent in general_work: the bottleneck
+            # of a flowgraph is the block that is busy all the time
+            "load": self.busy_time / elapsed if elapsed > 0 else 0.0,
+            "consumed_per_second": self.items_consumed / self.busy_time
+            if self.busy_time > 0
+            else 0.0,
+            "duration": self.duration.summary(),
+            "consumed": self.consumed.summary(),
+            "produced": self.produced.summary(),
+            "available": self.available.summary(),
+            "requested": self.requested.summary(),
+        }
+
+
+block_stats = {}  # By block name
+block_stats_lock = threading.Lock()
+
+
+def get_block_stats(name):
+    with block_stats_lock:
+        if name not in block_stats:
+            block_stats[name] = BlockStats()
+            start_stats_server()
+        return block_stats[name]
+
+
+def block_name(block):
+    try:
+        return f"{block.name()}_{block.unique_id()}"  # GNU Radio block
+    except AttributeError:
+        return f"{type(block).__name__}_{id(block)}"
+
+
+def instrument(general_work):
+    """
+    Record statistics of the calls of the general_work method of a block.
+
+    The items consumed are counted by wrapping consume_each (and
+    consume) of the block, on its first call.
+    """
+
+    @wraps(general_work)
+    def wrapper(self, input_items, output_items):
+        stats = self.__dict__.get("_block_stats")
+        if stats is None:
+            stats = self._block_stats = get_block_stats(block_name(self))
+            self._items_consumed = 0
+
+            consume_each, consume = self.consume_each, getattr(self, "consume", None)
+
+            def counting_consume_each(n):
+                self._items_consumed += n
+                consume_each(n)
+
+            def counting_consume(i, n):
+                if i == 0:
+                    self._items_consumed += n
+                consume(i, n)
+
+            self.consume_each = counting_consume_each
+            if consume is not None:
+                self.consume = counting_consume
+
+        self._items_consumed = 0
+        start = perf_counter()
+        n_out = general_work(self, input_items, output_items)
+        duration = perf_counter() - start
+
+        stats.record(
+            duration,
+            self._items_consumed,
+            max(n_out, 0),
+            len(input_items[0]) if len(input_items) > 0 else 0,
+            len(output_items[0]) if len(output_items) > 0 else 0,
+        )
+        return n_out
+
+    return wrapper
+
+
+class StatsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        with block_stats_lock:
+            stats = {name: s.summary() for name, s in block_stats.items()}
+        body = json.dumps(stats, indent=2).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # No log line per request
+
+
+stats_server = None
+
+
+def start_stats_server(port=None):
+    """
+    Serve the statistics of all blocks, on a background thread.
+
+    :param port: The local port, FSK_STATS_PORT by default.
+        Nothing is served if neither is given.
+    """
+    global stats_server
+    if stats_server is not None:
+        return
+
+    port = port if port is not None else os.environ.get("FSK_STATS_PORT")
+    if not port:
+        return
+
+    stats_server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", int(port)), StatsHandler
+    )
+    threading.Thread(
+        target=stats_server.serve_forever, name="stats_server", daemon=True
+    ).start()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+#
+# Copyright 2021 UCLouvain.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+"""
+Asynchronous, binary, sink for the measurements of the receiver.
+
+Blocks only push records to a queue; records are serialized, and written
+to the file, by a background thread. The file is a sequence of NumPy
+``.npy`` arrays, each one holding consecutive records of the same kind
+as a structured array, so it can be read back column by column
+(see telecom/python/telecom/measurements.py, that must be kept in sync
+with the record kinds of this file, as checked by its test_measurements.py).
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger("measurements")
+
+SYNC_DTYPE = np.dtype([("cfo", np.float64), ("sto", np.int64)])
+SNR_DTYPE = np.dtype([("esn0", np.float64), ("grx", np.float64), ("n0", np.float64)])
+
+
+def packet_dtype(payload_len):
+    """
+    Return the record kind of received packets.
+
+    :param payload_len: The number of bytes of the payload.
+    """
+    return np.dtype(
+        [
+            ("packet_number", np.int64),
+            ("correct", np.bool_),
+            ("payload", np.uint8, (payload_len,)),
+        ]
+    )
+
+
+class MeasurementsSink:
+    """
+    Measurements file, written by a background thread.
+
+    :meth:`record` never blocks on I/O: it only puts the record on a
+    :class:`queue.SimpleQueue`. The background thread groups pending records
+    by kind and writes them every ``flush_interval`` seconds, or as soon as
+    ``max_pending`` records are waiting. The file is only created when
+    the first records are written, and all records are written at exit.
+    """
+
+    def __init__(self, filename, flush_interval=1.0, max_pending=4096):
+        self.filename = filename
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self.queue = queue.SimpleQueue()
+        self.file = None
+        self.thread = None
+        self.thread_lock = threading.Lock()  # Only taken to start the thread
+
+    def record(self, dtype, *values):
+        """
+        Add a record to the measurements.
+
+        :param dtype: The kind of record, e.g., :data:`SYNC_DTYPE`.
+        :param values: The values of the fields of the record.
+        """
+        if self.thread is None or not self.thread.is_alive():
+            self.start()
+        self.queue.put((dtype, values))
+
+    def start(self):
+        """Start the background thread, or restart it if it died."""
+        with self.thread_lock:
+            if self.thread is None or not self.thread.is_alive():
+                if self.thread is None:
+                    atexit.register(self.close)
+                else:
+                    logger.error("measurements thread died, restarted")
+                self.thread = threading.Thread(
+                    target=self.run, name="measurements", daemon=True
+                )
+                self.thread.start()
+
+    def close(self):
+        """Write all pending records, and close the file."""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def run(self):
+        pending = {}  # Records waiting to be written, by kind
+        n_pending = 0
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            try:
+                item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = ()
+
+            if item:
+                dtype, values = item
+                pending.setdefault(dtype, []).append(values)
+                n_pending += 1
+
+            if (
+                not item  # Stop or timeout
+                or n_pending >= self.max_pending
+                or time.monotonic() >= deadline
+            ):
+                self.write(pending)
+                pending = {}
+                n_pending = 0
+                deadline = time.monotonic() + self.flush_interval
+
+            if item is None:
+                return
+
+    def write(self, pending):
+        """
+        Write the pending records, by kind.
+
+        A kind whose records cannot be written (e.g., a payload of the wrong
+        length) is logged and dropped, so the thread keeps running.
+        """
+        for dtype, rows in pending.items():
+            try:
+                records = np.array(rows, dtype=dtype)
+                if self.file is None:
+                    self.file = open(self.filename, "wb")
+                np.save(self.file, records)
+                self.file.flush()
+            except Exception:
+                logger.exception(f"{len(rows)} measurements records dropped")
+
+
+def read_measurements(filename):
+    """
+    Read a measurements file written by :class:`MeasurementsSink`.
+
+    :param filename: The measurements file.
+    :return: The columns of all records, by field name. Columns of the same
+        kind of record have the same length.
+    """
+    chunks = {}
+    with open(filename, "rb") as f:
+        while f.peek(1):  # Until the end of the file
+            records = np.load(f)
+            for name in records.dtype.names:
+                chunks.setdefault(name, []).append(records[name])
+
+    return {name: np.concatenate(columns) for name, columns in chunks.items()}
@@ -20,13 +20,22 @@
 
 
 from distutils.version import LooseVersion
+from time import monotonic
 
 import numpy as np
 import pmt
 from gnuradio import gr
 
+from .dsp import RunningVariance, chunk_moments
+from .instrumentation import instrument
 from .utils import logging
 
+IDLE_FACTOR = 2  # Windows with more power than that are assumed to contain packets
+# Rise of the noise floor per window, so that it follows an increase of
+# the noise (it can double every 64 windows)
+FLOOR_RISE = 2 ** (1 / 64)
+LOG_INTERVAL = 1.0  # Minimum time between two periodic log messages, in seconds
+
 
 class onQuery_noise_estimation(gr.basic_block):
     """
@@ -35,18 +44,23 @@ class onQuery_noise_estimation(gr.basic_block):
 
     def query_estimation(self, query):
         if query == 1:
-            self.est_counter = 1
-            self.mean_noise_est = 0
+            self.estimator.reset()
             self.do_a_query = 1
 
-    def __init__(self, n_samples, n_est, query, osr):
+    def __init__(self, n_samples, n_est, query, osr, continuous=False):
         self.osr = osr
         self.n_samples = n_samples
         self.n_est = n_est
-        self.mean_noise_est = 0
-        self.est_counter = 1
+        # Noise power and DC offset, accumulated over n_est * n_samples samples
+        self.estimator = RunningVariance()
         self.noise_est = None
         self.do_a_query = 0
+        # Also estimate the noise power outside of queries, on the windows
+        # of n_samples samples without packets
+        self.continuous = continuous
+        # Reference of the idle windows: running minimum of the sum of squared
+        # deviations of the windows, that rises by FLOOR_RISE per window
+        self.noise_floor = np.inf
         self.last_print = 0.0
 
         gr.basic_block.__init__(
@@ -57,7 +71,6 @@ class onQuery_noise_estimation(gr.basic_block):
 
         self.gr_version = gr.version()
 
-
     def forecast(self, noutput_items, ninputs):
         """
         Forecast is only called from a general block
@@ -69,32 +82,65 @@ class onQuery_noise_estimation(gr.basic_block):
 
         return ninput_items_required
 
+    def set_continuous(self, continuous):
+        self.continuous = continuous
+
+    def log_periodic(self, message):
+        """Log a message, unless another one was logged less than LOG_INTERVAL ago."""
+        now = monotonic()
+        if now - self.last_print >= LOG_INTERVAL:
+            self.last_print = now
+            self.logger.info(message)
+
+    @instrument
     def general_work(self, input_items, output_items):
-        if self.do_a_query == 0:
-            self.consume_each(len(input_items[0]))
-        else:
-            y = input_items[0]
-            dc_offset = np.mean(y)
-            self.noise_est = np.var(y)
-            self.consume_each(len(y))
-            self.mean_noise_est = self.mean_noise_est + self.noise_est
-            self.logger.info(
-                f"estimated noise power: {self.noise_est:.2e} ({10 * np.log10(self.noise_est):.2f}dB, Noise std : {np.sqrt(self.noise_est):.2e},  DC offset: {np.abs(dc_offset):.2e}, calc. on {len(y)} samples)"
+        y = input_items[0]
+        self.consume_each(len(y))
+
+        if self.do_a_query == 1:  # All samples are noise
+            self.estimator.update(y)
+        elif self.continuous:
+            # Statistics of each window, the ones with packets are discarded
+            n_windows = len(y) // self.n_samples
+            windows = y[: n_windows * self.n_samples].reshape(n_windows, self.n_samples)
+            mean, m2 = chunk_moments(windows)
+
+            if n_windows == 0:
+                return 0
+
+            floor = min(
+                self.noise_floor * FLOOR_RISE**n_windows,
+                np.min(m2 * FLOOR_RISE ** np.arange(n_windows - 1, -1, -1)),
             )
+            if IDLE_FACTOR * floor < self.noise_floor:
+                # Quieter than the windows accumulated so far, that were not idle
+                self.estimator.reset()
+            self.noise_floor = floor
 
-            if self.est_counter == self.n_est:
-                mean_noisP = self.mean_noise_est / self.est_counter
-                PMT_msg = pmt.from_double(mean_noisP)
-                self.message_port_pub(pmt.intern("NoisePow"), PMT_msg)
+            idle = m2 <= IDLE_FACTOR * floor
+            self.estimator.merge(self.n_samples, mean[idle], m2[idle])
+        else:
+            return 0
+
+        if self.estimator.n == 0:
+            return 0
 
-                self.logger.info(
-                    f"===== > Final estimated noise power: {mean_noisP:.2e} ({10 * np.log10(mean_noisP):.2f}dB, Noise std : {np.sqrt(mean_noisP):.2e})"
-                )
-                self.est_counter = 1
-                self.mean_noise_est = 0
-                self.do_a_query = 0
+        self.log_periodic(
+            f"estimated noise power: {self.estimator.variance:.2e} ({10 * np.log10(self.estimator.variance):.2f}dB, DC offset: {np.abs(self.estimator.mean):.2e}, calc. on {self.estimator.n} samples)"
+        )
 
+        if self.estimator.n >= self.n_est * self.n_samples:
+            self.noise_est = self.estimator.variance
+            PMT_msg = pmt.from_double(self.noise_est)
+            self.message_port_pub(pmt.intern("NoisePow"), PMT_msg)
+
+            message = f"===== > Final estimated noise power: {self.noise_est:.2e} ({10 * np.log10(self.noise_est):.2f}dB, Noise std : {np.sqrt(self.noise_est):.2e})"
+            if self.do_a_query == 1:
+                self.logger.info(message)
             else:
-                self.est_counter = self.est_counter + 1
+                self.log_periodic(message)
+
+            self.estimator.reset()
+            self.do_a_query = 0
 
         return 0
@@ -23,59 +23,16 @@ from distutils.version import LooseVersion
 import numpy as np
 from gnuradio import gr
 
-from .utils import logging, measurements_logger
-
-
-def reflect_data(x, width):
-    # See: https://stackoverflow.com/a/20918545
-    if width == 8:
-        x = ((x & 0x55) << 1) | ((x & 0xAA) >> 1)
-        x = ((x & 0x33) << 2) | ((x & 0xCC) >> 2)
-        x = ((x & 0x0F) << 4) | ((x & 0xF0) >> 4)
-    elif width == 16:
-        x = ((x & 0x5555) << 1) | ((x & 0xAAAA) >> 1)
-        x = ((x & 0x3333) << 2) | ((x & 0xCCCC) >> 2)
-        x = ((x & 0x0F0F) << 4) | ((x & 0xF0F0) >> 4)
-        x = ((x & 0x00FF) << 8) | ((x & 0xFF00) >> 8)
-    elif width == 32:
-        x = ((x & 0x55555555) << 1) | ((x & 0xAAAAAAAA) >> 1)
-        x = ((x & 0x33333333) << 2) | ((x & 0xCCCCCCCC) >> 2)
-        x = ((x & 0x0F0F0F0F) << 4) | ((x & 0xF0F0F0F0) >> 4)
-        x = ((x & 0x00FF00FF) << 8) | ((x & 0xFF00FF00) >> 8)
-        x = ((x & 0x0000FFFF) << 16) | ((x & 0xFFFF0000) >> 16)
-    else:
-        raise ValueError("Unsupported width")
-    return x
-
-
-def crc_poly(data, n, poly, crc=0, ref_in=False, ref_out=False, xor_out=0):
-    # See : https://gist.github.com/Lauszus/6c787a3bc26fea6e842dfb8296ebd630
-    g = 1 << n | poly  # Generator polynomial
-
-    # Loop over the data
-    for d in data:
-        # Reverse the input byte if the flag is true
-        if ref_in:
-            d = reflect_data(d, 8)
-
-        # XOR the top byte in the CRC with the input byte
-        crc ^= d << (n - 8)
-
-        # Loop over all the bits in the byte
-        for _ in range(8):
-            # Start by shifting the CRC, so we can check for the top bit
-            crc <<= 1
-
-            # XOR the CRC if the top bit is 1
-            if crc & (1 << n):
-                crc ^= g
-
-    # Reverse the output if the flag is true
-    if ref_out:
-        crc = reflect_data(crc, n)
-
-    # Return the CRC value
-    return crc ^ xor_out
+from .crc import get_crc
+from .dsp import extract_frames
+from .instrumentation import instrument
+from .measurements import packet_dtype
+from .utils import logging, measurements
+
+# CRC-8 of the packets (polynomial 0x07, initial value 0xFF)
+CRC_WIDTH = 8
+CRC_POLY = 0x07
+CRC_INIT = 0xFF
 
 
 class packet_parser(gr.basic_block):
@@ -94,6 +51,9 @@ class packet_parser(gr.basic_block):
 
         self.packet_len = self.hdr_len + self.payload_len + self.crc_len
         self.address = address
+        self.crc = get_crc(CRC_WIDTH, CRC_POLY)
+        self.measurements = measurements  # Can be replaced, e.g., by replay.py
+        self.measurements_dtype = packet_dtype(self.payload_len)
 
         gr.basic_block.__init__(
             self,
@@ -112,6 +72,7 @@ class packet_parser(gr.basic_block):
         """
         ninput_items_required = [0] * ninputs
         for i in range(ninputs):
+            # at least one packet, but all the available ones are processed
             ninput_items_required[i] = self.packet_len + 1  # in bytes
 
         return ninput_items_required
@@ -122,62 +83,41 @@ class packet_parser(gr.basic_block):
     def set_enable_log(self, enable_log):
         self.enable_log = enable_log
 
+    @instrument
     def general_work(self, input_items, output_items):
-        # we process maximum one packet at a time
-        input_bytes = input_items[0][: self.packet_len + 1]
-        self.consume_each(self.packet_len + 1)
-
-        b = np.unpackbits(input_bytes)  # bytes to bits
+        # we process all the complete packets at once
+        frame_len = self.packet_len + 1  # in bytes
+        n = min(len(input_items[0]) // frame_len, len(output_items[0]))
 
-        # print(b)
+        frames = input_items[0][: n * frame_len].reshape(n, frame_len)
+        self.consume_each(n * frame_len)
 
-        b_hdr = b[: self.hdr_len * 8]
-        v = np.abs(
-            np.correlate(b_hdr * 2 - 1, np.array(self.address) * 2 - 1, mode="full")
+        payloads, crcs, valid = extract_frames(
+            frames, self.hdr_len, self.payload_len, self.crc_len, self.address
         )
-        i = np.argmax(v) + 1
-
-        b_pkt = b[i : i + (self.payload_len + self.crc_len) * 8]
-        pkt_bytes = np.packbits(b_pkt)
-
-        payload = pkt_bytes[0 : self.payload_len]
-        crc = pkt_bytes[self.payload_len : self.payload_len + self.crc_len]
-
-        output_items[0][0] = payload
-
-        crc_verif = crc_poly(
-            bytearray(payload),
-            8,
-            0x07,
-            crc=0xFF,
-            ref_in=False,
-            ref_out=False,
-            xor_out=0,
-        )
-        self.nb_packet += 1
-        is_correct = all(crc == crc_verif)
-        measurements_logger.info(
-            f"packet_number={self.nb_packet},correct={is_correct},payload=[{','.join(map(str, payload))}]"
-        )
-        if is_correct:
-            if self.log_payload:
-                self.logger.info(
-                    f"packet successfully demodulated: {payload} (CRC: {crc})"
-                )
-            output_items[0][: self.payload_len] = payload
-            if self.enable_log:
-                self.logger.info(
-                    f"{self.nb_packet} packets received with {self.nb_error} error(s)"
-                )
-            return 1
-        else:
-            if self.log_payload:
-                self.logger.error(
-                    f"incorrect CRC, packet dropped: {payload} (CRC: {crc})"
-                )
-            self.nb_error += 1
+        crc_verif = self.crc.compute_batch(payloads, init=CRC_INIT)
+        correct = valid & np.all(crcs == crc_verif[:, None], axis=-1)
+
+        for payload, crc, is_correct in zip(payloads, crcs, correct):
+            self.nb_packet += 1
+            self.measurements.record(self.measurements_dtype, self.nb_packet, is_correct, payload)
+            if is_correct:
+                if self.log_payload:
+                    self.logger.info(
+                        f"packet successfully demodulated: {payload} (CRC: {crc})"
+                    )
+            else:
+                if self.log_payload:
+                    self.logger.error(
+                        f"incorrect CRC, packet dropped: {payload} (CRC: {crc})"
+                    )
+                self.nb_error += 1
             if self.enable_log:
                 self.logger.info(
                     f"{self.nb_packet} packets received with {self.nb_error} error(s)"
                 )
-            return 0
+
+        n_out = np.count_nonzero(correct)
+        output_items[0][:n_out] = payloads[correct]
+
+        return n_out
@@ -25,18 +25,28 @@ import numpy as np
 import pmt
 from gnuradio import gr
 
+from .dsp import EnergyDetector, PowerRatioDetector, energy_detect
+from .instrumentation import instrument
+
+DETECT_OFFSET = 20  # Samples skipped after the start of the detected window
+
+# Windows of the power ratio detector ("ppd" method)
+PPD_LONG_LEN = 256
+PPD_SHORT_LEN = 32
+
+# Key of the tags marking the first sample of each packet, with its length
+PACKET_LEN_TAG = pmt.intern("packet_len")
+
 
 def preamble_detect_energy(y, L, threshold):
     """
     Preamble detection.
     """
-    y_abs = np.abs(y)
-    for i in range(0, int(len(y) / L)):
-        sum_abs = np.sum(y_abs[i * L : (i + 1) * L])
-        if sum_abs > threshold * L:
-            return i * L + 20
+    pos = energy_detect(y, L, threshold)
+    if pos < 0:
+        return None
 
-    return None
+    return int(pos) + DETECT_OFFSET
 
 
 class preamble_detect(gr.basic_block):
@@ -44,7 +54,17 @@ class preamble_detect(gr.basic_block):
     docstring for block preamble_detect
     """
 
-    def __init__(self, drate, fdev, fsamp, packet_len, threshold, enable):
+    def __init__(
+        self,
+        drate,
+        fdev,
+        fsamp,
+        packet_len,
+        threshold,
+        enable,
+        method="energy",
+        tag_packets=False,
+    ):
         self.drate = drate
         self.fdev = fdev
         self.fsamp = fsamp
@@ -52,6 +72,12 @@ class preamble_detect(gr.basic_block):
         self.osr = int(fsamp / drate)
         self.threshold = threshold
         self.enable = enable
+        # "energy": average amplitude on a window above threshold
+        # "ppd": average amplitude on a short window above threshold times
+        #        the average amplitude on the long window before it
+        self.method = method
+        # Tagged stream: each packet starts with a tag giving its length
+        self.tag_packets = tag_packets
 
         self.filter_len = (
             8 * self.osr
@@ -59,6 +85,10 @@ class preamble_detect(gr.basic_block):
         # Remaining number of samples that go to output when the block is
         # transparent (i.e., when a preamble is detected)
         self.rem_samples = 0
+        self.power_est = 0
+
+        # Keeps the windows that straddle two calls of general_work
+        self.detector = self.make_detector()
 
         gr.basic_block.__init__(
             self,
@@ -78,65 +108,102 @@ class preamble_detect(gr.basic_block):
         """
         ninput_items_required = [0] * ninputs
         for i in range(ninputs):
-            ninput_items_required[i] = max(
-                noutput_items + self.filter_len, 2 * self.filter_len
-            )
+            ninput_items_required[i] = noutput_items
 
         return ninput_items_required
 
     def set_enable(self, enable):
         self.enable = enable
+        self.detector.reset()
 
     def set_threshold(self, threshold):
         self.threshold = threshold
+        self.detector = self.make_detector()
+
+    def make_detector(self):
+        if self.method == "ppd":
+            K = self.threshold * PPD_SHORT_LEN / PPD_LONG_LEN  # Ratio of the sums
+            return PowerRatioDetector(PPD_LONG_LEN, PPD_SHORT_LEN, K)
 
+        return EnergyDetector(self.filter_len, self.threshold)
+
+    def detect(self, y):
+        """
+        Return the index of y where the packet starts (negative if it started
+        in the previous call), or None if not found.
+        """
+        if self.method == "ppd":
+            pos = int(self.detector.process(y))
+            if pos < 0:
+                return None
+            return pos - PPD_SHORT_LEN  # Start of the short window
+
+        pos = self.detector.process(y)
+        if pos is None:
+            return None
+        return pos + DETECT_OFFSET
+
+    def start_packet(self):
+        # A window corresponding to the length of a full packet + 1 byte + 1 symbol
+        # is transferred to the output
+        self.rem_samples = 8 * self.osr * (self.packet_len + 1) + self.osr
+        self.power_est = 0
+
+        if self.tag_packets:  # The window starts with the next output sample
+            self.add_item_tag(
+                0,
+                self.nitems_written(0),
+                PACKET_LEN_TAG,
+                pmt.from_long(self.rem_samples),
+            )
+
+    def pass_through(self, y, out):
+        """
+        Transfer samples of the current packet to the output, and accumulate
+        their power (with one reduction, without temporary arrays).
+        """
+        out[: len(y)] = y
+        self.power_est += float(np.vdot(y, y).real)
+
+        self.rem_samples -= len(y)
+        if self.rem_samples == 0:
+            window_len = 8 * self.osr * (self.packet_len + 1) + self.osr
+            PMT_msg = pmt.from_double(self.power_est / window_len)
+            self.message_port_pub(pmt.intern("SignalPow"), PMT_msg)
+
+    @instrument
     def general_work(self, input_items, output_items):
         if self.rem_samples > 0:  # We are processing a previously detected packet
             N = len(output_items[0])  # available space at output
             n_out = min(self.rem_samples, N)
 
             # the block is transparent, i.e., all input goes to output
-            self.power_est   += np.sum(np.abs(input_items[0][:n_out])**2)
-            output_items[0][:n_out] = input_items[0][:n_out]
+            self.pass_through(input_items[0][:n_out], output_items[0])
             self.consume_each(n_out)
 
-            self.rem_samples -= n_out
-            if (self.rem_samples == 0) :
-                PMT_msg = pmt.from_double(self.power_est/ (8 * self.osr * (self.packet_len + 1) + self.osr))
-                self.message_port_pub(pmt.intern("SignalPow"), PMT_msg)
-
             return n_out
         else:
-            N = len(output_items[0]) - len(output_items[0]) % self.filter_len
+            N = min(len(input_items[0]), len(output_items[0]))
             if self.enable == 1:
-                y = input_items[0][: N + self.filter_len]
-                pos = preamble_detect_energy(y, self.filter_len, self.threshold)
-                self.power_est = 0
+                y = input_items[0][:N]
+                pos = self.detect(y)
 
                 if (
                     pos is None
                 ):  # no preamble found, we discard the processed samples (no output_items)
                     self.consume_each(N)
                     return 0
-                if (
-                    pos > N
-                ):  # in this case, n_out below is < 0. Consume samples and recompute later
-                    self.consume_each(N)
-                    return 0
-
-                # A window corresponding to the length of a full packet + 1 byte + 1 symbol
-                # is transferred to the output
-                self.rem_samples = 8 * self.osr * (self.packet_len + 1) + self.osr
-
-                n_out = N - pos
 
+                # The detected window may have started in the previous call,
+                # whose samples are already consumed
+                pos = min(max(pos, 0), N)
+                self.detector.reset()
+                self.start_packet()
 
-                self.power_est   += np.sum(np.abs(input_items[0][pos:N])**2)
-
-                output_items[0][:n_out] = input_items[0][pos:N]
-                self.consume_each(N)
-
-                self.rem_samples -= n_out
+                n_out = min(N - pos, self.rem_samples)
+                self.pass_through(input_items[0][pos : pos + n_out], output_items[0])
+                # The samples after the window may hold the next packet
+                self.consume_each(pos + n_out)
 
                 return n_out
 
@@ -18,6 +18,8 @@
 # Boston, MA 02110-1301, USA.
 #
 
+import timeit
+
 import numpy as np
 from demodulation import demodulation
 from gnuradio import blocks, gr, gr_unittest
@@ -78,6 +80,27 @@ class qa_demodulation(gr_unittest.TestCase):
         sink2.data()
         tb.stop()
 
+    def test_002_symbols_to_bytes(self):
+        demod = demodulation(50e3, 25e3, 400e3, 100, 1)
+
+        rng = np.random.default_rng(1234)
+        symbols = rng.integers(2, size=8 * 100_000, dtype=np.uint8)
+        out = np.empty(100_000, dtype=np.uint8)
+
+        b = demod.symbols_to_bytes(symbols, out=out)
+        expected = [
+            int("".join(map(str, byte)), 2) for byte in symbols.reshape(-1, 8)
+        ]
+        self.assertEqual(len(b), len(out))
+        self.assertEqual(list(out), expected)
+
+        # Micro-benchmark
+        n_runs = 100
+        duration = timeit.timeit(
+            lambda: demod.symbols_to_bytes(symbols, out=out), number=n_runs
+        )
+        print(f"symbols_to_bytes: {n_runs * len(out) / duration:.3e} bytes/s")
+
 
 if __name__ == "__main__":
     gr_unittest.run(qa_demodulation)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+#
+# Copyright 2021 UCLouvain.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import unittest
+
+import numpy as np
+from instrumentation import Histogram, instrument
+
+
+class qa_instrumentation(unittest.TestCase):
+    """Runs without GNU Radio."""
+
+    def test_001_histogram(self):
+        rng = np.random.default_rng(1234)
+        values = rng.exponential(1e-3, size=10000)
+
+        hist = Histogram(1e-6, 10, sub_buckets=32)
+        for value in values:
+            hist.record(value)
+
+        self.assertEqual(hist.count, len(values))
+        self.assertAlmostEqual(hist.mean, values.mean())
+        self.assertAlmostEqual(hist.std, values.std(ddof=1))
+        for q in (50, 90, 99):
+            expected = np.percentile(values, q)
+            self.assertGreaterEqual(hist.percentile(q), expected)
+            self.assertLessEqual(hist.percentile(q), expected * (1 + 2 / 32))
+
+    def test_002_instrument(self):
+        class Block:
+            def consume_each(self, n):
+                pass
+
+            @instrument
+            def general_work(self, input_items, output_items):
+                self.consume_each(len(input_items[0]) // 2)
+                return len(output_items[0]) // 4
+
+        block = Block()
+        for n in (100, 1000, 4000):
+            block.general_work([np.zeros(n)], [np.zeros(n)])
+
+        stats = block._block_stats.summary()
+        self.assertEqual(stats["calls"], 3)
+        self.assertEqual(stats["items_consumed"], 2550)
+        self.assertEqual(stats["items_produced"], 1275)
+        self.assertEqual(stats["available"]["max"], 4000)
+
+
+if __name__ == "__main__":
+    unittest.main()
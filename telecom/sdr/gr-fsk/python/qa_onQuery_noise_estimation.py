@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+#
+# Copyright 2021 UCLouvain.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import unittest
+
+import numpy as np
+from replay import blocks
+
+
+def noise(rng, n, power):
+    scale = np.sqrt(power / 2)
+    return (scale * (rng.normal(size=n) + 1j * rng.normal(size=n))).astype(np.complex64)
+
+
+class qa_onQuery_noise_estimation(unittest.TestCase):
+    """Runs without GNU Radio."""
+
+    def setUp(self):
+        self.n_samples = 256
+        self.estimator = blocks.onQuery_noise_estimation.onQuery_noise_estimation(
+            self.n_samples, 20, 0, 8, continuous=True
+        )
+
+    def run_buffers(self, y, buffer_len=4096):
+        for start in range(0, len(y), buffer_len):
+            self.estimator.general_work([y[start : start + buffer_len]], [])
+
+    def test_001_noise_step(self):
+        rng = np.random.default_rng(1234)
+        y = noise(rng, 200000, 1.0)
+        y[50000:60000] *= 10  # Packet
+        self.run_buffers(y)
+        self.assertAlmostEqual(self.estimator.noise_est, 1.0, delta=0.05)
+
+        # 6 dB more noise, more than IDLE_FACTOR
+        y = noise(rng, 400000, 4.0)
+        y[100000:110000] *= 10
+        self.run_buffers(y)
+        self.assertAlmostEqual(self.estimator.noise_est, 4.0, delta=0.2)
+
+    def test_002_packet_first(self):
+        # The first buffer is a packet: it is not noise, as the next ones
+        # (that are just enough for one estimate)
+        rng = np.random.default_rng(5678)
+        y = noise(rng, 3 * 4096, 1.0)
+        y[:4096] *= 10
+        self.run_buffers(y)
+        self.assertAlmostEqual(self.estimator.noise_est, 1.0, delta=0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -18,7 +18,14 @@
 # Boston, MA 02110-1301, USA.
 #
 
+import os
+import tempfile
+
+import numpy as np
+from crc import crc_poly, get_crc
+from dsp import extract_frames
 from gnuradio import gr, gr_unittest
+from measurements import SYNC_DTYPE, MeasurementsSink, packet_dtype, read_measurements
 
 
 class qa_packet_parser(gr_unittest.TestCase):
@@ -33,6 +40,82 @@ class qa_packet_parser(gr_unittest.TestCase):
         self.tb.run()
         # check data
 
+    def test_002_crc(self):
+        rng = np.random.default_rng(1234)
+        data = rng.integers(256, size=(10, 100), dtype=np.uint8)
+
+        for width, poly in ((8, 0x07), (16, 0x1021), (32, 0x04C11DB7)):
+            for ref_in, ref_out in ((False, False), (True, True), (True, False)):
+                crc = get_crc(width, poly, ref_in, ref_out)
+                expected = [
+                    crc_poly(bytearray(d), width, poly, 0xFF, ref_in, ref_out, 0x0F)
+                    for d in data
+                ]
+                self.assertEqual([crc(d, 0xFF, 0x0F) for d in data], expected)
+                self.assertEqual(
+                    list(crc.compute_batch(data, 0xFF, 0x0F)), expected
+                )
+
+                received = [list(c.to_bytes(width // 8, "big")) for c in expected]
+                received[3][0] ^= 1  # Corrupted CRC
+                correct = crc.verify_batch(data, received, 0xFF, 0x0F)
+                self.assertEqual(list(correct), [i != 3 for i in range(10)])
+
+
+    def test_003_extract_frames(self):
+        hdr_len, payload_len, crc_len = 8, 20, 1
+        preamble = np.unpackbits(np.array([0xAA] * 4, dtype=np.uint8))
+        address = np.unpackbits(np.array([0x3E, 0x2A, 0x54, 0xB7], dtype=np.uint8))
+
+        rng = np.random.default_rng(1234)
+        payloads = rng.integers(256, size=(8, payload_len), dtype=np.uint8)
+
+        # One frame per bit offset of the address
+        frames = []
+        for shift, payload in enumerate(payloads):
+            crc = crc_poly(bytearray(payload), 8, 0x07, crc=0xFF)
+            bits = np.concatenate(
+                (
+                    np.zeros(shift, dtype=np.uint8),
+                    preamble,
+                    address,
+                    np.unpackbits(payload),
+                    np.unpackbits(np.array([crc], dtype=np.uint8)),
+                    np.zeros(8 - shift, dtype=np.uint8),
+                )
+            )
+            frames.append(np.packbits(bits))
+
+        payloads_hat, crcs, valid = extract_frames(
+            np.array(frames), hdr_len, payload_len, crc_len, address
+        )
+
+        np.testing.assert_equal(payloads_hat, payloads)
+        self.assertTrue(np.all(valid))
+        self.assertTrue(
+            np.all(get_crc(8, 0x07).verify_batch(payloads_hat, crcs, init=0xFF))
+        )
+
+    def test_004_measurements(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        filename = os.path.join(tmp_dir.name, "measurements.bin")
+        rng = np.random.default_rng(1234)
+        payloads = rng.integers(256, size=(10, 20), dtype=np.uint8)
+
+        sink = MeasurementsSink(filename, flush_interval=0.01, max_pending=3)
+        for i, payload in enumerate(payloads):
+            sink.record(SYNC_DTYPE, 100.0 * i, i % 8)
+            sink.record(packet_dtype(20), i + 1, i % 2 == 0, payload)
+        sink.close()
+
+        data = read_measurements(filename)
+        np.testing.assert_equal(data["cfo"], 100.0 * np.arange(10))
+        np.testing.assert_equal(data["sto"], np.arange(10) % 8)
+        np.testing.assert_equal(data["packet_number"], np.arange(1, 11))
+        np.testing.assert_equal(data["correct"], np.arange(10) % 2 == 0)
+        np.testing.assert_equal(data["payload"], payloads)
+
 
 if __name__ == "__main__":
     gr_unittest.run(qa_packet_parser)
@@ -20,6 +20,8 @@
 
 import matplotlib.pyplot as plt
 import numpy as np
+import pmt
+from dsp import EnergyDetector, PowerRatioDetector, energy_detect, power_ratio_detect
 from gnuradio import blocks, gr, gr_unittest
 from preamble_detect import preamble_detect
 
@@ -74,6 +76,98 @@ class qa_preamble_detect(gr_unittest.TestCase):
         print(sto, cfo)
         """
 
+    def test_002_energy_detector_streaming(self):
+        L = 64
+        threshold = 0.5
+
+        y = np.zeros(10 * L + 13, dtype=np.complex64)
+        y[5 * L + 40 :] = 1  # packet starting in the middle of a window
+
+        pos = int(energy_detect(y, L, threshold))
+        self.assertEqual(pos, 6 * L)
+
+        # Same result when the stream is split in buffers that are not
+        # aligned on the windows
+        detector = EnergyDetector(L, threshold)
+        start = 0
+        for stop in (100, 101, 6 * L + 10, len(y)):
+            found = detector.process(y[start:stop])
+            if found is not None:
+                break
+            start = stop
+
+        self.assertEqual(start + found, pos)
+
+    def test_003_power_ratio_detector_streaming(self):
+        rng = np.random.default_rng(1234)
+        y = 0.1 * (rng.normal(size=(3, 4000)) + 1j * rng.normal(size=(3, 4000)))
+        y[:, 1500:] *= 20  # packets starting at the same index
+
+        pos = power_ratio_detect(y)
+        self.assertTrue(np.all((pos > 1500) & (pos < 1500 + 32)))
+
+        # Same result when the streams are split in buffers
+        detector = PowerRatioDetector()
+        found = np.full(3, -1)
+        start = 0
+        for stop in (100, 1000, 1510, 1600, 4000):
+            idx = detector.process(y[:, start:stop])
+            found = np.where((found < 0) & (idx >= 0), start + idx, found)
+            start = stop
+
+        np.testing.assert_equal(found, pos)
+
+    def test_004_tag_packets(self):
+        fsamp = 400e3
+        drate = 50e3
+        fdev = drate / 2
+        packet_len = 4
+        window_len = 8 * 8 * (packet_len + 1) + 8
+
+        y = np.zeros(3000, dtype=np.complex64)
+        y[1000 : 1000 + window_len] = 1  # One packet
+
+        tb = gr.top_block()
+        source = blocks.vector_source_c(gr_cast(y))
+        detector = preamble_detect(
+            drate, fdev, fsamp, packet_len, 0.5, 1, tag_packets=True
+        )
+        sink = blocks.vector_sink_c()
+        tb.connect(source, detector)
+        tb.connect(detector, sink)
+        tb.run()
+
+        self.assertEqual(len(sink.data()), window_len)
+        tags = sink.tags()
+        self.assertEqual(len(tags), 1)
+        self.assertEqual(tags[0].offset, 0)
+        self.assertEqual(pmt.symbol_to_string(tags[0].key), "packet_len")
+        self.assertEqual(pmt.to_long(tags[0].value), window_len)
+
+    def test_005_back_to_back_packets(self):
+        fsamp = 400e3
+        drate = 50e3
+        fdev = drate / 2
+        packet_len = 4
+        window_len = 8 * 8 * (packet_len + 1) + 8
+
+        y = np.zeros(3000, dtype=np.complex64)
+        y[1000 : 1000 + window_len] = 1  # Two packets, in the same buffer
+        y[1400 : 1400 + window_len] = 1
+
+        tb = gr.top_block()
+        source = blocks.vector_source_c(gr_cast(y))
+        detector = preamble_detect(
+            drate, fdev, fsamp, packet_len, 0.5, 1, tag_packets=True
+        )
+        sink = blocks.vector_sink_c()
+        tb.connect(source, detector)
+        tb.connect(detector, sink)
+        tb.run()
+
+        self.assertEqual(len(sink.data()), 2 * window_len)
+        self.assertEqual([tag.offset for tag in sink.tags()], [0, window_len])
+
 
 def mod_cpfsk(bits, B, R, Fdev):
     f = Fdev / B
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+#
+# Copyright 2021 UCLouvain.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import struct
+import unittest
+
+import numpy as np
+from crc import get_crc
+from dsp import Rotator
+from qa_replay import modulate
+from receiver_bank import ChannelizerStage, merge_packets, receiver_bank
+from replay import replay
+
+
+class qa_receiver_bank(unittest.TestCase):
+    """Runs without GNU Radio."""
+
+    def test_001_receiver_bank(self):
+        drate = 50e3
+        osr = 8
+        fdev = drate / 4
+        fsamp = drate * osr
+        hdr_len, payload_len, crc_len = 8, 100, 1
+        offsets = (-100e3, 100e3)
+
+        # Two transmitters, in adjacent channels, whose packets overlap in time
+        rng = np.random.default_rng(1234)
+        crc = get_crc(8, 0x07)
+        n_samples = 200000
+        y = np.zeros(n_samples, dtype=np.complex64)
+        payloads = {}
+        for sender, offset in enumerate(offsets):
+            start = 1000 + 2000 * sender
+            for serial in range(5):
+                payload = rng.integers(256, size=payload_len, dtype=np.uint8)
+                payload[:8] = np.frombuffer(
+                    struct.pack("!BBHI", 0, sender, payload_len - 24, serial),
+                    dtype=np.uint8,
+                )
+                frame = np.concatenate(
+                    (
+                        [0xAA] * 4,
+                        [0x3E, 0x2A, 0x54, 0xB7],
+                        payload,
+                        [crc(payload, 0xFF)],
+                    )
+                ).astype(np.uint8)
+                x = modulate(np.unpackbits(frame), drate, osr, fdev)
+                y[start : start + len(x)] += Rotator(offset, fsamp).process(x)
+                payloads[start] = payload
+                start += len(x) + 30000
+        y += 0.05 * (rng.normal(size=n_samples) + 1j * rng.normal(size=n_samples))
+
+        params = dict(
+            drate=drate,
+            fdev=fdev,
+            fsamp=fsamp,
+            hdr_len=hdr_len,
+            payload_len=payload_len,
+            crc_len=crc_len,
+            threshold=0.5,
+        )
+        for processes in (False, True):
+            # The second branch of the same channel only adds duplicates
+            packets, _ = receiver_bank(
+                y, offsets + (100e3,), params, processes=processes
+            )
+
+            starts = sorted(payloads)
+            np.testing.assert_equal(packets["payload"], [payloads[s] for s in starts])
+            np.testing.assert_allclose(packets["sample"], starts, atol=2 * 8 * osr)
+
+        # Same serial number, but different content
+        other = packets.copy()
+        other["payload"][:, -1] += 1
+        merged = merge_packets([packets, other], payload_len)
+        self.assertEqual(len(merged), 2 * len(packets))
+
+    def test_002_channelizer_delay(self):
+        # Impulses stay at their sample of the capture, whatever the buffers
+        y = np.zeros(20000, dtype=np.complex64)
+        y[[10, 5000, 19000]] = 1
+        for chunk_len in (16, 1000, 8192):
+            channelizer = ChannelizerStage(0.0, 400e3, 50e3, numtaps=65)
+            out = replay(y, [channelizer], chunk_len=chunk_len, buffer_len=8192)
+
+            self.assertEqual(len(out), len(y) - 32)
+            for k in (10, 5000, 19000):
+                start = max(k - 100, 0)
+                self.assertEqual(start + np.argmax(np.abs(out[start : k + 100])), k)
+
+
+if __name__ == "__main__":
+    unittest.main()
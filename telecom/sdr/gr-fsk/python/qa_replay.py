@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+#
+# Copyright 2021 UCLouvain.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import unittest
+
+import numpy as np
+from crc import get_crc
+from replay import blocks, receiver_blocks, replay, throughput_report
+
+
+def modulate(bits, B, R, Fdev):
+    h = 2 * Fdev / B  # Modulation index
+    signs = np.where(bits, 1.0, -1.0)
+    phase_shifts = np.concatenate(([0], np.cumsum(h * np.pi * signs[:-1])))
+    ph = 2 * np.pi * Fdev * np.arange(R) / R / B
+    x = np.exp(1j * (phase_shifts[:, None] + signs[:, None] * ph))
+    return x.astype(np.complex64).ravel()
+
+
+class qa_replay(unittest.TestCase):
+    """Runs without GNU Radio."""
+
+    def test_001_replay(self):
+        drate = 50e3
+        osr = 8
+        fdev = drate / 4
+        fsamp = drate * osr
+        hdr_len, payload_len, crc_len = 8, 100, 1
+
+        # Capture with packets separated by noise
+        rng = np.random.default_rng(1234)
+        payloads = rng.integers(256, size=(10, payload_len), dtype=np.uint8)
+        crc = get_crc(8, 0x07)
+        parts = []
+        for payload in payloads:
+            frame = np.concatenate(
+                ([0xAA] * 4, [0x3E, 0x2A, 0x54, 0xB7], payload, [crc(payload, 0xFF)])
+            ).astype(np.uint8)
+            parts.append(np.zeros(rng.integers(3000, 9000), dtype=np.complex64))
+            parts.append(modulate(np.unpackbits(frame), drate, osr, fdev))
+        parts.append(np.zeros(10000, dtype=np.complex64))
+        y = np.concatenate(parts)
+        y += 0.05 * (rng.normal(size=len(y)) + 1j * rng.normal(size=len(y)))
+
+        for method, threshold in (("energy", 0.5), ("ppd", 5)):
+            stages = receiver_blocks(
+                drate, fdev, fsamp, hdr_len, payload_len, crc_len, threshold, method
+            )
+            payloads_hat = replay(y, stages, chunk_len=4096, buffer_len=8192)
+
+            np.testing.assert_equal(payloads_hat, payloads)
+            self.assertEqual(stages[0].n_consumed, len(y))
+            print(throughput_report(stages, len(y), sum(s.duration for s in stages)))
+
+    def test_002_back_to_back_packets(self):
+        drate = 50e3
+        fsamp = 8 * drate
+        packet_len = 4
+        window_len = 8 * 8 * (packet_len + 1) + 8
+
+        y = np.zeros(3000, dtype=np.complex64)
+        y[1000 : 1000 + window_len] = 1  # Two packets, in the same buffer
+        y[1400 : 1400 + window_len] = 1
+
+        stage = blocks.preamble_detect.preamble_detect(
+            drate, drate / 4, fsamp, packet_len, 0.5, 1, tag_packets=True
+        )
+        out = replay(y, [stage], chunk_len=len(y), buffer_len=len(y))
+
+        self.assertEqual([tag.offset for tag in stage.tags], [0, window_len])
+        self.assertEqual(len(out), 2 * window_len)
+        self.assertEqual(stage.n_consumed, len(y))
+
+
+if __name__ == "__main__":
+    unittest.main()
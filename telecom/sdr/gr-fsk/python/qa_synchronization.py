@@ -19,6 +19,7 @@
 #
 
 import numpy as np
+from dsp import Rotator
 from gnuradio import blocks, gr, gr_unittest
 from preamble_detect import preamble_detect
 from synchronization import synchronization
@@ -64,6 +65,31 @@ class qa_synchronization(gr_unittest.TestCase):
 
         print(len(y_out))
 
+    def test_002_rotator(self):
+        fsamp = 400e3
+        cfo = 9876.54321
+
+        rng = np.random.default_rng(1234)
+        y = (rng.normal(size=100000) + 1j * rng.normal(size=100000)).astype(
+            np.complex64
+        )
+        expected = np.exp(-1j * 2 * np.pi * cfo * np.arange(len(y)) / fsamp) * y
+
+        # Buffers of random lengths
+        rotator = Rotator(-cfo, fsamp)
+        y_corr = np.empty_like(y)
+        bounds = np.concatenate(([0], np.sort(rng.integers(len(y), size=50)), [len(y)]))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            rotator.process(y[start:end], out=y_corr[start:end])
+
+        np.testing.assert_allclose(y_corr, expected, atol=1e-5)
+
+        # The phase does not drift on long streams
+        rotator.reset()
+        for _ in range(1000):
+            rotator.skip(10**6)
+        self.assertAlmostEqual(rotator.phase, (-cfo / fsamp * 10**9) % 1.0, places=6)
+
 
 if __name__ == "__main__":
     gr_unittest.run(qa_synchronization)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+#
+# Copyright 2021 UCLouvain.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+"""
+Bank of receivers, for transmitters that overlap in time on the same band.
+
+The capture is channelized by a set of frequency shifts: each branch shifts
+its channel (i.e., the carrier of a transmitter, or a guess of its CFO) to
+baseband and low-pass filters it, and then runs the preamble_detect,
+synchronization, demodulation and packet_parser blocks, as replay.py.
+Branches are independent, so they run in parallel, in threads or in
+processes. The packets of all branches are merged in time order, and a
+packet received by several branches (e.g., adjacent channels) is only
+kept once, identified by its CRC and its serial number.
+
+Usage, from this directory:
+
+    python receiver_bank.py ../misc/fsk_capture.mat --offsets -100e3 0 100e3
+"""
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+from crc import get_crc
+from dsp import Rotator
+from replay import basic_block, blocks, receiver_blocks, replay
+
+# Offset of the serial number in the payload, see the packet header of
+# the auth package: version (1 byte), sender (1), length (2), serial (4)
+SERIAL_OFFSET = 4
+SERIAL_LEN = 4
+
+
+def lowpass_taps(numtaps, cutoff, fs):
+    """
+    Return the taps of a low-pass FIR filter (windowed sinc, Hamming window).
+
+    :param numtaps: The number of taps (odd, for an integer group delay).
+    :param cutoff: The cutoff frequency.
+    :param fs: The sampling frequency.
+    :return: The taps, with unit gain at DC, (numtaps,).
+    """
+    n = np.arange(numtaps) - (numtaps - 1) / 2
+    taps = np.sinc(2 * cutoff / fs * n) * np.hamming(numtaps)
+    return (taps / np.sum(taps)).astype(np.float32)
+
+
+def bank_dtype(payload_len):
+    """
+    Return the record kind of the packets received by the bank.
+
+    :param payload_len: The number of bytes of the payload.
+    """
+    return np.dtype(
+        [
+            ("sample", np.int64),  # Detection, in samples of the capture
+            ("offset", np.float64),  # Of the branch, in Hz
+            ("payload", np.uint8, (payload_len,)),
+        ]
+    )
+
+
+class ChannelizerStage(basic_block):
+    """
+    Shift a channel to baseband, and low-pass filter it.
+
+    The group delay of the filter, (numtaps - 1) / 2 samples, is compensated:
+    output items are in the coordinates of the capture (the last items of
+    the capture, whose filter window is incomplete, are not output).
+
+    :param freq: The center frequency of the channel.
+    :param fsamp: The sampling frequency.
+    :param cutoff: The cutoff frequency of the low-pass filter.
+    :param numtaps: The number of taps of the low-pass filter (odd).
+    """
+
+    def __init__(self, freq, fsamp, cutoff, numtaps=65):
+        super().__init__("channelizer", [np.complex64], [np.complex64])
+        self.rotator = Rotator(-freq, fsamp)
+        self.taps = lowpass_taps(numtaps, cutoff, fsamp)
+        # Zeros before the capture, for the first filter windows
+        self.history = np.zeros((numtaps - 1) // 2, dtype=np.complex64)
+
+    def general_work(self, input_items, output_items):
+        n = min(len(input_items[0]), len(output_items[0]))
+        y = np.concatenate((self.history, self.rotator.process(input_items[0][:n])))
+        self.consume_each(n)
+
+        n_out = len(y) - len(self.taps) + 1  # Complete filter windows
+        if n_out <= 0:
+            self.history = y
+            return 0
+
+        self.history = y[n_out:]
+        output_items[0][:n_out] = np.convolve(y, self.taps, mode="valid")
+        return n_out
+
+
+def branch_stages(
+    offset,
+    drate,
+    fdev,
+    fsamp,
+    hdr_len,
+    payload_len,
+    crc_len,
+    threshold,
+    method="energy",
+    cutoff=None,
+    numtaps=65,
+):
+    """
+    Return the stages of a branch of the bank.
+
+    :param offset: The frequency of the channel of the branch.
+    :param cutoff: The cutoff frequency of the channel filter,
+        drate + fdev by default (Carson's bandwidth).
+    :return: The stages, the channelizer first, and then the blocks of
+        :func:`replay.receiver_blocks`.
+    """
+    cutoff = cutoff if cutoff is not None else drate + fdev
+    return [
+        ChannelizerStage(offset, fsamp, cutoff, numtaps),
+        *receiver_blocks(
+            drate, fdev, fsamp, hdr_len, payload_len, crc_len, threshold, method
+        ),
+    ]
+
+
+def run_branch(y, offset, params, chunk_len=8192, buffer_len=8192):
+    """
+    Receive the packets of one channel.
+
+    :param y: The capture, (N,).
+    :param offset: The frequency of the channel.
+    :param params: The other parameters of :func:`branch_stages`, by name.
+    :return: The packets (see :func:`bank_dtype`, their samples are in the
+        coordinates of the capture), and the stages of the branch
+        (None when run in another process).
+    """
+    stages = branch_stages(offset, **params)
+    payloads = replay(y, stages, chunk_len, buffer_len)
+
+    detect, parser = stages[1], stages[-1]
+    packets = np.zeros(len(payloads), dtype=bank_dtype(parser.payload_len))
+    records = parser.measurements.get(parser.measurements_dtype)
+    packet_numbers = records["packet_number"][records["correct"]] - 1  # From 1
+    packets["sample"] = [detect.tags[i].sample for i in packet_numbers]
+    packets["offset"] = offset
+    packets["payload"] = payloads
+    return packets, stages
+
+
+def run_branch_process(*args):
+    # Stages are not sent back to the parent process
+    return run_branch(*args)[0], None
+
+
+def merge_packets(branches, payload_len):
+    """
+    Merge the packets of the branches, in time order, without duplicates.
+
+    Packets with the same CRC and the same serial number are duplicates:
+    only the first one is kept (by time, and then by branch).
+
+    :param branches: The packets of each branch.
+    :param payload_len: The number of bytes of the payload.
+    :return: The packets (see :func:`bank_dtype`).
+    """
+    packets = (
+        np.concatenate(branches) if branches else np.zeros(0, bank_dtype(payload_len))
+    )
+    packets = packets[np.argsort(packets["sample"], kind="stable")]
+
+    parser = blocks.packet_parser
+    crc = get_crc(parser.CRC_WIDTH, parser.CRC_POLY)
+    serial = packets["payload"][:, SERIAL_OFFSET : SERIAL_OFFSET + SERIAL_LEN]
+    keys = np.column_stack(
+        (
+            crc.compute_batch(packets["payload"], init=parser.CRC_INIT),
+            serial.astype(np.uint32) @ (256 ** np.arange(SERIAL_LEN - 1, -1, -1)),
+        )
+    )
+    _, first = np.unique(keys, axis=0, return_index=True)
+    return packets[np.sort(first)]
+
+
+def receiver_bank(
+    y,
+    offsets,
+    params,
+    workers=None,
+    processes=False,
+    chunk_len=8192,
+    buffer_len=8192,
+):
+    """
+    Receive the packets of several channels, in parallel.
+
+    :param y: The capture, (N,).
+    :param offsets: The frequencies of the channels.
+    :param params: The other parameters of :func:`branch_stages`, by name.
+    :param workers: The number of parallel branches, one per channel by default.
+    :param processes: Whether to run the branches in processes, rather than
+        threads (the kernels only partly release the GIL).
+    :return: The merged packets (see :func:`merge_packets`), and the stages
+        of each branch (None for processes).
+    """
+    workers = workers if workers is not None else len(offsets)
+    if processes:
+        executor, function = ProcessPoolExecutor(workers), run_branch_process
+    else:
+        executor, function = ThreadPoolExecutor(workers), run_branch
+
+    with executor:
+        futures = [
+            executor.submit(function, y, offset, params, chunk_len, buffer_len)
+            for offset in offsets
+        ]
+        results = [future.result() for future in futures]
+
+    packets = merge_packets([p for p, _ in results], params["payload_len"])
+    return packets, [stages for _, stages in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("capture", help="complex64 capture file (e.g., .mat)")
+    parser.add_argument(
+        "--offsets", type=float, nargs="+", default=[0.0], help="channels, in Hz"
+    )
+    parser.add_argument("--drate", type=float, default=50e3)
+    parser.add_argument("--osr", type=int, default=8)
+    parser.add_argument("--fdev", type=float, default=None, help="default: drate/4")
+    parser.add_argument("--hdr-len", type=int, default=8)
+    parser.add_argument("--payload-len", type=int, default=100)
+    parser.add_argument("--crc-len", type=int, default=1)
+    parser.add_argument("--threshold", type=float, default=0.05)
+    parser.add_argument("--method", choices=("energy", "ppd"), default="energy")
+    parser.add_argument("--cutoff", type=float, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--processes", action="store_true")
+    args = parser.parse_args()
+
+    params = dict(
+        drate=args.drate,
+        fdev=args.fdev if args.fdev is not None else args.drate / 4,
+        fsamp=args.drate * args.osr,
+        hdr_len=args.hdr_len,
+        payload_len=args.payload_len,
+        crc_len=args.crc_len,
+        threshold=args.threshold,
+        method=args.method,
+        cutoff=args.cutoff,
+    )
+
+    y = np.memmap(args.capture, dtype=np.complex64, mode="r")
+    start = time.perf_counter()
+    packets, _ = receiver_bank(y, args.offsets, params, args.workers, args.processes)
+    duration = time.perf_counter() - start
+
+    for packet in packets:
+        payload = ",".join(map(str, packet["payload"]))
+        print(
+            f"sample={packet['sample']},offset={packet['offset']},payload=[{payload}]"
+        )
+    print(
+        f"{len(packets)} packets received on {len(args.offsets)} channels "
+        f"in {duration:.3f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
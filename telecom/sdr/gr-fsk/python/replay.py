@@ -0,0 +1,394 @@
+#!/usr/bin/env python
+#
+# Copyright 2021 UCLouvain.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+"""
+Offline replay of captures through the receiver, independent of GNU Radio.
+
+The preamble_detect, synchronization, demodulation and packet_parser blocks
+are run as they are, on top of minimal versions of gnuradio.gr and pmt
+(see :class:`basic_block`), and :func:`replay` calls them as the GNU Radio
+scheduler does: with all the available input items, and as many output
+items as fit in the downstream buffer and are allowed by forecast. The time
+spent in each block is measured, to profile the receiver and check its
+throughput (e.g., on CI).
+
+Usage, from this directory (as decode_capture.grc, by default):
+
+    python replay.py ../misc/fsk_capture.mat
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+import types
+from pathlib import Path
+
+import numpy as np
+
+# Parameters of the blocks, as in decode_capture.grc
+SYNC_WORD = np.unpackbits(np.array([0x3E, 0x2A, 0x54, 0xB7], dtype=np.uint8))
+N_MOOSE = 2
+
+# Name under which the blocks of this directory are imported, and their modules
+BLOCKS_PACKAGE = "fsk_replay"
+BLOCK_MODULES = (
+    "preamble_detect",
+    "synchronization",
+    "demodulation",
+    "packet_parser",
+    "onQuery_noise_estimation",
+)
+
+
+class Tag:
+    """
+    Stream tag, added by a block.
+
+    :param offset: The output item of the tag.
+    :param key: The key of the tag.
+    :param value: The value of the tag.
+    :param sample: The input item of the tagged output item, for blocks that
+        copy the last items they consume to the output (e.g., the first
+        sample of a packet, for preamble_detect).
+    """
+
+    def __init__(self, offset, key, value, sample):
+        self.offset = offset
+        self.key = key
+        self.value = value
+        self.sample = sample
+
+
+class basic_block:  # noqa: N801 (as gr.basic_block)
+    """
+    Minimal gr.basic_block, for one input and one output.
+
+    Message ports are not connected, and tags are only kept by the block
+    that adds them. Statistics of the calls of general_work are kept,
+    to measure throughput.
+    """
+
+    def __init__(self, name, in_sig, out_sig):
+        self.block_name = name
+        self.in_sig = in_sig
+        self.out_sig = out_sig
+        self.tags = []
+
+        self.n_consumed = 0  # Total, over all calls
+        self.n_produced = 0
+        self.n_calls = 0
+        self.duration = 0.0
+        self.to_consume = 0
+
+    def name(self):
+        return self.block_name
+
+    def unique_id(self):
+        return id(self)
+
+    def consume_each(self, n):
+        self.to_consume += n
+
+    def consume(self, i, n):
+        self.to_consume += n
+
+    def nitems_read(self, i):
+        return self.n_consumed
+
+    def nitems_written(self, i):
+        return self.n_produced
+
+    def add_item_tag(self, i, offset, key, value, srcid=None):
+        self.tags.append(Tag(offset, key, value, None))
+
+    def message_port_register_in(self, port):
+        pass
+
+    def message_port_register_out(self, port):
+        pass
+
+    def set_msg_handler(self, port, handler):
+        pass
+
+    def message_port_pub(self, port, msg):
+        pass
+
+    def forecast(self, noutput_items, ninputs):
+        return [noutput_items] * ninputs
+
+    def output_buffer(self, n):
+        """Return an empty buffer of n output items."""
+        dtype = self.out_sig[0]
+        if isinstance(dtype, tuple):  # Vectors
+            dtype, vlen = dtype
+            return np.empty((n, vlen), dtype=dtype)
+        return np.empty(n, dtype=dtype)
+
+    def run_work(self, y, noutput_items):
+        """
+        Call general_work, as the GNU Radio scheduler.
+
+        :param y: The available input items.
+        :param noutput_items: The number of output items that can be produced.
+        :return: The number of consumed input items, and the produced items.
+        """
+        out = self.output_buffer(noutput_items)
+        n_tags = len(self.tags)
+
+        self.to_consume = 0
+        start = time.perf_counter()
+        n_out = self.general_work([y], [out])
+        self.duration += time.perf_counter() - start
+
+        # Input item of the first output item, if they are the last consumed
+        first_copied = self.n_consumed + self.to_consume - n_out
+        for tag in self.tags[n_tags:]:
+            tag.sample = first_copied + tag.offset - self.n_produced
+
+        self.n_calls += 1
+        self.n_consumed += self.to_consume
+        self.n_produced += n_out
+        return self.to_consume, out[:n_out]
+
+
+class Records:
+    """Measurements sink, that keeps the records in memory, by kind."""
+
+    def __init__(self):
+        self.records = {}
+
+    def record(self, dtype, *values):
+        self.records.setdefault(dtype, []).append(values)
+
+    def get(self, dtype):
+        """Return the records of a kind, as a structured array."""
+        return np.array(self.records.get(dtype, []), dtype=dtype)
+
+
+def shim_modules():
+    """Return the modules gnuradio, gnuradio.gr and pmt, as used by the blocks."""
+    gr = types.ModuleType("gnuradio.gr")
+    gr.basic_block = basic_block
+    gr.version = lambda: "replay"
+
+    gnuradio = types.ModuleType("gnuradio")
+    gnuradio.gr = gr
+
+    # Values are not converted, as messages and tags stay in Python
+    pmt = types.ModuleType("pmt")
+    pmt.intern = pmt.from_long = pmt.from_double = lambda value: value
+    pmt.to_long, pmt.to_float = int, float
+    pmt.symbol_to_string = str
+    pmt.is_pair = lambda value: isinstance(value, tuple)
+    pmt.cdr = lambda value: value[1]
+
+    return {"gnuradio": gnuradio, "gnuradio.gr": gr, "pmt": pmt}
+
+
+def import_blocks():
+    """
+    Import the blocks of this directory, on top of the shims of
+    :func:`shim_modules`.
+
+    The shims are used even where GNU Radio is installed, as its blocks
+    only run in a flowgraph. They are only seen by the blocks: sys.modules
+    is restored after the import.
+
+    :return: The package of the blocks, whose modules are its attributes.
+    """
+    package = types.ModuleType(BLOCKS_PACKAGE)
+    package.__path__ = [str(Path(__file__).parent)]
+
+    shims = shim_modules()
+    saved = {name: sys.modules.get(name) for name in shims}
+    sys.modules[BLOCKS_PACKAGE] = package
+    sys.modules.update(shims)
+    try:
+        for name in BLOCK_MODULES:
+            importlib.import_module(f"{BLOCKS_PACKAGE}.{name}")
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name)
+            else:
+                sys.modules[name] = module
+
+    # Measurements are only recorded in memory (see receiver_blocks)
+    package.utils.measurements.filename = os.devnull
+    return package
+
+
+blocks = import_blocks()
+
+
+def receiver_blocks(
+    drate, fdev, fsamp, hdr_len, payload_len, crc_len, threshold, method="energy"
+):
+    """
+    Return the blocks of the receiver, as connected in decode_capture.grc.
+
+    The first sample of each packet, in the input of preamble_detect,
+    is given by the ``sample`` of its tags, and the packets are recorded
+    by packet_parser in its :class:`Records`.
+    """
+    packet_len = hdr_len + payload_len + crc_len
+    parser = blocks.packet_parser.packet_parser(
+        hdr_len, payload_len, crc_len, SYNC_WORD, False, False
+    )
+    parser.measurements = Records()
+    return [
+        blocks.preamble_detect.preamble_detect(
+            drate, fdev, fsamp, packet_len, threshold, 1, method, tag_packets=True
+        ),
+        blocks.synchronization.synchronization(
+            drate, N_MOOSE, fdev, fsamp, hdr_len, packet_len, 0, False
+        ),
+        blocks.demodulation.demodulation(drate, fdev, fsamp, payload_len, crc_len),
+        parser,
+    ]
+
+
+def replay(y, stages, chunk_len=8192, buffer_len=8192):
+    """
+    Run a capture through a chain of blocks (called stages).
+
+    The capture is fed to the first stage by chunks of ``chunk_len`` samples,
+    as a source block would do, and each stage writes to a buffer of
+    ``buffer_len`` items. Stages are called in turn until none of them
+    can make progress, and the number of output items is halved until
+    forecast is satisfied, as in GNU Radio.
+
+    :param y: The capture, (N,). It can be memory-mapped.
+    :param stages: The stages of the chain.
+    :param chunk_len: The number of samples fed at once to the first stage.
+    :param buffer_len: The number of items of the output buffer of each stage.
+    :return: The output items of the last stage.
+    """
+    buffers = [np.zeros(0, dtype=np.complex64)] + [
+        stage.output_buffer(0) for stage in stages
+    ]
+    outputs = []
+    n_read = 0
+    # Calls that neither consumed nor produced items (but may have changed
+    # the state of the stage), not repeated until the buffers change
+    idle_calls = [None] * len(stages)
+
+    while True:
+        progress = False
+
+        if n_read < len(y) and len(buffers[0]) < chunk_len:
+            chunk = np.asarray(y[n_read : n_read + chunk_len], dtype=np.complex64)
+            buffers[0] = np.concatenate((buffers[0], chunk))
+            n_read += len(chunk)
+            progress = True
+
+        for i, stage in enumerate(stages):
+            last = i == len(stages) - 1
+            space = buffer_len if last else buffer_len - len(buffers[i + 1])
+            available = len(buffers[i])
+
+            noutput_items = space
+            while noutput_items > 0:
+                if stage.forecast(noutput_items, 1)[0] <= available:
+                    break
+                noutput_items //= 2
+            if noutput_items == 0 or available == 0:
+                continue
+            if idle_calls[i] == (available, noutput_items):
+                continue
+
+            consumed, out = stage.run_work(buffers[i], noutput_items)
+            buffers[i] = buffers[i][consumed:]
+            if last:
+                outputs.append(out)
+            else:
+                buffers[i + 1] = np.concatenate((buffers[i + 1], out))
+
+            idle = consumed == 0 and len(out) == 0
+            idle_calls[i] = (available, noutput_items) if idle else None
+            progress = True
+
+        if not progress:
+            break
+
+    return np.concatenate(outputs) if outputs else buffers[-1]
+
+
+def throughput_report(stages, n_samples, duration):
+    lines = [
+        f"{'stage':<20}{'calls':>8}{'in items':>12}{'out items':>12}"
+        f"{'time (s)':>10}{'in items/s':>14}"
+    ]
+    for stage in stages:
+        rate = stage.n_consumed / stage.duration if stage.duration > 0 else np.inf
+        lines.append(
+            f"{stage.name():<20}{stage.n_calls:>8}{stage.n_consumed:>12}"
+            f"{stage.n_produced:>12}{stage.duration:>10.3f}{rate:>14.3e}"
+        )
+    lines.append(
+        f"total: {n_samples} samples in {duration:.3f}s "
+        f"({n_samples / duration:.3e} samples/s)"
+    )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("capture", help="complex64 capture file (e.g., .mat)")
+    parser.add_argument("--drate", type=float, default=50e3)
+    parser.add_argument("--osr", type=int, default=8)
+    parser.add_argument("--fdev", type=float, default=None, help="default: drate/4")
+    parser.add_argument("--hdr-len", type=int, default=8)
+    parser.add_argument("--payload-len", type=int, default=100)
+    parser.add_argument("--crc-len", type=int, default=1)
+    parser.add_argument("--threshold", type=float, default=0.05)
+    parser.add_argument("--method", choices=("energy", "ppd"), default="energy")
+    parser.add_argument("--chunk-len", type=int, default=8192)
+    parser.add_argument("--buffer-len", type=int, default=8192)
+    args = parser.parse_args()
+
+    fsamp = args.drate * args.osr
+    fdev = args.fdev if args.fdev is not None else args.drate / 4
+
+    y = np.memmap(args.capture, dtype=np.complex64, mode="r")
+    stages = receiver_blocks(
+        args.drate,
+        fdev,
+        fsamp,
+        args.hdr_len,
+        args.payload_len,
+        args.crc_len,
+        args.threshold,
+        args.method,
+    )
+
+    start = time.perf_counter()
+    replay(y, stages, args.chunk_len, args.buffer_len)
+    duration = time.perf_counter() - start
+
+    print(throughput_report(stages, len(y), duration))
+    n_packets, n_errors = stages[-1].nb_packet, stages[-1].nb_error
+    print(f"{n_packets} packets received with {n_errors} error(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -24,7 +24,10 @@ import numpy as np
 import pmt
 from gnuradio import gr
 
-from .utils import logging, measurements_logger
+from .dsp import Rotator, sto_estimate
+from .instrumentation import instrument
+from .measurements import SNR_DTYPE, SYNC_DTYPE
+from .utils import logging, measurements
 
 
 
@@ -39,21 +42,7 @@ def sto_estimation(y, B, R, Fdev):
     """
     Estimate symbol timing (fractional) based on phase shifts
     """
-    phase_function = np.unwrap(np.angle(y))
-    phase_derivative_sign = phase_function[1:] - phase_function[:-1]
-    sign_derivative = np.abs(phase_derivative_sign[1:] - phase_derivative_sign[:-1])
-
-    sum_der_saved = -np.inf
-    save_i = 0
-
-    for i in range(0, R):
-        sum_der = np.sum(sign_derivative[i::R])
-
-        if sum_der > sum_der_saved:
-            sum_der_saved = sum_der
-            save_i = i
-
-    return np.mod(save_i + 1, R)
+    return int(sto_estimate(y, R))
 
 
 
@@ -78,7 +67,7 @@ class synchronization(gr.basic_block):
         self.rem_samples = 0
         self.init_sto = 0
         self.cfo = 0.0
-        self.t0 = 0.0
+        self.rotator = Rotator(0.0, self.drate * self.osr)
         self.estimated_noise_power  = None
         self.estimated_signal_power = 0
 
@@ -128,15 +117,16 @@ class synchronization(gr.basic_block):
     def set_Grx(self, Grx):
         self.Grx = Grx
 
+    @instrument
     def general_work(self, input_items, output_items):
         if self.rem_samples == 0:  # new packet to process, compute the CFO and STO
             y = input_items[0][: self.hdr_len * 8 * self.osr]
             self.cfo = cfo_estimation(y, self.drate, self.osr, self.fdev, self.N_Moose)
 
-            # Correct CFO in preamble
-            t = np.arange(len(y)) / (self.drate * self.osr)
-            y_cfo = np.exp(-1j * 2 * np.pi * self.cfo * t) * y
-            self.t0 = t[-1]
+            # Correct CFO in preamble, the oscillator keeps running for the packet
+            self.rotator.set_freq(-self.cfo)
+            self.rotator.reset()
+            y_cfo = self.rotator.process(y)
 
             sto = sto_estimation(y_cfo, self.drate, self.osr, self.fdev)
 
@@ -151,13 +141,8 @@ class synchronization(gr.basic_block):
             y = input_items[0][:win_size]
 
             # Correct CFO before transferring samples to demodulation stage
-            t = self.t0 + np.arange(1, len(y) + 1) / (self.drate * self.osr)
-            y_corr = np.exp(-1j * 2 * np.pi * self.cfo * t) * y
-            self.t0 = t[
-                -1
-            ]  # we keep the CFO correction continuous across buffer chunks
-
-            output_items[0][:win_size] = y_corr
+            # (the phase is continuous across buffer chunks)
+            self.rotator.process(y, out=output_items[0][:win_size])
 
             self.rem_samples -= win_size
             if (self.rem_samples == 0):  # Thow away the extra OSR samples from the preamble detection stage
@@ -176,8 +161,8 @@ class synchronization(gr.basic_block):
                         self.logger.info(
                             f"CFO {self.cfo:.2f} Hz, STO {self.init_sto}, EsN0est: {10 * np.log10(SNR_est):.2f} dB, Avg. Amplitude: {np.sqrt(np.abs(self.estimated_signal_power)):.2e}"
                         )
-                    measurements_logger.info(f"CFO={self.cfo},STO={self.init_sto}")
-                    measurements_logger.info(f"EsN0dB={10 * np.log10(SNR_est):.2f},GRXdB={self.Grx},N0={self.estimated_noise_power}")
+                    measurements.record(SYNC_DTYPE, self.cfo, self.init_sto)
+                    measurements.record(SNR_DTYPE, 10 * np.log10(SNR_est), self.Grx, self.estimated_noise_power)
 
                 self.consume_each(win_size + self.osr - self.init_sto)
             else:
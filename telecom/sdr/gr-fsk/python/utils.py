@@ -1,18 +1,17 @@
 import atexit
 import logging
-import statistics as stats
 from collections.abc import Callable
 from functools import wraps
-from time import time
+from time import perf_counter
 from typing import Any
 
+from .instrumentation import Histogram
+from .measurements import MeasurementsSink
+
 logging.basicConfig(level=logging.INFO)
 
-measurements_logger = logging.getLogger("measurements")
-measurements_logger.propagate = False
-measurements_logger.addHandler(
-    logging.FileHandler(filename="measurements.txt", mode="w")
-)
+# Written by a background thread, see telecom/python/telecom/read_measurements.py
+measurements = MeasurementsSink(filename="measurements.bin")
 
 
 def timeit(fun: Callable[..., Any]) -> Callable[..., Any]:
@@ -38,23 +37,23 @@ def timeit(fun: Callable[..., Any]) -> Callable[..., Any]:
         ...     pass
 
     Note that you can use this decorator as many times as you want.
+    To monitor the general_work method of a block, see instrumentation.py.
     """
     f_name = getattr(fun, "__name__", "<unnamed function>")
-    data: list[float] = []
+    durations = Histogram(1e-6, 100)  # Fixed size, whatever the number of calls
 
     def print_stats() -> None:
-        mean = stats.mean(data)
-        std = stats.stdev(data)
         print(
-            f"{f_name} statistics: mean execution time of {mean:.2}s. (std: {std:.2}s.)"
+            f"{f_name} statistics: mean execution time of {durations.mean:.2}s. "
+            f"(std: {durations.std:.2}s., 99th percentile: {durations.percentile(99):.2}s.)"
         )
 
     @wraps(fun)
     def wrapper(*args, **kwargs):
-        start = time()
+        start = perf_counter()
         ret = fun(*args, **kwargs)
-        end = time()
-        data.append(end - start)
+        end = perf_counter()
+        durations.record(end - start)
         return ret
 
     atexit.register(print_stats)